@@ -27,7 +27,6 @@ from datetime import datetime, timedelta
 from ai_engine import generate_summary, generate_quiz, explain_eli5
 from adaptive_logic import AdaptiveEngine
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 
@@ -855,13 +854,13 @@ def handle_disconnect():
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-print(f"🔑 Gemini API Key: {'Loaded ✓' if GEMINI_API_KEY else 'Missing ✗'}")
+# Configure the LLM provider (Gemini, or the offline fake/mock selected by LLM_PROVIDER)
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.llm_client import llm_client
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    print("✅ Gemini configured successfully!")
+GEMINI_API_KEY = get_provider().is_available()
+print(f"🔑 LLM provider '{get_provider().name}': {'Ready ✓' if GEMINI_API_KEY else 'Missing API key ✗'}")
 
 @app.route('/api/chat/ask', methods=['POST'])
 def chat_ask_question():
@@ -932,46 +931,11 @@ def chat_ask_question():
 
 def get_gemini_response(question, document_context=""):
     """
-    Get response from Google Gemini AI
+    Get response from the configured LLM provider (see app_modules/services/llm_providers.py)
     """
-
-    # Build the prompt
-    prompt = f"""You are IntelliLearn AI, a friendly and knowledgeable study assistant for students of all ages.
-
-GUIDELINES:
-- Answer questions from ANY subject (Math, Science, History, Literature, Geography, etc.)
-- Explain concepts clearly with examples
-- Use markdown formatting (**, *, bullet points)
-- Add emojis for engagement (but don't overuse)
-- Keep answers 2-4 paragraphs unless detailed explanation is needed
-- For math problems, show step-by-step calculations
-- Be encouraging and supportive
-- End with a helpful follow-up question
-
-STUDENT'S QUESTION: {question}"""
-
-    if document_context:
-        prompt += f"\n\nSTUDENT'S STUDY MATERIAL:\n{document_context}\n\nIf the question relates to this material, reference it in your answer."
-
-    # Initialize model with CORRECT name
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
-    # Generate content
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.GenerationConfig(
-            temperature=0.7,
-            top_p=0.95,
-            top_k=40,
-            max_output_tokens=1000,
-        )
-    )
-
-    answer = response.text.strip()
-
-    # Add footer
-    answer += "\n\n💡 *Have another question? I'm here to help!*"
-
+    answer = GeminiService.get_response(question, document_context)
+    if not answer:
+        raise RuntimeError('LLM provider returned no answer')
     return answer
 
 
@@ -1127,16 +1091,7 @@ def debug_gemini():
                 'solution': 'Add GEMINI_API_KEY to .env file'
             })
 
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content("Say 'Hello! I am working perfectly!'")
-
-        return jsonify({
-            'status': 'success',
-            'message': 'Gemini is working!',
-            'model': 'gemini-2.5-flash',
-            'test_response': response.text
-        })
+        return jsonify(GeminiService.test_connection())
 
     except Exception as e:
         return jsonify({
@@ -1258,15 +1213,11 @@ TEXT: {text[:3000]}
 Return ONLY a valid JSON array of objects. Each object must have "name" (string, 2-4 words max) and "description" (string, 1 brief sentence).
 Example: [{{"name": "Machine Learning", "description": "A field of AI focused on training models from data."}}]"""
 
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-    response = model.generate_content(prompt, generation_config={'temperature': 0.2, 'max_output_tokens': 800})
-
-    # Robust JSON parsing
-    text_response = response.text.strip()
-    json_match = re.search(r'\[.*\]', text_response, re.DOTALL)
-    if not json_match:
+    concepts = llm_client.generate_json(prompt, {'temperature': 0.2, 'max_output_tokens': 800},
+                                        operation='extract_concepts')
+    if not isinstance(concepts, list):
         raise ValueError("AI did not return a valid JSON array for concepts.")
-    return json.loads(json_match.group(0))
+    return concepts
 
 def extract_concepts_simple(text):
     words = re.findall(r'\b[A-Z][a-z]{3,}(?:\s+[A-Z][a-z]+)*\b', text)
@@ -1320,11 +1271,9 @@ CONTEXT: {context}
 Return ONLY a valid JSON object with "explanation" (string) and "keyPoints" (array of strings).
 Example: {{"explanation": "...", "keyPoints": ["...", "...", "..."]}}"""
 
-                model = genai.GenerativeModel('models/gemini-2.5-flash')
-                response = model.generate_content(prompt)
+                text_response = llm_client.generate(prompt, operation='explain_concept').strip()
 
                 # ✅ ROBUST JSON PARSING
-                text_response = response.text.strip()
                 json_match = re.search(r'\{.*\}', text_response, re.DOTALL)
 
                 if json_match:
@@ -1524,6 +1473,53 @@ def update_user_streak(user_id):
 # =========== COURSE MANAGEMENT ROUTES ====================================
 # =========================================================================
 
+def course_to_dict(course, enrollment):
+    """Course card data, with the user's enrollment state if they are enrolled"""
+    return {
+        'id': course.id,
+        'title': course.title,
+        'subject': course.subject,
+        'category': course.category,
+        'description': course.description,
+        'instructor': course.instructor,
+        'thumbnail': course.thumbnail,
+        'color': course.color,
+        'totalLessons': course.total_lessons,
+        'duration': course.duration,
+        'level': course.level,
+        'rating': course.rating,
+        'students': course.students_count,
+        'enrolled': enrollment is not None,
+        'progress': enrollment.progress if enrollment else 0,
+        'completedLessons': enrollment.completed_lessons if enrollment else 0,
+        'lastAccessed': enrollment.last_accessed.isoformat() if enrollment and enrollment.last_accessed else None
+    }
+
+
+def get_course_with_enrollment(course_id, user_id):
+    """(course, user's enrollment or None) in one query; (None, None) if the course doesn't exist"""
+    if not user_id:
+        return db.session.get(Course, course_id), None
+    row = db.session.query(Course, CourseEnrollment).outerjoin(CourseEnrollment, db.and_(
+        CourseEnrollment.course_id == Course.id,
+        CourseEnrollment.user_id == user_id
+    )).filter(Course.id == course_id).order_by(CourseEnrollment.id).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def get_lessons_with_completion(course_id, enrollment):
+    """[(lesson, completed)] in week/order, completion flags read in the same query"""
+    if enrollment is None:
+        completed = db.literal(False)
+    else:
+        completed = db.exists().where(
+            CompletedLesson.enrollment_id == enrollment.id,
+            CompletedLesson.lesson_id == Lesson.id
+        )
+    return db.session.query(Lesson, completed).filter(Lesson.course_id == course_id)\
+        .order_by(Lesson.week, Lesson.order).all()
+
+
 @app.route('/api/courses', methods=['GET'])
 def get_all_courses():
     """Get all available courses"""
@@ -1532,8 +1528,14 @@ def get_all_courses():
         category = request.args.get('category', 'all')
         search = request.args.get('search', '').lower()
         
-        # Base query
-        query = Course.query
+        # Courses with the user's enrollment joined in, so the catalog is one query
+        if user_id:
+            query = db.session.query(Course, CourseEnrollment).outerjoin(CourseEnrollment, db.and_(
+                CourseEnrollment.course_id == Course.id,
+                CourseEnrollment.user_id == user_id
+            )).order_by(Course.id, CourseEnrollment.id)
+        else:
+            query = db.session.query(Course, db.null()).order_by(Course.id)
         
         # Apply filters
         if category != 'all':
@@ -1548,42 +1550,13 @@ def get_all_courses():
                 )
             )
         
-        courses = query.all()
+        rows = query.all()
         
-        # Get user enrollments if user_id provided
-        enrolled_course_ids = set()
-        if user_id:
-            enrollments = CourseEnrollment.query.filter_by(user_id=user_id).all()
-            enrolled_course_ids = {e.course_id for e in enrollments}
-        
-        courses_list = []
-        for course in courses:
-            enrollment = None
-            if user_id and course.id in enrolled_course_ids:
-                enrollment = CourseEnrollment.query.filter_by(
-                    user_id=user_id, 
-                    course_id=course.id
-                ).first()
-            
-            courses_list.append({
-                'id': course.id,
-                'title': course.title,
-                'subject': course.subject,
-                'category': course.category,
-                'description': course.description,
-                'instructor': course.instructor,
-                'thumbnail': course.thumbnail,
-                'color': course.color,
-                'totalLessons': course.total_lessons,
-                'duration': course.duration,
-                'level': course.level,
-                'rating': course.rating,
-                'students': course.students_count,
-                'enrolled': enrollment is not None,
-                'progress': enrollment.progress if enrollment else 0,
-                'completedLessons': enrollment.completed_lessons if enrollment else 0,
-                'lastAccessed': enrollment.last_accessed.isoformat() if enrollment and enrollment.last_accessed else None
-            })
+        # A duplicated enrollment would repeat its course; keep the first, as .first() used to
+        courses = {}
+        for course, enrollment in rows:
+            courses.setdefault(course.id, course_to_dict(course, enrollment))
+        courses_list = list(courses.values())
         
         return jsonify({'courses': courses_list}), 200
         
@@ -1598,16 +1571,13 @@ def get_course_details(course_id):
     try:
         user_id = request.args.get('user_id')
         
-        course = Course.query.get(course_id)
+        course, enrollment = get_course_with_enrollment(course_id, user_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        # Get course lessons grouped by week
-        lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.week, Lesson.order).all()
-        
         # Group lessons by week
         syllabus = {}
-        for lesson in lessons:
+        for lesson, completed in get_lessons_with_completion(course_id, enrollment):
             if lesson.week not in syllabus:
                 syllabus[lesson.week] = {
                     'week': lesson.week,
@@ -1622,47 +1592,10 @@ def get_course_details(course_id):
                 'order': lesson.order
             })
             syllabus[lesson.week]['total'] += 1
-        
-        # Get enrollment info if user is enrolled
-        enrollment = None
-        completed_lesson_ids = set()
-        if user_id:
-            enrollment = CourseEnrollment.query.filter_by(
-                user_id=user_id, 
-                course_id=course_id
-            ).first()
-            
-            if enrollment:
-                completed = CompletedLesson.query.filter_by(
-                    enrollment_id=enrollment.id
-                ).all()
-                completed_lesson_ids = {c.lesson_id for c in completed}
-        
-        # Calculate completed lessons per week
-        for week_data in syllabus.values():
-            week_data['completed'] = sum(
-                1 for lesson in week_data['lessons'] 
-                if lesson['id'] in completed_lesson_ids
-            )
+            syllabus[lesson.week]['completed'] += 1 if completed else 0
         
         course_data = {
-            'id': course.id,
-            'title': course.title,
-            'subject': course.subject,
-            'category': course.category,
-            'description': course.description,
-            'instructor': course.instructor,
-            'thumbnail': course.thumbnail,
-            'color': course.color,
-            'totalLessons': course.total_lessons,
-            'duration': course.duration,
-            'level': course.level,
-            'rating': course.rating,
-            'students': course.students_count,
-            'enrolled': enrollment is not None,
-            'progress': enrollment.progress if enrollment else 0,
-            'completedLessons': enrollment.completed_lessons if enrollment else 0,
-            'lastAccessed': enrollment.last_accessed.isoformat() if enrollment and enrollment.last_accessed else None,
+            **course_to_dict(course, enrollment),
             'syllabus': list(syllabus.values()),
             'skills': []  # You can add a skills table if needed
         }
@@ -1685,7 +1618,7 @@ def enroll_in_course(course_id):
             return jsonify({'error': 'User ID required'}), 400
         
         # Check if course exists
-        course = Course.query.get(course_id)
+        course = db.session.get(Course, course_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
@@ -1707,10 +1640,13 @@ def enroll_in_course(course_id):
             last_accessed=datetime.now()
         )
         
-        # Update course student count
-        course.students_count += 1
-        
         db.session.add(enrollment)
+        
+        # Update course student count in SQL, so concurrent enrollments don't overwrite each other
+        Course.query.filter_by(id=course_id).update(
+            {Course.students_count: func.coalesce(Course.students_count, 0) + 1},
+            synchronize_session=False
+        )
         db.session.commit()
         
         return jsonify({
@@ -1731,26 +1667,10 @@ def get_course_lessons(course_id):
     try:
         user_id = request.args.get('user_id')
         
-        course = Course.query.get(course_id)
+        course, enrollment = get_course_with_enrollment(course_id, user_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.week, Lesson.order).all()
-        
-        # Get completed lessons if user provided
-        completed_lesson_ids = set()
-        if user_id:
-            enrollment = CourseEnrollment.query.filter_by(
-                user_id=user_id,
-                course_id=course_id
-            ).first()
-            
-            if enrollment:
-                completed = CompletedLesson.query.filter_by(
-                    enrollment_id=enrollment.id
-                ).all()
-                completed_lesson_ids = {c.lesson_id for c in completed}
-        
         lessons_list = [{
             'id': lesson.id,
             'week': lesson.week,
@@ -1759,8 +1679,8 @@ def get_course_lessons(course_id):
             'video_url': lesson.video_url,
             'duration': lesson.duration,
             'order': lesson.order,
-            'completed': lesson.id in completed_lesson_ids
-        } for lesson in lessons]
+            'completed': bool(completed)
+        } for lesson, completed in get_lessons_with_completion(course_id, enrollment)]
         
         return jsonify({'lessons': lessons_list}), 200
         
@@ -1790,6 +1710,7 @@ def update_course_progress(course_id):
             return jsonify({'error': 'Not enrolled in this course'}), 404
         
         # Mark lesson as completed if provided
+        newly_completed = 0
         if lesson_id:
             # Check if already completed
             existing = CompletedLesson.query.filter_by(
@@ -1803,14 +1724,20 @@ def update_course_progress(course_id):
                     lesson_id=lesson_id
                 )
                 db.session.add(completed)
-                enrollment.completed_lessons += 1
-        
-        # Calculate progress
-        course = Course.query.get(course_id)
-        if course.total_lessons > 0:
-            enrollment.progress = int((enrollment.completed_lessons / course.total_lessons) * 100)
-        
-        enrollment.last_accessed = datetime.now()
+                newly_completed = 1
+        
+        # Count the lesson and recalculate progress in one SQL update, so concurrent
+        # completions aren't lost to a read-modify-write
+        completed_lessons = func.coalesce(CourseEnrollment.completed_lessons, 0) + newly_completed
+        total_lessons = db.session.query(Course.total_lessons).filter(Course.id == course_id).scalar_subquery()
+        CourseEnrollment.query.filter_by(id=enrollment.id).update({
+            CourseEnrollment.completed_lessons: completed_lessons,
+            CourseEnrollment.progress: db.case(
+                (total_lessons > 0, completed_lessons * 100 // total_lessons),
+                else_=CourseEnrollment.progress
+            ),
+            CourseEnrollment.last_accessed: datetime.now()
+        }, synchronize_session=False)
         
         db.session.commit()
         
@@ -5,12 +5,17 @@ db = SQLAlchemy()
 from .user import User
 from .teacher import Teacher
 from .course import Course, CourseEnrollment
-from .document import Document
+from .document import Document, DocumentChunk
 from .quiz import Quiz, QuizAttempt
-from .chat import ChatMessage
+from .chat import ChatMessage, ChatMemory
 from .analytics import StudentAnalytics, QuizSession, RecommendedQuiz, StudentClassification, QuestionAttempt, \
     ConceptMastery
+from .knowledge_graph import ConceptExplanation, CachedKnowledgeGraph, LibraryGraph
+from .artifact_job import ArtifactJob
+from .llm_usage import LLMUsage
+from .tombstone import Tombstone
 
-__all__ = ['db', 'User', 'Teacher', 'Course', 'CourseEnrollment', 'Document', 'Quiz', 'QuizAttempt', 'ChatMessage',
-           'StudentAnalytics', 'QuizSession', 'RecommendedQuiz', 'StudentClassification', 'QuestionAttempt',
-           'ConceptMastery']
+__all__ = ['db', 'User', 'Teacher', 'Course', 'CourseEnrollment', 'Document', 'DocumentChunk', 'Quiz', 'QuizAttempt',
+           'ChatMessage', 'ChatMemory', 'StudentAnalytics', 'QuizSession', 'RecommendedQuiz', 'StudentClassification',
+           'QuestionAttempt', 'ConceptMastery', 'ConceptExplanation', 'ArtifactJob',
+           'LLMUsage', 'CachedKnowledgeGraph', 'LibraryGraph', 'Tombstone']
@@ -37,6 +37,12 @@ class StudentAnalytics(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, onupdate=db.func.now())
 
+    __table_args__ = (
+        db.Index('ix_student_analytics_user', 'user_id'),
+        # Weekly/monthly leaderboards: WHERE last_activity >= ?
+        db.Index('ix_student_analytics_last_activity', 'last_activity'),
+    )
+
 
 class QuizSession(db.Model):
     """Tracks individual quiz sessions for detailed analysis"""
@@ -65,6 +71,14 @@ class QuizSession(db.Model):
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    __table_args__ = (
+        # Recent sessions: WHERE user_id = ? ORDER BY created_at
+        db.Index('ix_quiz_session_user_created', 'user_id', 'created_at'),
+        # Performance history and weekly stats: WHERE user_id = ? AND completed_at >= ?
+        db.Index('ix_quiz_session_user_completed', 'user_id', 'completed_at'),
+        db.Index('ix_quiz_session_quiz', 'quiz_id'),
+    )
+
 
 class RecommendedQuiz(db.Model):
     """AI-recommended quizzes for students"""
@@ -153,6 +167,14 @@ class QuestionAttempt(db.Model):
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    __table_args__ = (
+        # Classification and error-pattern analysis: WHERE user_id = ?
+        db.Index('ix_question_attempt_user_created', 'user_id', 'created_at'),
+        db.Index('ix_question_attempt_session', 'session_id'),
+        # Document purge: WHERE quiz_id IN (...)
+        db.Index('ix_question_attempt_quiz', 'quiz_id'),
+    )
+
 
 class ConceptMastery(db.Model):
     """Track mastery of specific concepts/topics over time"""
@@ -181,3 +203,7 @@ class ConceptMastery(db.Model):
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, onupdate=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_concept_mastery_user', 'user_id'),
+    )
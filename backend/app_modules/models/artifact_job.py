@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+from . import db
+
+
+class ArtifactJob(db.Model):
+    """
+    Durable retry job for an LLM-derived artifact that fell back to a
+    heuristic result. One row per artifact (dedupe_key), upgraded in place
+    by the background worker once the provider answers.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # 'concepts' | 'explanation'
+    dedupe_key = db.Column(db.String(300), nullable=False, unique=True)
+    document_id = db.Column(db.String(36), nullable=False)
+    document_hash = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, default='{}')  # JSON job arguments
+    result = db.Column(db.Text)  # JSON artifact once the job is done
+    status = db.Column(db.String(20), default='pending', index=True)  # pending | running | done | failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_artifact_job_due', 'status', 'next_attempt_at'),
+    )
+
+    def get_payload(self):
+        return json.loads(self.payload or '{}')
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
@@ -7,3 +7,16 @@ class ChatMessage(db.Model):
     question = db.Column(db.Text, nullable=False)
     answer = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        # Serves the history keyset: WHERE user_id = ? AND (timestamp, id) < cursor ORDER BY timestamp DESC, id DESC
+        db.Index('ix_chat_message_user_timestamp', 'user_id', 'timestamp', 'id'),
+    )
+
+class ChatMemory(db.Model):
+    """Rolling summary of a user's older chat turns, so prompts stay bounded"""
+    user_id = db.Column(db.String(100), db.ForeignKey('user.id'), primary_key=True)
+    summary = db.Column(db.Text, default='')
+    summarized_through_id = db.Column(db.Integer, default=0)  # last ChatMessage.id folded into summary
+    summarized_turns = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -18,6 +18,13 @@ class CourseEnrollment(db.Model):
     progress = db.Column(db.Integer, default=0)  # 0-100
     enrolled_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    __table_args__ = (
+        # A student's courses / is this student enrolled: WHERE user_id = ? [AND course_id = ?]
+        db.Index('ix_course_enrollment_user_course', 'user_id', 'course_id'),
+        # Course.enrollments and roster counts: WHERE course_id = ?
+        db.Index('ix_course_enrollment_course', 'course_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,4 +1,5 @@
 import uuid
+import hashlib
 from . import db
 
 class Document(db.Model):
@@ -10,5 +11,24 @@ class Document(db.Model):
     difficulty = db.Column(db.String(20), default='medium')
     user_id = db.Column(db.String(100), db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    deleted_at = db.Column(db.DateTime)  # tombstoned: hidden from queries until the purger removes it
 
     quiz = db.relationship('Quiz', backref='document', uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # A user's library, newest or oldest first: WHERE user_id = ? ORDER BY created_at
+        db.Index('ix_document_user_created', 'user_id', 'created_at'),
+    )
+
+    def content_hash(self):
+        """sha256 of the extracted text; keys caches that depend only on content"""
+        return hashlib.sha256((self.text_content or '').encode('utf-8')).hexdigest()
+
+
+class DocumentChunk(db.Model):
+    """Retrieval-sized passage of a document; indexed for full-text search by document_chunk_fts"""
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.String(36), db.ForeignKey('document.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(100), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
@@ -0,0 +1,57 @@
+import json
+from . import db
+
+
+class ConceptExplanation(db.Model):
+    """AI explanation of a knowledge-graph concept, cached per document content"""
+    id = db.Column(db.Integer, primary_key=True)
+    document_hash = db.Column(db.String(64), nullable=False)  # sha256 of Document.text_content
+    concept_key = db.Column(db.String(200), nullable=False)  # normalised concept name
+    concept = db.Column(db.String(200), nullable=False)
+    explanation = db.Column(db.Text, nullable=False)
+    key_points = db.Column(db.Text, default='[]')  # JSON list of strings
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('document_hash', 'concept_key', name='uq_concept_explanation_doc_concept'),
+    )
+
+    @staticmethod
+    def normalize(concept):
+        return ' '.join(concept.lower().split())[:200]
+
+    def to_dict(self):
+        return {
+            'explanation': self.explanation,
+            'keyPoints': json.loads(self.key_points or '[]')
+        }
+
+
+class CachedKnowledgeGraph(db.Model):
+    """Knowledge graph of a document, cached per content hash and extractor/graph version"""
+    id = db.Column(db.Integer, primary_key=True)
+    document_hash = db.Column(db.String(64), nullable=False)  # sha256 of Document.text_content
+    version = db.Column(db.String(50), nullable=False)  # concept extractor + graph builder version
+    filename = db.Column(db.String(255))  # label of the root node in `graph`
+    generator_type = db.Column(db.String(20), default='ai')
+    concepts = db.Column(db.Text, nullable=False)  # JSON list of {name, description}
+    graph = db.Column(db.Text, nullable=False)  # JSON response body served to clients
+    etag = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('document_hash', 'version', name='uq_cached_knowledge_graph_doc_version'),
+    )
+
+    def get_concepts(self):
+        return json.loads(self.concepts or '[]')
+
+
+class LibraryGraph(db.Model):
+    """A user's cross-document concept graph, updated incrementally on every upload"""
+    user_id = db.Column(db.String(100), db.ForeignKey('user.id'), primary_key=True)
+    adjacency = db.Column(db.Text, nullable=False)  # networkx node-link JSON
+    response = db.Column(db.Text, nullable=False)  # precomputed /library response body
+    etag = db.Column(db.String(64), nullable=False)
+    document_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -0,0 +1,22 @@
+from datetime import datetime
+from . import db
+
+
+class LLMUsage(db.Model):
+    """One row per LLM call, written in batches by the usage ledger"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(100), nullable=True)  # no FK: background calls have no user
+    subscription = db.Column(db.String(50))
+    endpoint = db.Column(db.String(200))  # request path that triggered the call, if any
+    operation = db.Column(db.String(50), nullable=False)
+    prompt_chars = db.Column(db.Integer, default=0)
+    response_chars = db.Column(db.Integer, default=0)
+    latency_ms = db.Column(db.Integer, default=0)
+    cached = db.Column(db.Boolean, default=False)  # served by a coalesced identical call
+    outcome = db.Column(db.String(20), nullable=False)  # ok | error | timeout | busy | circuit_open | budget
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_llm_usage_user_created', 'user_id', 'created_at'),
+        db.Index('ix_llm_usage_created', 'created_at'),
+    )
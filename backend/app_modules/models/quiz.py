@@ -19,3 +19,10 @@ class QuizAttempt(db.Model):
     difficulty = db.Column(db.String(20))
     study_time = db.Column(db.String(10))
     completed_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        # Adaptive difficulty and dashboards: WHERE user_id = ?
+        db.Index('ix_quiz_attempt_user_completed', 'user_id', 'completed_at'),
+        # Document purge: WHERE quiz_id IN (...)
+        db.Index('ix_quiz_attempt_quiz', 'quiz_id'),
+    )
@@ -0,0 +1,47 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+from . import db
+from .chat import ChatMessage
+from .document import Document
+
+
+class Tombstone(db.Model):
+    """
+    Deletion that has been made visible but not yet carried out.
+    'chat_history' hides a user's messages up to cleared_through;
+    'document' stands for a Document with deleted_at set. The purger
+    removes the rows (and the file) in small batches, then sets
+    completed_at.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'chat_history' | 'document'
+    user_id = db.Column(db.String(100), nullable=False)
+    target_id = db.Column(db.String(36))  # Document.id
+    cleared_through = db.Column(db.Integer)  # last ChatMessage.id hidden
+    file_path = db.Column(db.String(500))  # renamed upload to remove
+    purged_rows = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    completed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_tombstone_pending', 'completed_at', 'id'),
+        db.Index('ix_tombstone_user_kind', 'user_id', 'kind', 'cleared_through'),
+    )
+
+
+def _chat_cleared_through(user_id):
+    return db.select(db.func.coalesce(db.func.max(Tombstone.cleared_through), 0))\
+        .where(Tombstone.kind == 'chat_history', Tombstone.user_id == user_id).scalar_subquery()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _hide_tombstoned_rows(state):
+    """Keep tombstoned rows out of every ORM query; pass include_deleted=True to see them"""
+    # Column loads refresh objects already in hand (e.g. just tombstoned); leave those alone
+    if not state.is_select or state.is_column_load or state.execution_options.get('include_deleted', False):
+        return
+    state.statement = state.statement.options(
+        with_loader_criteria(Document, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(ChatMessage, lambda cls: cls.id > _chat_cleared_through(cls.user_id),
+                             include_aliases=True),
+    )
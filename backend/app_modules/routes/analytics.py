@@ -3,6 +3,7 @@ import json
 from datetime import datetime, timedelta
 from app_modules.models import db, User, StudentAnalytics, QuizSession, RecommendedQuiz, Quiz, Document, QuizAttempt
 from app_modules.models import StudentClassification, QuestionAttempt, ConceptMastery
+from app_modules.services.user_registry import ensure_user
 from app_modules.services.ml_analytics import MLAnalyticsEngine
 from app_modules.services.student_classifier import EducationalDataAnalyst
 
@@ -21,21 +22,11 @@ def get_or_create_analytics(user_id):
     return analytics
 
 
-def get_or_create_user(user_id):
-    """Get or create user"""
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
-
-
 @analytics_bp.route('/dashboard/<user_id>', methods=['GET'])
 def get_enhanced_dashboard(user_id):
     """Get comprehensive dashboard with ML insights"""
     try:
-        get_or_create_user(user_id)
+        ensure_user(user_id)
         analytics = get_or_create_analytics(user_id)
 
         # Get recent quiz sessions
@@ -170,7 +161,7 @@ def start_quiz_session():
         is_multiplayer = data.get('is_multiplayer', False)
         room_code = data.get('room_code')
 
-        get_or_create_user(user_id)
+        ensure_user(user_id)
 
         session = QuizSession(
             user_id=user_id,
@@ -286,7 +277,7 @@ def end_quiz_session():
 def get_recommendations(user_id):
     """Get AI-powered quiz recommendations"""
     try:
-        get_or_create_user(user_id)
+        ensure_user(user_id)
         analytics = get_or_create_analytics(user_id)
 
         # Get recent sessions
@@ -351,7 +342,7 @@ def predict_performance():
         difficulty = data['difficulty']
         topic = data.get('topic')
 
-        get_or_create_user(user_id)
+        ensure_user(user_id)
         analytics = get_or_create_analytics(user_id)
 
         analytics_dict = {
@@ -415,7 +406,7 @@ def get_performance_history(user_id):
 def classify_student(user_id):
     """Get comprehensive student classification using Educational Data Analyst"""
     try:
-        get_or_create_user(user_id)
+        ensure_user(user_id)
 
         # Gather data for classification
         sessions = QuizSession.query.filter_by(user_id=user_id).order_by(
@@ -617,7 +608,7 @@ def get_leaderboard():
 def get_leaderboard_stats(user_id):
     """Get detailed stats for a user on the leaderboard"""
     try:
-        get_or_create_user(user_id)
+        ensure_user(user_id)
         analytics = get_or_create_analytics(user_id)
 
         # Get recent performance (last 7 days)
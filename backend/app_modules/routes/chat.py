@@ -1,17 +1,20 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
-from app_modules.models import db, ChatMessage, User
+from app_modules.models import db, ChatMessage, User, Tombstone
+from app_modules.services.user_registry import ensure_user
 from app_modules.services.gemini_service import GeminiService
 from app_modules.services.fallback_service import FallbackResponseService
+from app_modules.services.retrieval import select_context, CHAT_CONTEXT_TOKEN_BUDGET
+from app_modules.services.long_document_qa import LongDocumentQA
+from app_modules.services.chat_memory import ConversationMemory
+from app_modules.services.purger import purger
+from app_modules.services.group_commit import group_writer
+from config import Config
 
 chat_bp = Blueprint('chat', __name__, url_prefix='/api/chat')
 
-def get_or_create_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
+CHAT_HISTORY_MAX_LIMIT = 200
+CHAT_HISTORY_MAX_BYTES = Config.CHAT_HISTORY_MAX_BYTES
 
 @chat_bp.route('/ask', methods=['POST'])
 def chat_ask_question():
@@ -21,42 +24,56 @@ def chat_ask_question():
         user_id = data.get('user_id')
         question = data.get('question', '').strip()
         doc_id = data.get('doc_id')
+        mode = data.get('mode')  # 'long' forces whole-document QA, 'focused' disables it
 
         if not user_id or not question:
             return jsonify({'error': 'Missing required fields'}), 400
 
         print(f"\n💬 Question: {question}")
 
-        user = get_or_create_user(user_id)
+        ensure_user(user_id)
 
         # Get document context if available
         document_context = ""
+        doc = None
         if doc_id:
             try:
                 from app_modules.models import Document
                 doc = Document.query.get(doc_id)
                 if doc:
-                    document_context = doc.text_content[:2000]
+                    document_context = select_context(doc.id, doc.text_content, question)
             except Exception as e:
                 print(f"⚠️ Document error: {e}")
 
-        # Try Gemini AI
-        answer = GeminiService.get_response(question, document_context)
-        if answer:
-            print("✅ Gemini response")
-        else:
-            answer = FallbackResponseService.get_response(question, document_context)
+        # Questions about the whole of a document too long for the context
+        # budget are answered map-reduce over all of its sections
+        answer = None
+        answer_mode = 'chat'
+        long_document = doc is not None and len(doc.text_content or '') > CHAT_CONTEXT_TOKEN_BUDGET * 4
+        if long_document and (mode == 'long' or (mode != 'focused' and LongDocumentQA.wants_whole_document(question))):
+            result = LongDocumentQA.answer(question, doc.text_content, user_id=user_id)
+            if result:
+                answer, answer_mode = result['answer'], 'long_document'
+                print("✅ Long-document answer")
+
+        # Try Gemini AI with the bounded conversation history
+        if not answer:
+            history = ConversationMemory.render(user_id)
+            answer = GeminiService.get_response(question, document_context, user_id=user_id, history=history)
+            if answer:
+                print("✅ Gemini response")
+        if not answer:
+            answer = FallbackResponseService.get_response(question, document_context, doc_id=doc.id if doc else None,
+                                                          document_text=doc.text_content if doc else None)
+            answer_mode = 'fallback'
             print("📝 Fallback response")
 
-        # Save message to database
+        # Save message to database (group-committed with concurrent writes; waits until durable)
+        chat_message = None
         try:
-            chat_message = ChatMessage(
-                user_id=user_id,
-                question=question,
-                answer=answer
-            )
-            db.session.add(chat_message)
-            db.session.commit()
+            message_id = group_writer.write(
+                db.insert(ChatMessage).values(user_id=user_id, question=question, answer=answer))
+            chat_message = db.session.get(ChatMessage, message_id)
             print("💾 Message saved to database")
         except Exception as e:
             print(f"⚠️ Failed to save message: {e}")
@@ -65,7 +82,8 @@ def chat_ask_question():
         return jsonify({
             'answer': answer,
             'question': question,
-            'timestamp': chat_message.timestamp.isoformat() if chat_message else None
+            'mode': answer_mode,
+            'timestamp': chat_message.timestamp.isoformat() if chat_message and chat_message.timestamp else None
         })
 
     except Exception as e:
@@ -73,17 +91,47 @@ def chat_ask_question():
         db.session.rollback()
         return jsonify({'answer': 'I encountered an error. Please try again!'}), 200
 
+def _parse_cursor(value):
+    """'<iso timestamp>,<id>' -> (timestamp as SQLite stores it, id); raises ValueError"""
+    timestamp, message_id = value.rsplit(',', 1)
+    timestamp = datetime.fromisoformat(timestamp.strip())
+    # server_default=now() stores 'YYYY-MM-DD HH:MM:SS'; compare against the same text form
+    stored = timestamp.strftime('%Y-%m-%d %H:%M:%S.%f' if timestamp.microsecond else '%Y-%m-%d %H:%M:%S')
+    return stored, int(message_id)
+
+
 @chat_bp.route('/history/<user_id>', methods=['GET'])
 def get_chat_history(user_id):
-    """Get all chat messages for a user"""
+    """
+    Get a page of a user's chat messages, oldest first.
+    Pass the returned nextCursor as ?before= to load older messages.
+    Pages stop at `limit` messages or CHAT_HISTORY_MAX_BYTES of text.
+    """
     try:
-        limit = request.args.get('limit', 50, type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), CHAT_HISTORY_MAX_LIMIT)
 
-        messages = ChatMessage.query\
-            .filter_by(user_id=user_id)\
-            .order_by(ChatMessage.timestamp.desc())\
-            .limit(limit)\
-            .all()
+        query = ChatMessage.query.filter_by(user_id=user_id)
+        before = request.args.get('before')
+        if before:
+            try:
+                timestamp, message_id = _parse_cursor(before)
+            except ValueError:
+                return jsonify({'error': 'before must be "<timestamp>,<id>"'}), 400
+            # Compared as stored text so the range is served by the (user_id, timestamp, id) index
+            stored = db.type_coerce(ChatMessage.timestamp, db.String)
+            query = query.filter(stored <= timestamp, db.or_(stored < timestamp, ChatMessage.id < message_id))
+
+        messages = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        page, size = [], 0
+        for msg in messages:
+            size += len(msg.question.encode('utf-8')) + len(msg.answer.encode('utf-8'))
+            if page and size > CHAT_HISTORY_MAX_BYTES:
+                has_more = True
+                break
+            page.append(msg)
 
         chat_history = [{
             'id': msg.id,
@@ -91,13 +139,15 @@ def get_chat_history(user_id):
             'answer': msg.answer,
             'timestamp': msg.timestamp.isoformat(),
             'type': 'history'
-        } for msg in reversed(messages)]
+        } for msg in reversed(page)]
 
         print(f"📚 Loaded {len(chat_history)} messages for user {user_id}")
 
         return jsonify({
             'messages': chat_history,
-            'count': len(chat_history)
+            'count': len(chat_history),
+            'hasMore': has_more,
+            'nextCursor': f'{page[-1].timestamp.isoformat()},{page[-1].id}' if has_more else None
         })
 
     except Exception as e:
@@ -106,10 +156,15 @@ def get_chat_history(user_id):
 
 @chat_bp.route('/clear/<user_id>', methods=['DELETE'])
 def clear_chat_history(user_id):
-    """Clear all chat history for a user"""
+    """Clear all chat history for a user (hidden now, purged in the background)"""
     try:
-        deleted = ChatMessage.query.filter_by(user_id=user_id).delete()
+        deleted, through = db.session.query(db.func.count(ChatMessage.id), db.func.max(ChatMessage.id))\
+            .filter(ChatMessage.user_id == user_id).one()
+        if through:
+            db.session.add(Tombstone(kind='chat_history', user_id=user_id, cleared_through=through))
+        ConversationMemory.reset(user_id)
         db.session.commit()
+        purger.notify()
 
         print(f"🗑️ Cleared {deleted} messages for user {user_id}")
 
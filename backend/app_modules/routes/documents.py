@@ -2,9 +2,16 @@ from flask import Blueprint, request, jsonify, send_from_directory
 import io
 import PyPDF2
 import os # NEW: for file path operations
-from app_modules.models import db, Document, User
+from datetime import datetime
+from app_modules.models import db, Document, User, Tombstone
+from app_modules.services.user_registry import ensure_user
 # Assuming ai_engine is available for generate_summary
 from ai_engine import generate_summary 
+from app_modules.services.retrieval import document_index_cache
+from app_modules.services.local_qa import sentence_index_cache
+from app_modules.services.library_graph import LibraryGraphService
+from app_modules.services.purger import purger
+from app_modules.services.search_index import SearchService
 
 documents_bp = Blueprint('documents', __name__, url_prefix='/api')
 
@@ -13,15 +20,6 @@ documents_bp = Blueprint('documents', __name__, url_prefix='/api')
 # It's best practice to put this outside the app module, but here for completeness.
 UPLOAD_FOLDER = 'user_documents'
 
-def get_or_create_user(user_id):
-    """Get existing user or create new one with Clerk ID"""
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
-
 # --- Consolidated Upload Route (Updated) ---
 @documents_bp.route('/upload', methods=['POST'])
 def upload_document():
@@ -31,7 +29,7 @@ def upload_document():
         if not user_id:
             return jsonify({'error': 'User authentication required'}), 401
         
-        user = get_or_create_user(user_id)
+        ensure_user(user_id)
 
         if 'file' not in request.files:
             return jsonify({'error': 'No file part in the request'}), 400
@@ -84,11 +82,27 @@ def upload_document():
             text_content=text, 
             summary=summary,
             difficulty=difficulty,
-            user_id=user.id 
+            user_id=user_id
         )
         db.session.add(new_doc)
         db.session.commit()
 
+        # 7. Build the chat retrieval indexes while the text is in hand, and store the
+        #    same chunks for full-text search
+        index = document_index_cache.build(new_doc.id, text)
+        sentence_index_cache.build(new_doc.id, text)
+        try:
+            SearchService.index_document(new_doc, index.chunks)
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Search indexing failed: {e}")
+
+        # 8. Merge the document's concepts into the user's library graph
+        try:
+            LibraryGraphService.add_document(new_doc)
+        except Exception as e:
+            print(f"⚠️ Library graph update failed: {e}")
+
         return jsonify({
             'message': 'Document uploaded and processed successfully',
             'doc_id': new_doc.id,
@@ -205,21 +219,40 @@ def load_documents(user_id):
 
 @documents_bp.route('/documents/<doc_id>', methods=['DELETE'])
 def delete_document(doc_id):
-    """Deletes a specific document by its ID and its corresponding file."""
+    """
+    Deletes a document: it disappears immediately (tombstone), while its
+    quiz data, search chunks, row and file are purged in small batches in the background.
+    """
     try:
-        document = Document.query.get(doc_id)
+        document = db.session.get(Document, doc_id)
 
         if not document:
             return jsonify({'message': 'Document not found'}), 404
 
-        # --- File Deletion ---
         file_path = os.path.join(UPLOAD_FOLDER, document.user_id, document.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        # --- Database Deletion ---
-        db.session.delete(document)
+        purge_path = f'{file_path}.{document.id}.deleted' if os.path.exists(file_path) else None
+
+        # --- Database: tombstone now, purge later ---
+        # The cached knowledge graph is keyed by content and may serve other copies
+        # of this text, so it stays; only this document's own caches are dropped.
+        document.deleted_at = datetime.utcnow()
+        db.session.add(Tombstone(kind='document', user_id=document.user_id, target_id=document.id,
+                                 file_path=purge_path))
         db.session.commit()
+        document_index_cache.invalidate(doc_id)
+        sentence_index_cache.invalidate(doc_id)
+        try:
+            LibraryGraphService.remove_document(document)
+        except Exception as e:
+            print(f"⚠️ Library graph update failed: {e}")
+
+        # --- File: once the delete is committed, move aside so a re-upload under the same name is not purged ---
+        if purge_path:
+            try:
+                os.replace(file_path, purge_path)
+            except OSError as e:
+                print(f"⚠️ Could not move {file_path} aside for purging: {e}")
+        purger.notify()
 
         return jsonify({'message': 'Document and associated file deleted successfully'}), 200
 
@@ -1,10 +1,70 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app_modules.models import db, Document, User
 from app_modules.services.gemini_service import GeminiService
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.explanation_cache import ExplanationCacheService
+from app_modules.services.artifact_queue import artifact_queue
+from app_modules.services.graph_cache import KnowledgeGraphCacheService
+from app_modules.services.library_graph import LibraryGraphService
 from app_modules.utils.graph_builder import build_graph_structure
 
 knowledge_graph_bp = Blueprint('knowledge_graph', __name__, url_prefix='/api/knowledge-graph')
 
+def _graph_response(body, etag, source):
+    """JSON graph response with an ETag; 304 when the client already has this version"""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['X-Graph-Cache'] = source
+    return response
+
+
+def _knowledge_graph(doc):
+    """Serve the cached graph for the document's content, generating it on a miss"""
+    entry = KnowledgeGraphCacheService.lookup(doc)
+    if entry:
+        print(f"📦 Graph for {doc.filename} served from cache")
+        return _graph_response(*KnowledgeGraphCacheService.render(doc, entry), 'hit')
+
+    print(f"📊 Generating graph for: {doc.filename}")
+
+    if not get_provider().is_available():
+        # Offline: local TextRank concepts, left uncached so a configured provider replaces them
+        concepts = GeminiService.extract_concepts_simple(doc.text_content)
+        print(f"✅ Extracted {len(concepts)} concepts (textrank)")
+        return jsonify(build_graph_structure(concepts, doc.filename, 'textrank'))
+
+    concepts = GeminiService.extract_concepts(doc.text_content, fallback=False, user_id=doc.user_id)
+    if concepts is None:
+        # Gemini failed (e.g. rate limited): serve the heuristic graph uncached
+        # and let the retry queue replace it with the AI graph later
+        concepts = GeminiService.extract_concepts_simple(doc.text_content)
+        graph = build_graph_structure(concepts, doc.filename, 'simple')
+        graph['pendingUpgrade'] = artifact_queue.enqueue('concepts', doc) is not None
+        print(f"✅ Extracted {len(concepts)} concepts (simple)")
+        return jsonify(graph)
+    print(f"✅ Extracted {len(concepts)} concepts (ai)")
+
+    # Explain every node up front in one call so node clicks are cache reads
+    try:
+        stored = ExplanationCacheService.prime(doc, concepts[:7])
+        if stored:
+            print(f"🧠 Cached {stored} concept explanations")
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Explanation priming failed: {e}")
+
+    body, etag = KnowledgeGraphCacheService.store(doc, concepts)
+    try:
+        # Swap the heuristic concepts the upload added for the AI ones
+        LibraryGraphService.add_document(doc, concepts)
+    except Exception as e:
+        print(f"⚠️ Library graph update failed: {e}")
+    return _graph_response(body, etag, 'miss')
+
+
 @knowledge_graph_bp.route('/generate', methods=['POST'])
 def generate_knowledge_graph():
     try:
@@ -16,13 +76,59 @@ def generate_knowledge_graph():
         if not doc:
             return jsonify({'error': f'Document with ID {doc_id} not found'}), 404
 
-        print(f"📊 Generating graph for: {doc.filename}")
+        return _knowledge_graph(doc)
 
-        concepts = GeminiService.extract_concepts(doc.text_content)
-        generator_type = 'ai' if concepts else 'simple'
-        print(f"✅ AI extracted {len(concepts)} concepts")
+    except Exception as e:
+        print(f"💥 Fatal Error in knowledge graph: {e}")
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify(build_graph_structure(concepts, doc.filename, generator_type))
+@knowledge_graph_bp.route('/library', methods=['GET'])
+def get_library_graph():
+    """Concept graph across all of a user's documents; honours If-None-Match"""
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'User ID is required'}), 400
+        return _graph_response(*LibraryGraphService.get(user_id))
+
+    except Exception as e:
+        print(f"💥 Fatal Error in library graph: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@knowledge_graph_bp.route('/library/subgraph', methods=['GET'])
+def get_library_subgraph():
+    """
+    Level-of-detail view of the library graph with precomputed positions:
+    ?focus=<concept>&hops=1 for a neighbourhood, otherwise the most central
+    concepts; paged with ?limit=&page=.
+    """
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'User ID is required'}), 400
+        result = LibraryGraphService.subgraph(
+            user_id,
+            focus=request.args.get('focus'),
+            hops=request.args.get('hops', 1, type=int),
+            limit=request.args.get('limit', type=int),
+            page=request.args.get('page', 0, type=int)
+        )
+        if result is None:
+            return jsonify({'error': f"Concept '{request.args.get('focus')}' is not in this library"}), 404
+        return _graph_response(*result, 'stored')
+
+    except Exception as e:
+        print(f"💥 Fatal Error in library subgraph: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@knowledge_graph_bp.route('/<doc_id>', methods=['GET'])
+def get_knowledge_graph(doc_id):
+    """Cacheable GET variant of /generate; honours If-None-Match"""
+    try:
+        doc = Document.query.get(doc_id)
+        if not doc:
+            return jsonify({'error': f'Document with ID {doc_id} not found'}), 404
+        return _knowledge_graph(doc)
 
     except Exception as e:
         print(f"💥 Fatal Error in knowledge graph: {e}")
@@ -34,14 +140,16 @@ def explain_concept(concept):
     try:
         print(f"💭 Explaining concept: {concept}")
 
-        context = ""
-        doc_id = request.json.get('doc_id')
-        if doc_id:
-            doc = Document.query.get(doc_id)
-            if doc:
-                context = doc.text_content[:2000]
+        doc_id = (request.json or {}).get('doc_id')
+        doc = Document.query.get(doc_id) if doc_id else None
+        if doc:
+            explanation_data, source = ExplanationCacheService.get(doc, concept)
+            print(f"✅ Explanation for '{concept}' served from {source}")
+            if source == 'fallback' and artifact_queue.enqueue('explanation', doc, concept):
+                explanation_data = {**explanation_data, 'pendingUpgrade': True}
+            return jsonify(explanation_data)
 
-        explanation_data = GeminiService.explain_concept(concept, context)
+        explanation_data = GeminiService.explain_concept(concept, user_id=(request.json or {}).get('user_id'))
         print(f"✅ AI explanation generated for '{concept}'")
         return jsonify(explanation_data)
 
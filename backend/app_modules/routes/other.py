@@ -3,18 +3,12 @@ import re
 import requests
 from bs4 import BeautifulSoup
 from app_modules.models import db, User
+from app_modules.services.user_registry import get_or_create_user
 from ai_engine import generate_summary, generate_quiz
+from app_modules.services.usage_ledger import usage_ledger
 
 other_bp = Blueprint('other', __name__, url_prefix='/api')
 
-def get_or_create_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
-
 @other_bp.route('/eli5', methods=['POST'])
 def get_eli5_explanation():
     try:
@@ -112,6 +106,8 @@ def subscribe(user_id):
         bonus_points = {'free': 100, 'basic': 500, 'pro': 2000}
         user.points += bonus_points.get(plan_id, 0)
         db.session.commit()
+        # Only once the plan is stored, so budgets never follow a rolled-back change
+        usage_ledger.set_plan(user_id, plan_id)
 
         return jsonify({
             'success': True,
@@ -174,3 +170,64 @@ def debug_gemini():
     from app_modules.services.gemini_service import GeminiService
     result = GeminiService.test_connection()
     return jsonify(result)
+
+
+@other_bp.route('/debug/llm-metrics', methods=['GET'])
+def debug_llm_metrics():
+    """Concurrency, deadline and circuit breaker state of the shared LLM client"""
+    from app_modules.services.llm_client import llm_client
+    from app_modules.services.artifact_queue import artifact_queue
+    from app_modules.services.micro_batcher import micro_batcher
+    return jsonify({**llm_client.metrics(), 'micro_batching': micro_batcher.metrics(),
+                    'retry_queue': artifact_queue.metrics()})
+
+
+@other_bp.route('/debug/purge-metrics', methods=['GET'])
+def debug_purge_metrics():
+    """Backlog of tombstoned chat history and documents awaiting the background purger"""
+    from app_modules.services.purger import purger
+    return jsonify(purger.metrics())
+
+
+@other_bp.route('/debug/write-metrics', methods=['GET'])
+def debug_write_metrics():
+    """Group-commit writer queue, batch sizes and commit latency, plus the SQLite settings in effect"""
+    from app_modules.services.group_commit import group_writer
+    from app_modules.utils.sqlite_profile import current_settings
+    return jsonify({**group_writer.metrics(), 'sqlite': current_settings(db.engine)})
+
+
+@other_bp.route('/debug/llm-usage', methods=['GET'])
+def debug_llm_usage():
+    """Today's LLM calls, prompt/response sizes and latency per operation and per user"""
+    from datetime import datetime
+    from app_modules.models import LLMUsage
+    usage_ledger.flush()
+    day_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    columns = (db.func.count(LLMUsage.id), db.func.sum(LLMUsage.prompt_chars), db.func.sum(LLMUsage.response_chars),
+               db.func.avg(LLMUsage.latency_ms), db.func.sum(db.case((LLMUsage.cached.is_(True), 1), else_=0)))
+
+    def summarize(key, rows):
+        return [{key: name, 'calls': calls, 'prompt_chars': prompt or 0, 'response_chars': response or 0,
+                 'avg_latency_ms': round(latency or 0), 'cached': cached or 0}
+                for name, calls, prompt, response, latency, cached in rows]
+
+    today = LLMUsage.created_at >= day_start
+    by_operation = db.session.query(LLMUsage.operation, *columns).filter(today)\
+        .group_by(LLMUsage.operation).order_by(db.func.count(LLMUsage.id).desc()).all()
+    by_user = db.session.query(LLMUsage.user_id, *columns).filter(today, LLMUsage.user_id.isnot(None))\
+        .group_by(LLMUsage.user_id).order_by(db.func.count(LLMUsage.id).desc()).limit(50).all()
+    outcomes = dict(db.session.query(LLMUsage.outcome, db.func.count(LLMUsage.id)).filter(today)
+                    .group_by(LLMUsage.outcome).all())
+    return jsonify({
+        'by_operation': summarize('operation', by_operation),
+        'top_users': summarize('user_id', by_user),
+        'outcomes': outcomes,
+        'ledger': usage_ledger.metrics(),
+    })
+
+
+@other_bp.route('/usage/<user_id>', methods=['GET'])
+def get_ai_usage(user_id):
+    """A user's AI usage today against their plan's daily budget"""
+    return jsonify(usage_ledger.usage_for(user_id))
@@ -1,20 +1,13 @@
 from flask import Blueprint, request, jsonify
 import json
 from app_modules.models import db, Quiz, QuizAttempt, Document, User
+from app_modules.services.user_registry import get_or_create_user
 from ai_engine import generate_quiz
 from adaptive_logic import AdaptiveEngine
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/api')
 adaptive_engine = AdaptiveEngine()
 
-def get_or_create_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
-
 @quiz_bp.route('/generate-quiz', methods=['POST'])
 def create_quiz():
     try:
@@ -128,20 +121,18 @@ def get_playground_quiz(quiz_id):
 
 from flask import Blueprint, request, jsonify
 import json
+import time
 from app_modules.models import db, Quiz, QuizAttempt, Document, User, QuizSession, QuestionAttempt
+from app_modules.services.user_registry import get_or_create_user
+from app_modules.services.group_commit import group_writer
 from ai_engine import generate_quiz
 from adaptive_logic import AdaptiveEngine
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/api')
 adaptive_engine = AdaptiveEngine()
 
-def get_or_create_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
+# Seconds an answer waits for its points and attempt to commit
+ANSWER_WRITE_TIMEOUT = 5
 
 @quiz_bp.route('/generate-quiz', methods=['POST'])
 def create_quiz():
@@ -214,69 +205,75 @@ def submit_answer():
         correct = user_answer == question['correct']
 
         points_awarded = 0
+        writes = []
         if correct:
             difficulty_points = {'easy': 5, 'medium': 10, 'hard': 20}
             points_awarded = difficulty_points.get(quiz.difficulty, 10)
-            user.points += points_awarded
+            # Atomic increment, so concurrent answers batched together all count
+            writes.append(group_writer.submit(
+                db.update(User).where(User.id == user_id).values(points=User.points + points_awarded)))
 
         # Record detailed question attempt if session metadata present
         try:
             if session_id:
                 session = QuizSession.query.get(session_id)
                 if session and session.user_id == user_id:
-                    attempt = QuestionAttempt(
-                        user_id=user_id,
-                        session_id=session_id,
-                        quiz_id=quiz_id,
-                        question_index=question_index,
-                        question_text=question_text_override or question.get('question'),
-                        question_topic=question_topic,
-                        difficulty=question_difficulty_override or question.get('difficulty') or quiz.difficulty,
-                        user_answer=user_answer,
-                        correct_answer=question['correct'],
-                        is_correct=correct,
-                        time_spent=time_spent,
-                        attempts_on_question=attempts_on_question,
-                        powerup_used=powerup_used
-                    )
+                    attempt = {
+                        'user_id': user_id,
+                        'session_id': session_id,
+                        'quiz_id': quiz_id,
+                        'question_index': question_index,
+                        'question_text': question_text_override or question.get('question'),
+                        'question_topic': question_topic,
+                        'difficulty': question_difficulty_override or question.get('difficulty') or quiz.difficulty,
+                        'user_answer': user_answer,
+                        'correct_answer': question['correct'],
+                        'is_correct': correct,
+                        'time_spent': time_spent,
+                        'attempts_on_question': attempts_on_question,
+                        'powerup_used': powerup_used,
+                        'error_type': None
+                    }
 
                     if not correct:
-                        difficulty_value = attempt.difficulty or quiz.difficulty
+                        difficulty_value = attempt['difficulty'] or quiz.difficulty
                         if difficulty_value == 'easy':
-                            attempt.error_type = 'foundational'
+                            attempt['error_type'] = 'foundational'
                         elif difficulty_value == 'hard':
-                            attempt.error_type = 'application'
+                            attempt['error_type'] = 'application'
                         else:
                             if time_spent is not None and time_spent < 10:
-                                attempt.error_type = 'precision'
+                                attempt['error_type'] = 'precision'
                             else:
-                                attempt.error_type = 'application'
+                                attempt['error_type'] = 'application'
 
-                    db.session.add(attempt)
+                    writes.append(group_writer.submit(db.insert(QuestionAttempt).values(**attempt)))
         except Exception as analytics_error:
             # Do not block quiz flow if analytics logging fails
-            db.session.rollback()
             print(f"⚠️ Question logging failed: {analytics_error}")
-            # Ensure user points persist if previously updated
-            if points_awarded > 0:
-                db.session.add(user)
-                db.session.commit()
-            return jsonify({
-                'correct': correct,
-                'explanation': question.get('explanation', ''),
-                'correct_answer': question['correct'],
-                'points_awarded': points_awarded,
-                'total_points': user.points
-            })
 
-        db.session.commit()
+        # Answer once the points (and attempt) are committed; concurrent answers share the commit
+        deadline = time.monotonic() + ANSWER_WRITE_TIMEOUT
+        try:
+            for write in writes:
+                try:
+                    group_writer.wait(write, timeout=max(deadline - time.monotonic(), 0))
+                except Exception as write_error:
+                    if write is writes[0] and points_awarded:
+                        raise
+                    print(f"⚠️ Question logging failed: {write_error}")
+        except Exception:
+            # Failing the answer: withdraw writes still queued, so a retried answer is not counted twice
+            for write in writes:
+                group_writer.withdraw(write)
+            raise
 
         return jsonify({
             'correct': correct,
             'explanation': question.get('explanation', ''),
             'correct_answer': question['correct'],
             'points_awarded': points_awarded,
-            'total_points': user.points
+            'total_points': user.points + points_awarded
         })
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from app_modules.services.search_index import SearchService
+
+search_bp = Blueprint('search', __name__, url_prefix='/api')
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """
+    Full-text search over the user's chat history and uploaded documents.
+    ?q=<text>&scope=all|chat|documents&limit=&page=; results are ranked
+    best first with **highlighted** snippets.
+    """
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'User ID is required'}), 400
+
+        query = request.args.get('q', '').strip()
+        result = SearchService.search(
+            user_id, query,
+            scope=request.args.get('scope', 'all'),
+            limit=request.args.get('limit', type=int),
+            page=max(request.args.get('page', 0, type=int), 0)
+        )
+        if result is None:
+            return jsonify({'error': 'Search query is required'}), 400
+
+        print(f"🔎 Search '{query}' for {user_id}: {len(result['results'])} results")
+        return jsonify({'query': query, **result})
+
+    except Exception as e:
+        print(f"❌ Search error: {e}")
+        return jsonify({'error': str(e)}), 500
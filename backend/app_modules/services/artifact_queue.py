@@ -0,0 +1,281 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from app_modules.models import db, ArtifactJob, ConceptExplanation, Document
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.explanation_cache import ExplanationCacheService
+from app_modules.services.llm_client import llm_client, CircuitBreaker
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.graph_cache import KnowledgeGraphCacheService
+from app_modules.services.library_graph import LibraryGraphService
+from config import Config
+
+
+class RetryLater(Exception):
+    """The provider still cannot produce the artifact; reschedule the job"""
+
+
+class TokenBucket:
+    """
+    Token bucket pacing retries below the provider's rate limit.
+    Holds up to `capacity` tokens refilled at `rate` tokens per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until the next token is available"""
+        with self._lock:
+            self._refill()
+            return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+
+def _run_concepts(job, doc):
+    concepts = GeminiService.extract_concepts(doc.text_content, fallback=False, user_id=doc.user_id)
+    if not concepts:
+        raise RetryLater('concept extraction still failing')
+    try:
+        ExplanationCacheService.prime(doc, concepts[:7])
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Explanation priming failed: {e}")
+    body, etag = KnowledgeGraphCacheService.store(doc, concepts)
+    LibraryGraphService.add_document(doc, concepts)
+    return concepts, {'graph': json.loads(body), 'etag': etag}
+
+
+def _run_explanation(job, doc):
+    concept = job.get_payload()['concept']
+    data, source = ExplanationCacheService.get(doc, concept)
+    if source == 'fallback':
+        raise RetryLater('concept explanation still failing')
+    return data, {'concept': concept, 'explanation': data}
+
+
+def _has_concepts(doc, concept):
+    return KnowledgeGraphCacheService.lookup(doc) is not None
+
+
+def _has_explanation(doc, concept):
+    concept_key = ConceptExplanation.normalize(concept)
+    return concept_key in ExplanationCacheService._cached(doc.content_hash(), [concept_key])
+
+
+# kind -> handler(job, doc) returning (result, notification fields)
+JOB_HANDLERS = {
+    'concepts': _run_concepts,
+    'explanation': _run_explanation,
+}
+
+# kind -> check(doc, concept) whether the upgraded artifact is in its cache
+# for the current extractor version
+JOB_ARTIFACT_CACHED = {
+    'concepts': _has_concepts,
+    'explanation': _has_explanation,
+}
+
+
+class ArtifactRetryQueue:
+    """
+    Durable SQLite-backed queue that retries LLM artifacts which fell back
+    to heuristics (e.g. during Gemini rate limiting).
+    Jobs survive restarts, are paced by a token bucket, back off
+    exponentially per job and pause while the circuit breaker is open.
+    Finished artifacts are written to their caches and clients watching the
+    document get an 'artifact_upgraded' Socket.IO event.
+    """
+
+    def __init__(self, rate_per_minute=10, burst=3, max_attempts=8, backoff_base=30, backoff_cap=1800,
+                 poll_interval=2.0):
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.poll_interval = poll_interval
+        self.stats = Counter()
+        self._app = None
+        self._socketio = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    # ------------------------------------------------------------------ producers
+
+    @staticmethod
+    def _dedupe_key(kind, document_hash, concept=None):
+        key = f'{kind}:{document_hash}'
+        return f'{key}:{ConceptExplanation.normalize(concept)}' if concept else key
+
+    def enqueue(self, kind, doc, concept=None):
+        """
+        Schedule a retry for a document artifact. Re-enqueueing an artifact
+        that is already queued is a no-op. A failed job is revived, and so
+        is a done one whose result is no longer cached (e.g. after an
+        extractor version bump), so callers serving a fallback always get
+        an upgrade. Does nothing when no provider is configured, as retries
+        cannot help.
+        """
+        if not get_provider().is_available():
+            return None
+
+        document_hash = doc.content_hash()
+        dedupe_key = self._dedupe_key(kind, document_hash, concept)
+        job = ArtifactJob.query.filter_by(dedupe_key=dedupe_key).first()
+        if job is None:
+            job = ArtifactJob(kind=kind, dedupe_key=dedupe_key, document_id=doc.id, document_hash=document_hash,
+                              payload=json.dumps({'concept': concept} if concept else {}))
+            db.session.add(job)
+        elif job.status in ('pending', 'running'):
+            return job
+        elif job.status == 'done' and JOB_ARTIFACT_CACHED[kind](doc, concept):
+            # Upgraded while the caller was building its fallback
+            return job
+        else:
+            job.status, job.attempts, job.next_attempt_at = 'pending', 0, datetime.utcnow()
+            job.document_id, job.last_error = doc.id, None
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request queued the same artifact first
+            db.session.rollback()
+            return ArtifactJob.query.filter_by(dedupe_key=dedupe_key).first()
+
+        self.stats['enqueued'] += 1
+        print(f"📥 Queued {kind} retry for document {doc.id}")
+        self._wakeup.set()
+        return job
+
+    # ------------------------------------------------------------------ worker
+
+    def start(self, app, socketio=None):
+        """Start the background worker; jobs left 'running' by a crash are requeued"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._app, self._socketio = app, socketio
+        with app.app_context():
+            ArtifactJob.__table__.create(bind=db.engine, checkfirst=True)
+            requeued = ArtifactJob.query.filter_by(status='running').update({'status': 'pending'})
+            db.session.commit()
+            if requeued:
+                print(f"♻️ Requeued {requeued} interrupted artifact jobs")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='artifact-retry-queue', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self._app.app_context():
+                    processed = self.run_pending()
+            except Exception as e:
+                print(f"⚠️ Artifact queue error: {e}")
+                processed = 0
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _backoff(self, attempts):
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** (attempts - 1)))
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def run_pending(self, limit=5):
+        """Process due jobs while tokens are available; returns the number processed"""
+        if llm_client.breaker.state == CircuitBreaker.OPEN:
+            self.stats['paused_breaker_open'] += 1
+            return 0
+
+        jobs = ArtifactJob.query.filter(
+            ArtifactJob.status == 'pending',
+            ArtifactJob.next_attempt_at <= datetime.utcnow()
+        ).order_by(ArtifactJob.next_attempt_at).limit(limit).all()
+
+        processed = 0
+        for job in jobs:
+            if not self.bucket.try_acquire():
+                self.stats['paced'] += 1
+                self._stop.wait(self.bucket.wait_time())
+                break
+            # Claim the job; another worker process may have taken it already
+            claimed = ArtifactJob.query.filter_by(id=job.id, status='pending').update({'status': 'running'})
+            db.session.commit()
+            if claimed:
+                self._process(job)
+                processed += 1
+        return processed
+
+    def _process(self, job):
+        handler = JOB_HANDLERS.get(job.kind)
+        doc = Document.query.get(job.document_id)
+        if handler is None or doc is None or doc.content_hash() != job.document_hash:
+            # Unknown kind, or the document was deleted or changed since queueing
+            job.status, job.last_error = 'failed', 'stale job'
+            db.session.commit()
+            self.stats['dropped'] += 1
+            return
+
+        job.attempts = (job.attempts or 0) + 1
+        db.session.commit()
+        try:
+            result, notification = handler(job, doc)
+        except Exception as e:
+            db.session.rollback()
+            job.last_error = str(e)[:500]
+            if job.attempts >= self.max_attempts:
+                job.status = 'failed'
+                self.stats['failed'] += 1
+                print(f"❌ Giving up on {job.kind} for document {doc.id} after {job.attempts} attempts")
+            else:
+                job.status = 'pending'
+                job.next_attempt_at = datetime.utcnow() + self._backoff(job.attempts)
+                self.stats['retried'] += 1
+            db.session.commit()
+            return
+
+        job.status, job.result, job.last_error = 'done', json.dumps(result), None
+        db.session.commit()
+        self.stats['upgraded'] += 1
+        print(f"✨ Upgraded {job.kind} for document {doc.id} after {job.attempts} attempts")
+
+        if self._socketio:
+            self._socketio.emit('artifact_upgraded', {'kind': job.kind, 'doc_id': doc.id, **notification},
+                                room=f'doc_{doc.id}')
+
+    def metrics(self):
+        counts = dict(db.session.query(ArtifactJob.status, db.func.count(ArtifactJob.id))
+                      .group_by(ArtifactJob.status).all())
+        return {'jobs': counts, 'tokens_per_minute': self.bucket.rate * 60, **self.stats}
+
+
+artifact_queue = ArtifactRetryQueue(
+    rate_per_minute=Config.LLM_RETRY_RATE_PER_MINUTE,
+    burst=Config.LLM_RETRY_BURST,
+    max_attempts=Config.LLM_RETRY_MAX_ATTEMPTS,
+    backoff_base=Config.LLM_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,163 @@
+import re
+from app_modules.models import db, ChatMessage, ChatMemory
+from app_modules.services.gemini_service import CHAT_ANSWER_FOOTER
+from app_modules.services.llm_client import llm_client
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.retrieval import estimate_tokens
+from config import Config
+
+# Turns kept verbatim before the oldest ones are folded into the summary
+CHAT_MEMORY_RECENT_TURNS = Config.CHAT_MEMORY_RECENT_TURNS
+# Older turns are folded in batches so the summary is not rewritten on every question
+CHAT_MEMORY_FOLD_BATCH = Config.CHAT_MEMORY_FOLD_BATCH
+# Hard cap for everything memory adds to a prompt (summary + recent turns)
+CHAT_MEMORY_TOKEN_BUDGET = Config.CHAT_MEMORY_TOKEN_BUDGET
+CHAT_MEMORY_SUMMARY_TOKENS = Config.CHAT_MEMORY_SUMMARY_TOKENS
+# One summary pass folds at most this many of the oldest turns / transcript tokens,
+# so a long unsummarized backlog is caught up over several questions
+CHAT_MEMORY_FOLD_MAX_TURNS = Config.CHAT_MEMORY_FOLD_MAX_TURNS
+CHAT_MEMORY_FOLD_TOKEN_BUDGET = Config.CHAT_MEMORY_FOLD_TOKEN_BUDGET
+
+
+def _truncate_tokens(text, tokens):
+    limit = max(0, tokens * 4)
+    return text if len(text) <= limit else text[:max(0, limit - 1)].rstrip() + '…'
+
+
+def _clean_answer(answer):
+    return answer.replace(CHAT_ANSWER_FOOTER, '').strip()
+
+
+def _transcript_line(message):
+    return f"Student: {message.question}\nAI: {_clean_answer(message.answer)[:600]}"
+
+
+def _fold_window(candidates, token_budget):
+    """Oldest turns whose transcript fits in `token_budget` tokens (always at least one)"""
+    window, used = [], 0
+    for m in candidates:
+        tokens = estimate_tokens(_transcript_line(m))
+        if window and used + tokens > token_budget:
+            break
+        window.append(m)
+        used += tokens
+    return window
+
+
+class ConversationMemory:
+    """
+    Bounded multi-turn memory over ChatMessage.
+    The newest turns are replayed verbatim; older ones are folded into a
+    persisted rolling summary (ChatMemory) that is extended incrementally,
+    so the history block never exceeds CHAT_MEMORY_TOKEN_BUDGET tokens
+    however long the conversation gets.
+    """
+
+    @staticmethod
+    def _summarize(previous_summary, turns, user_id=None):
+        """Extend the running summary with new turns; local compression if the LLM is unavailable"""
+        transcript = _truncate_tokens('\n'.join(_transcript_line(m) for m in turns), CHAT_MEMORY_FOLD_TOKEN_BUDGET)
+        if get_provider().is_available():
+            prompt = f"""You maintain a running summary of a tutoring conversation.
+Update the summary with the new exchanges. Keep the topics covered, what the student struggled with and any facts the student shared about themselves.
+Write at most {CHAT_MEMORY_SUMMARY_TOKENS * 3 // 4} words in plain sentences.
+
+CURRENT SUMMARY:
+{previous_summary or '(empty)'}
+
+NEW EXCHANGES:
+{transcript}
+
+UPDATED SUMMARY:"""
+            try:
+                summary = llm_client.generate(prompt, {'temperature': 0.2, 'max_output_tokens': CHAT_MEMORY_SUMMARY_TOKENS},
+                                              operation='chat_summary', user_id=user_id).strip()
+                if summary:
+                    return _truncate_tokens(summary, CHAT_MEMORY_SUMMARY_TOKENS)
+            except Exception as e:
+                print(f"⚠️ Chat summary error: {e}")
+
+        # Offline: keep the first sentence of each exchange, newest content wins the budget
+        lines = [previous_summary] if previous_summary else []
+        for m in turns:
+            first_sentence = re.split(r'(?<=[.!?])\s+', _clean_answer(m.answer), maxsplit=1)[0]
+            lines.append(f"Asked: {m.question[:120]} -> {first_sentence[:160]}")
+        summary = ' '.join(lines)
+        limit = CHAT_MEMORY_SUMMARY_TOKENS * 4
+        return summary if len(summary) <= limit else '…' + summary[-(limit - 1):]
+
+    @staticmethod
+    def load(user_id):
+        """
+        Return (summary, recent turns oldest-first), folding the oldest
+        unsummarized turns into the summary first when enough of them have
+        accumulated. A pass folds at most CHAT_MEMORY_FOLD_MAX_TURNS turns
+        within CHAT_MEMORY_FOLD_TOKEN_BUDGET, so a large backlog is worked
+        off a bounded step at a time instead of in one huge prompt.
+        """
+        memory = db.session.get(ChatMemory, user_id)
+        through_id = memory.summarized_through_id if memory else 0
+
+        def unsummarized(after_id):
+            return ChatMessage.query.filter(ChatMessage.user_id == user_id, ChatMessage.id > after_id)
+
+        pending_count = unsummarized(through_id).count()
+        if pending_count >= CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_FOLD_BATCH:
+            foldable = min(pending_count - CHAT_MEMORY_RECENT_TURNS, CHAT_MEMORY_FOLD_MAX_TURNS)
+            candidates = unsummarized(through_id).order_by(ChatMessage.id.asc()).limit(foldable).all()
+            fold = _fold_window(candidates, CHAT_MEMORY_FOLD_TOKEN_BUDGET)
+            if memory is None:
+                memory = ChatMemory(user_id=user_id, summary='', summarized_through_id=0, summarized_turns=0)
+                db.session.add(memory)
+            memory.summary = ConversationMemory._summarize(memory.summary, fold, user_id)
+            memory.summarized_through_id = fold[-1].id
+            memory.summarized_turns = (memory.summarized_turns or 0) + len(fold)
+            try:
+                db.session.commit()
+                through_id = fold[-1].id
+                print(f"🧠 Folded {len(fold)} turns into chat summary for {user_id}")
+            except Exception as e:
+                print(f"⚠️ Failed to save chat summary: {e}")
+                db.session.rollback()
+                memory = db.session.get(ChatMemory, user_id)
+
+        # Never replay more than a pass' worth of unfolded turns; older backlog waits for the next pass
+        newest = unsummarized(through_id).order_by(ChatMessage.id.desc())\
+            .limit(CHAT_MEMORY_RECENT_TURNS + CHAT_MEMORY_FOLD_BATCH - 1).all()
+        return (memory.summary if memory else ''), newest[::-1]
+
+    @staticmethod
+    def render(user_id, token_budget=None):
+        """History block for the chat prompt, guaranteed to fit in `token_budget` tokens"""
+        token_budget = token_budget or CHAT_MEMORY_TOKEN_BUDGET
+        try:
+            summary, turns = ConversationMemory.load(user_id)
+        except Exception as e:
+            print(f"⚠️ Chat memory unavailable: {e}")
+            db.session.rollback()
+            return ""
+
+        remaining = token_budget
+        sections = []
+        if summary:
+            summary_text = _truncate_tokens(summary, min(CHAT_MEMORY_SUMMARY_TOKENS, remaining // 3))
+            remaining -= estimate_tokens(summary_text)
+
+        # Newest turns get first claim on the budget
+        recent = []
+        for m in reversed(turns):
+            if remaining <= 0:
+                break
+            turn = f"Student: {m.question}\nAI: {_clean_answer(m.answer)}"
+            turn = _truncate_tokens(turn, remaining)
+            remaining -= estimate_tokens(turn)
+            recent.append(turn)
+
+        if summary:
+            sections.append(f"Summary of earlier conversation: {summary_text}")
+        sections.extend(reversed(recent))
+        return '\n\n'.join(sections)
+
+    @staticmethod
+    def reset(user_id):
+        ChatMemory.query.filter_by(user_id=user_id).delete()
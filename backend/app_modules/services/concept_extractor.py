@@ -0,0 +1,174 @@
+import re
+from collections import Counter
+import numpy as np
+from app_modules.services.retrieval import STOPWORDS
+from config import Config
+
+CONCEPT_MAX_CANDIDATES = Config.CONCEPT_MAX_CANDIDATES
+CONCEPT_MAX_CHARS = Config.CONCEPT_MAX_CHARS
+
+# Document furniture that is frequent but never a concept
+_NOISE = frozenset("""
+chapter chapters figure figures fig table tables page pages section sections example examples exercise exercises
+question questions answer answers unit lesson summary review introduction conclusion appendix note notes students
+student also may might must can one two three first second third use used using however therefore thus within
+without many much several various per etc like get got make made shown see called known include includes including
+place way ways thing things part parts kind kinds type types lot
+""".split())
+# Common verbs of expository text; without a POS tagger these would end up inside phrases
+_VERBS = frozenset("""
+take takes took taken occur occurs occurred cover covers show shows contain contains produce produces help helps
+convert converts absorb absorbs split splits fix fixes break breaks provide provides allow allows involve involves
+become becomes find finds lead leads require requires describe describes consist consists cause causes mean means
+keep keeps give gives gets go goes went come comes let lets say says seem seems tend tends begin begins
+perform performs carry carries depend depends refer refers explain explains determine determines remain remains
+""".split())
+_STOP = STOPWORDS | _NOISE | _VERBS
+
+# Words (with inner hyphens), sentence ends, and any other run of symbols/digits (a phrase boundary)
+_TOKEN_RE = re.compile(r"[a-z](?:[a-z-]*[a-z])?|[.!?;:]|[^a-z\s.!?;:]+")
+_SENTENCE_END = frozenset('.!?;:')
+_PHRASE_WORDS = 3
+
+
+def _edge_word(word):
+    """Adverbs and participles rarely start or end a noun phrase"""
+    return len(word) > 4 and word.endswith(('ly', 'ed'))
+
+
+def _emit(words, phrases):
+    """Add the candidate phrase(s) of one stopword-free run of words"""
+    while words and _edge_word(words[0]):
+        words.pop(0)
+    while words and _edge_word(words[-1]):
+        words.pop()
+    if len(words) <= _PHRASE_WORDS:
+        if words:
+            phrases.add(' '.join(words))
+    else:
+        # Long runs are usually lists of terms rather than one phrase
+        for start in range(0, len(words), 2):
+            phrases.add(' '.join(words[start:start + 2]))
+
+
+def sentence_phrases(text):
+    """Candidate noun phrases (stopword-free runs of 1-3 words) of each sentence, as sets"""
+    sentences, phrases, run = [], set(), []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOP or len(token) < 3 or not token[0].isalpha():
+            if run:
+                _emit(run, phrases)
+                run = []
+            if token in _SENTENCE_END and phrases:
+                sentences.append(phrases)
+                phrases = set()
+        else:
+            run.append(token)
+    if run:
+        _emit(run, phrases)
+    if phrases:
+        sentences.append(phrases)
+    return sentences
+
+
+def textrank(matrix, damping=0.85, tolerance=1e-6, max_iterations=100):
+    """PageRank over a symmetric weighted adjacency matrix by power iteration"""
+    n = matrix.shape[0]
+    out = matrix.sum(axis=0)
+    transition = matrix / np.where(out > 0, out, 1)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        updated = (1 - damping) / n + damping * (transition @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+class ConceptExtractor:
+    """
+    Local concept extraction for offline knowledge graphs.
+    Candidate phrases are stopword-delimited runs of words; a sentence x
+    phrase incidence matrix gives their co-occurrence matrix, TextRank
+    power iteration over it ranks them, and the same matrix supplies the
+    concept-to-concept links.
+    """
+
+    @staticmethod
+    def extract(text, top_n=7, max_related=3):
+        """
+        Return [{'name', 'description', 'score', 'related': [{'name', 'weight'}]}],
+        best first; related concepts are drawn from the returned ones.
+        """
+        text = (text or '')[:CONCEPT_MAX_CHARS]
+        per_sentence = sentence_phrases(text)
+        frequency = Counter(phrase for phrases in per_sentence for phrase in phrases)
+        if not frequency:
+            return []
+
+        # Keep the matrix small: the most frequent candidates, seen at least twice when there are enough of those
+        min_count = 2 if sum(1 for count in frequency.values() if count > 1) >= top_n else 1
+        vocabulary = [p for p, count in frequency.most_common(CONCEPT_MAX_CANDIDATES) if count >= min_count]
+        column = {phrase: i for i, phrase in enumerate(vocabulary)}
+
+        rows, cols = [], []
+        for row, phrases in enumerate(per_sentence):
+            for phrase in phrases:
+                if phrase in column:
+                    rows.append(row)
+                    cols.append(column[phrase])
+        incidence = np.zeros((len(per_sentence), len(vocabulary)), dtype=np.float32)
+        incidence[rows, cols] = 1
+        cooccurrence = incidence.T @ incidence
+        counts = cooccurrence.diagonal().copy()
+        np.fill_diagonal(cooccurrence, 0)
+
+        # Multi-word phrases are more specific; favour them slightly
+        lengths = np.array([phrase.count(' ') + 1 for phrase in vocabulary])
+        scores = textrank(cooccurrence) * (1 + 0.25 * (lengths - 1)) * np.log1p(counts)
+
+        chosen = []
+        for i in np.argsort(-scores):
+            words = set(vocabulary[i].split())
+            # Skip phrases already covered by (or covering) a better one, e.g. 'cell' vs 'cell membrane'
+            if any(words <= set(vocabulary[j].split()) or set(vocabulary[j].split()) <= words for j in chosen):
+                continue
+            chosen.append(i)
+            if len(chosen) == top_n:
+                break
+
+        links = cooccurrence[np.ix_(chosen, chosen)]
+        top = links.max() or 1
+        concepts = []
+        for position, i in enumerate(chosen):
+            name, description = ConceptExtractor._surface(text, vocabulary[i])
+            related = [(float(links[position, other] / top), other) for other in range(len(chosen))
+                       if other != position and links[position, other] > 0]
+            concepts.append({
+                'name': name,
+                'description': description or f'A key concept mentioned {int(counts[i])} times in the document.',
+                'score': round(float(scores[i]), 5),
+                'related': [{'index': other, 'weight': round(weight, 3)}
+                            for weight, other in sorted(related, reverse=True)[:max_related]],
+            })
+        for concept in concepts:
+            for link in concept['related']:
+                link['name'] = concepts[link.pop('index')]['name']
+        return concepts
+
+    @staticmethod
+    def _surface(text, phrase):
+        """The phrase as first written in the text, and the sentence it first appears in"""
+        pattern = r'\b' + r'[\s-]+'.join(re.escape(word) for word in phrase.split()) + r'\b'
+        match = re.search(pattern, text, re.IGNORECASE)
+        if not match:
+            return phrase.title(), None
+        name = match.group(0)
+        if name.islower():
+            name = ' '.join(word.capitalize() for word in name.split())
+        start = max(text.rfind('.', 0, match.start()), text.rfind('\n', 0, match.start())) + 1
+        end = text.find('.', match.end())
+        sentence = ' '.join(text[start:end + 1 if end != -1 else len(text)].split())
+        if len(sentence) > 200:
+            sentence = sentence[:197].rsplit(' ', 1)[0] + '...'
+        return name[:60], sentence
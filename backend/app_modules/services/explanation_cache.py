@@ -0,0 +1,83 @@
+import json
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app_modules.models import db, ConceptExplanation
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.retrieval import select_context
+
+
+class ExplanationCacheService:
+    """Concept explanations persisted per (document content hash, concept)"""
+
+    @staticmethod
+    def _cached(document_hash, concept_keys):
+        if not concept_keys:
+            return {}
+        rows = ConceptExplanation.query.filter(
+            ConceptExplanation.document_hash == document_hash,
+            ConceptExplanation.concept_key.in_(concept_keys)
+        ).all()
+        return {row.concept_key: row for row in rows}
+
+    @staticmethod
+    def _row(document_hash, concept, data):
+        return {
+            'document_hash': document_hash,
+            'concept_key': ConceptExplanation.normalize(concept),
+            'concept': concept[:200],
+            'explanation': data['explanation'],
+            'key_points': json.dumps(data.get('keyPoints', [])),
+        }
+
+    @staticmethod
+    def _store(rows):
+        """Insert explanations, skipping any another request cached first (theirs is as good as ours)"""
+        result = db.session.execute(
+            sqlite_insert(ConceptExplanation.__table__).on_conflict_do_nothing(index_elements=['document_hash', 'concept_key']),
+            rows)
+        db.session.commit()
+        return max(result.rowcount, 0)
+
+    @staticmethod
+    def prime(doc, concepts):
+        """
+        Explain every graph concept missing from the cache with one batched
+        LLM call. Returns the number of explanations stored.
+        """
+        document_hash = doc.content_hash()
+        names = [c['name'] for c in concepts if c.get('name')]
+        cached = ExplanationCacheService._cached(document_hash, [ConceptExplanation.normalize(n) for n in names])
+        missing = [n for n in names if ConceptExplanation.normalize(n) not in cached]
+        if not missing:
+            return 0
+
+        context = select_context(doc.id, doc.text_content, ' '.join(missing))
+        explanations = GeminiService.explain_concepts_batch(missing, context, user_id=doc.user_id)
+
+        wanted = {ConceptExplanation.normalize(n): n for n in missing}
+        rows = []
+        for name, data in explanations.items():
+            concept = wanted.pop(ConceptExplanation.normalize(name), None)
+            if concept:
+                rows.append(ExplanationCacheService._row(document_hash, concept, data))
+        return ExplanationCacheService._store(rows) if rows else 0
+
+    @staticmethod
+    def get(doc, concept):
+        """
+        Return (explanation, source) where source is 'cache', 'ai' or
+        'fallback'. Misses are generated one at a time and cached; fallback
+        explanations are never cached so a later request can upgrade them.
+        """
+        document_hash = doc.content_hash()
+        concept_key = ConceptExplanation.normalize(concept)
+        row = ExplanationCacheService._cached(document_hash, [concept_key]).get(concept_key)
+        if row:
+            return row.to_dict(), 'cache'
+
+        context = select_context(doc.id, doc.text_content, concept)
+        data = GeminiService.explain_concept(concept, context, fallback=False, user_id=doc.user_id)
+        if not data or not data.get('explanation'):
+            return GeminiService._fallback_concept_explanation(concept), 'fallback'
+
+        ExplanationCacheService._store([ExplanationCacheService._row(document_hash, concept, data)])
+        return data, 'ai'
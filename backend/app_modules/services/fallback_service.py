@@ -1,15 +1,60 @@
 import re
+from app_modules.services.local_qa import LocalAnswerEngine
+
+# Every intent in one alternation, highest priority first, scanned once
+# over the lowercased question. Matches may only start at a word start
+# with a character some intent can begin with, which lets the scan skip
+# most positions. Keywords are whole words, so e.g. "this" or "which" no
+# longer count as "hi".
+_INTENT_RE = re.compile(r"""
+  (?<![a-z])(?=[hgtw\d])
+  (?:
+    (?P<greeting>\b(?:hello|hi|hey|greetings)\b)
+  | (?P<thanks>\b(?:thank|thx)\w*)
+  | (?P<how_are_you>\bhow\s+are\s+you\b)
+  | (?P<identity>\bwho\s+are\s+you\b|\bwhat\s+is\s+your\s+name\b)
+  | (?P<table>\btable\s+(?:of\s+)?(?P<table_a>\d+)|(?P<table_b>\d+)\s+table)
+  | (?P<mult>(?P<mult_a>\d+)\s*[x×*]\s*(?P<mult_b>\d+))
+  | (?P<add>(?P<add_a>\d+)\s*\+\s*(?P<add_b>\d+))
+  | (?P<sub>(?P<sub_a>\d+)\s*-\s*(?P<sub_b>\d+))
+  | (?P<div>(?P<div_a>\d+)\s*[/÷]\s*(?P<div_b>\d+))
+  | (?P<help>\bhelp\b|\bwhat\s+can\s+you\s+do\b)
+  )
+""", re.VERBOSE)
+
+_INTENT_PRIORITY = ['greeting', 'thanks', 'how_are_you', 'identity', 'table', 'mult', 'add', 'sub', 'div', 'help']
+
+
+def match_intent(question):
+    """
+    Scan the question once and return (intent, match) for the highest
+    priority intent found, or (None, None).
+    """
+    found = {}
+    for match in _INTENT_RE.finditer(question):
+        found.setdefault(match.lastgroup, match)
+    for intent in _INTENT_PRIORITY:
+        if intent in found:
+            return intent, found[intent]
+    return None, None
+
 
 class FallbackResponseService:
     """Fallback responses when AI is unavailable"""
 
     @staticmethod
-    def get_response(question, document_context=""):
-        """Get fallback response based on question type"""
+    def get_response(question, document_context="", doc_id=None, document_text=None):
+        """
+        Get fallback response based on question type.
+        Document questions are answered extractively from `document_text`
+        (whole document, index cached by `doc_id`) or else from the selected
+        `document_context`.
+        """
         q = question.lower().strip()
+        intent, match = match_intent(q)
 
         # Greetings
-        if any(w in q for w in ['hello', 'hi', 'hey', 'greetings']):
+        if intent == 'greeting':
             return """Hello! 👋 I'm **IntelliLearn AI**, your study companion!
 
 I can help with:
@@ -20,20 +65,19 @@ I can help with:
 What would you like to learn today?"""
 
         # Gratitude
-        if any(w in q for w in ['thank', 'thanks', 'thx']):
+        if intent == 'thanks':
             return "You're very welcome! 😊 Keep asking questions - that's how we learn best! What else can I help you with?"
 
         # Personal questions
-        if 'how are you' in q:
+        if intent == 'how_are_you':
             return "I'm doing great! 🤖✨ Ready to help you learn anything. What topic interests you today?"
 
-        if 'who are you' in q or 'what is your name' in q:
+        if intent == 'identity':
             return "I'm IntelliLearn AI, powered by Google Gemini! Your 24/7 study assistant for ANY subject. What can I help you learn? 🎓"
 
         # Multiplication tables
-        table_match = re.search(r'table\s+(?:of\s+)?(\d+)|(\d+)\s+table', q)
-        if table_match:
-            num = int(table_match.group(1) or table_match.group(2))
+        if intent == 'table':
+            num = int(match.group('table_a') or match.group('table_b'))
             if num > 100:
                 return "That's quite large! Try a number between 1-20 for practice! 😊"
 
@@ -55,9 +99,8 @@ Want another table or a different question?"""
 
         # Math calculations
         # Multiplication
-        mult = re.search(r'(\d+)\s*[x×*]\s*(\d+)', q)
-        if mult:
-            a, b = int(mult.group(1)), int(mult.group(2))
+        if intent == 'mult':
+            a, b = int(match.group('mult_a')), int(match.group('mult_b'))
             return f"""🧮 **{a} × {b} = {a * b}**
 
 💡 Think of it as: {a} groups of {b}!
@@ -65,21 +108,18 @@ Want another table or a different question?"""
 Need another calculation?"""
 
         # Addition
-        add = re.search(r'(\d+)\s*\+\s*(\d+)', q)
-        if add:
-            a, b = int(add.group(1)), int(add.group(2))
+        if intent == 'add':
+            a, b = int(match.group('add_a')), int(match.group('add_b'))
             return f"➕ **{a} + {b} = {a + b}**\n\nAnother one?"
 
         # Subtraction
-        sub = re.search(r'(\d+)\s*-\s*(\d+)', q)
-        if sub:
-            a, b = int(sub.group(1)), int(sub.group(2))
+        if intent == 'sub':
+            a, b = int(match.group('sub_a')), int(match.group('sub_b'))
             return f"➖ **{a} - {b} = {a - b}**\n\nMore practice?"
 
         # Division
-        div = re.search(r'(\d+)\s*[/÷]\s*(\d+)', q)
-        if div:
-            a, b = int(div.group(1)), int(div.group(2))
+        if intent == 'div':
+            a, b = int(match.group('div_a')), int(match.group('div_b'))
             if b == 0:
                 return "❌ Cannot divide by zero! Try a different divisor."
             result = a / b
@@ -87,8 +127,16 @@ Need another calculation?"""
                 return f"➗ **{a} ÷ {b} = {int(result)}**"
             return f"➗ **{a} ÷ {b} = {result:.2f}**"
 
+        # Document questions: best matching passages of the document
+        # (before the help menu, so "how does X help Y?" is answered)
+        if document_text or document_context:
+            answer = LocalAnswerEngine.answer(question, document_text or document_context,
+                                              doc_id if document_text else None)
+            if answer:
+                return answer
+
         # Help menu
-        if 'help' in q or 'what can you do' in q:
+        if intent == 'help':
             return """🎓 **I'm Your Universal Study Assistant!**
 
 **📚 I can help with ANY subject:**
@@ -117,7 +165,6 @@ Need another calculation?"""
 
 What would you like to learn? 😊"""
 
-        # Document context
         if document_context:
             preview = document_context[:400]
             return f"""📄 **From your study material:**
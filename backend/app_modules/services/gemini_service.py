@@ -1,24 +1,24 @@
-import re
-import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.llm_client import llm_client, CircuitOpenError, LLMBudgetExceededError
+from app_modules.services.micro_batcher import micro_batcher
+from app_modules.services.concept_extractor import ConceptExtractor
+
+CHAT_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.95,
+    'top_k': 40,
+    'max_output_tokens': 1000,
+}
+# Bump when the concept extraction prompt or parsing changes; invalidates cached graphs
+CONCEPT_EXTRACTOR_VERSION = 'concepts-v1'
+CHAT_ANSWER_FOOTER = "\n\n💡 *Have another question? I'm here to help!*"
 
 class GeminiService:
     """Service for Gemini AI interactions"""
 
     @staticmethod
-    def get_response(question, document_context=""):
-        """Get response from Google Gemini AI"""
-        if not GEMINI_API_KEY:
-            return None
-
+    def build_chat_prompt(question, document_context="", history=""):
+        """Build the study assistant prompt for a student question"""
         prompt = f"""You are IntelliLearn AI, a friendly and knowledgeable study assistant for students of all ages.
 
 GUIDELINES:
@@ -30,35 +30,63 @@ GUIDELINES:
 - For math problems, show step-by-step calculations
 - Be encouraging and supportive
 - End with a helpful follow-up question
+"""
+
+        if history:
+            prompt += f"\nCONVERSATION SO FAR:\n{history}\n\nUse the conversation to resolve follow-up questions like \"why?\" or \"give another example\".\n"
 
-STUDENT'S QUESTION: {question}"""
+        prompt += f"\nSTUDENT'S QUESTION: {question}"
 
         if document_context:
             prompt += f"\n\nSTUDENT'S STUDY MATERIAL:\n{document_context}\n\nIf the question relates to this material, reference it in your answer."
 
+        return prompt
+
+    @staticmethod
+    def get_response(question, document_context="", user_id=None, history=""):
+        """Get response from Google Gemini AI"""
+        if not get_provider().is_available():
+            return None
+
+        prompt = GeminiService.build_chat_prompt(question, document_context, history)
+
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.7,
-                    top_p=0.95,
-                    top_k=40,
-                    max_output_tokens=1000,
-                )
-            )
-            answer = response.text.strip()
-            answer += "\n\n💡 *Have another question? I'm here to help!*"
+            answer = llm_client.generate(prompt, CHAT_GENERATION_CONFIG, operation='chat', user_id=user_id).strip()
+            answer += CHAT_ANSWER_FOOTER
             return answer
+        except CircuitOpenError:
+            print("⚡ Gemini circuit open - using fallback")
+            return None
+        except LLMBudgetExceededError as e:
+            print(f"💸 {e} - using fallback")
+            return None
         except Exception as e:
             print(f"❌ Gemini error: {e}")
             return None
 
     @staticmethod
-    def extract_concepts(text):
-        """Extract key concepts from text using Gemini"""
-        if not GEMINI_API_KEY:
-            return GeminiService._extract_concepts_simple(text)
+    def stream_response(question, document_context="", user_id=None, history=""):
+        """
+        Yield the chat answer in chunks as tokens arrive.
+        Yields nothing when no provider is configured; errors propagate
+        so the caller can decide how to fall back mid-stream.
+        """
+        if not get_provider().is_available():
+            return
+
+        prompt = GeminiService.build_chat_prompt(question, document_context, history)
+        for chunk in llm_client.stream(prompt, CHAT_GENERATION_CONFIG, operation='chat_stream', user_id=user_id):
+            yield chunk
+
+    @staticmethod
+    def extract_concepts(text, fallback=True, user_id=None):
+        """
+        Extract key concepts from text using Gemini.
+        With fallback=False returns None instead of the heuristic concepts
+        when the provider is configured but the call fails.
+        """
+        if not get_provider().is_available():
+            return GeminiService.extract_concepts_simple(text)
 
         prompt = f"""From the text below, extract the 5-7 most important key concepts.
 TEXT: {text[:3000]}
@@ -66,33 +94,31 @@ Return ONLY a valid JSON array of objects. Each object must have "name" (string,
 Example: [{{"name": "Machine Learning", "description": "A field of AI focused on training models from data."}}]"""
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(prompt, generation_config={'temperature': 0.2, 'max_output_tokens': 800})
-            text_response = response.text.strip()
-            json_match = re.search(r'\[.*\]', text_response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
+            concepts = micro_batcher.generate_json(
+                prompt, {'temperature': 0.2, 'max_output_tokens': 800}, operation='extract_concepts', item_tokens=800,
+                user_id=user_id
+            )
+            if isinstance(concepts, list):
+                return concepts
         except Exception as e:
             print(f"❌ Concept extraction error: {e}")
 
-        return GeminiService._extract_concepts_simple(text)
+        return GeminiService.extract_concepts_simple(text) if fallback else None
 
     @staticmethod
-    def _extract_concepts_simple(text):
-        """Fallback concept extraction"""
-        words = re.findall(r'\b[A-Z][a-z]{3,}(?:\s+[A-Z][a-z]+)*\b', text)
-        word_freq = {}
-        for word in words:
-            if word not in ['The', 'This', 'That', 'These', 'There']:
-                word_freq[word] = word_freq.get(word, 0) + 1
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:6]
-        return [{'name': word, 'description': f'A key concept mentioned {freq} times in the document.'} for word, freq in top_words]
+    def extract_concepts_simple(text):
+        """Offline concept extraction: local TextRank, with links between related concepts"""
+        return ConceptExtractor.extract(text, top_n=7)
 
     @staticmethod
-    def explain_concept(concept, document_context=""):
-        """Get AI explanation for a concept"""
-        if not GEMINI_API_KEY:
-            return GeminiService._fallback_concept_explanation(concept)
+    def explain_concept(concept, document_context="", fallback=True, user_id=None):
+        """
+        Get AI explanation for a concept.
+        With fallback=False returns None instead of the canned explanation,
+        so callers can avoid caching a low-quality result.
+        """
+        if not get_provider().is_available():
+            return GeminiService._fallback_concept_explanation(concept) if fallback else None
 
         prompt = f"""Explain this concept for a student in 2-3 clear sentences. Also provide 3 key bullet points.
 CONCEPT: {concept}
@@ -101,17 +127,50 @@ Return ONLY a valid JSON object with "explanation" (string) and "keyPoints" (arr
 Example: {{"explanation": "...", "keyPoints": ["...", "...", "..."]}}"""
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(prompt)
-            text_response = response.text.strip()
-            json_match = re.search(r'\{.*\}', text_response, re.DOTALL)
-
-            if json_match:
-                return json.loads(json_match.group(0))
+            explanation = micro_batcher.generate_json(prompt, operation='explain_concept', item_tokens=300,
+                                                      user_id=user_id)
+            if isinstance(explanation, dict):
+                return explanation
         except Exception as e:
             print(f"❌ Concept explanation error: {e}")
 
-        return GeminiService._fallback_concept_explanation(concept)
+        return GeminiService._fallback_concept_explanation(concept) if fallback else None
+
+    @staticmethod
+    def explain_concepts_batch(concepts, document_context="", user_id=None):
+        """
+        Explain several concepts in one JSON-mode call.
+        Returns {concept name: {"explanation", "keyPoints"}} for the concepts
+        the model answered; an empty dict when the call fails.
+        """
+        if not concepts or not get_provider().is_available():
+            return {}
+
+        concept_list = '\n'.join(f'- {name}' for name in concepts)
+        prompt = f"""Explain each of these concepts for a student in 2-3 clear sentences, with 3 key bullet points each.
+CONCEPTS:
+{concept_list}
+CONTEXT: {document_context}
+Return ONLY a valid JSON array with one object per concept, each with "name" (exactly as listed), "explanation" (string) and "keyPoints" (array of strings).
+Example: [{{"name": "...", "explanation": "...", "keyPoints": ["...", "...", "..."]}}]"""
+
+        try:
+            items = llm_client.generate_json(
+                prompt, {'temperature': 0.3, 'max_output_tokens': 300 * len(concepts)}, operation='explain_concepts_batch',
+                user_id=user_id
+            )
+        except Exception as e:
+            print(f"❌ Batch explanation error: {e}")
+            return {}
+
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and item.get('name') and item.get('explanation'):
+                results[item['name']] = {
+                    'explanation': item['explanation'],
+                    'keyPoints': list(item.get('keyPoints') or [])
+                }
+        return results
 
     @staticmethod
     def _fallback_concept_explanation(concept):
@@ -124,17 +183,20 @@ Example: {{"explanation": "...", "keyPoints": ["...", "...", "..."]}}"""
     @staticmethod
     def test_connection():
         """Test Gemini connection"""
-        if not GEMINI_API_KEY:
+        provider = get_provider()
+        if not provider.is_available():
             return {'status': 'error', 'message': 'API key not found'}
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content("Say 'Hello! I am working perfectly!'")
+            # Bypass the client so the probe works even while the breaker is open
+            response_text = provider.generate("Say 'Hello! I am working perfectly!'")
             return {
                 'status': 'success',
                 'message': 'Gemini is working!',
                 'model': 'gemini-2.5-flash',
-                'test_response': response.text
+                'provider': provider.name,
+                'test_response': response_text,
+                'client': llm_client.metrics()
             }
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from sqlalchemy.exc import IntegrityError
+from app_modules.models import db, CachedKnowledgeGraph
+from app_modules.services.gemini_service import CONCEPT_EXTRACTOR_VERSION
+from app_modules.utils.graph_builder import build_graph_structure, GRAPH_STRUCTURE_VERSION
+
+KNOWLEDGE_GRAPH_VERSION = f'{CONCEPT_EXTRACTOR_VERSION}+{GRAPH_STRUCTURE_VERSION}'
+
+
+def _serialize(graph):
+    body = json.dumps(graph, sort_keys=True, separators=(',', ':'))
+    return body, hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+class KnowledgeGraphCacheService:
+    """
+    Knowledge graphs persisted per (document content hash, version).
+    Editing or re-ingesting a document changes its hash, and bumping the
+    concept extractor or graph builder version changes the version, so
+    stale graphs are never served. Only AI-generated graphs are cached;
+    heuristic ones are left for the retry queue to upgrade.
+    """
+
+    @staticmethod
+    def lookup(doc):
+        return CachedKnowledgeGraph.query.filter_by(document_hash=doc.content_hash(),
+                                                    version=KNOWLEDGE_GRAPH_VERSION).first()
+
+    @staticmethod
+    def render(doc, entry):
+        """Return (JSON body, etag) of a cached graph for this document's filename"""
+        if entry.filename == doc.filename:
+            return entry.graph, entry.etag
+        # Same content uploaded under another name: only the root label differs
+        return _serialize(build_graph_structure(entry.get_concepts(), doc.filename, entry.generator_type))
+
+    @staticmethod
+    def store(doc, concepts, generator_type='ai'):
+        """Persist a graph, replacing other versions for the same content; returns (JSON body, etag)"""
+        document_hash = doc.content_hash()
+        body, etag = _serialize(build_graph_structure(concepts, doc.filename, generator_type))
+        CachedKnowledgeGraph.query.filter(
+            CachedKnowledgeGraph.document_hash == document_hash,
+            CachedKnowledgeGraph.version != KNOWLEDGE_GRAPH_VERSION
+        ).delete(synchronize_session=False)
+        db.session.add(CachedKnowledgeGraph(
+            document_hash=document_hash,
+            version=KNOWLEDGE_GRAPH_VERSION,
+            filename=doc.filename,
+            generator_type=generator_type,
+            concepts=json.dumps(concepts),
+            graph=body,
+            etag=etag
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request cached this graph first
+            db.session.rollback()
+        return body, etag
@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from app_modules.models import db
+from config import Config
+
+
+class GroupCommitWriter:
+    """
+    Group commit for small, frequent writes (answers, chat messages).
+
+    submit() queues a Core insert/update and returns a Future. A single
+    writer thread runs everything queued within `max_delay` seconds of the
+    first waiting write (or as soon as `max_batch` are waiting) in one
+    transaction, so concurrent requests share one commit and one fsync
+    instead of paying for their own. Each future resolves once its batch
+    is durable: with the new primary key for a single-row insert, else
+    the rowcount. If a batch fails it is retried one statement per
+    transaction, so a bad write only fails its own future.
+
+    Until start() is called (scripts, benchmarks), or while the queue is
+    full, writes run inline and are committed before the future resolves,
+    without committing anything else the caller's session has pending.
+    """
+
+    def __init__(self, max_batch=256, max_delay=0.005, max_queue=20000):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self.stats = Counter()
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------ hot path
+
+    def submit(self, statement, params=None):
+        """Queue one write; the returned Future resolves when it is committed"""
+        future = Future()
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+            if running and len(self._queue) < self.max_queue:
+                self._queue.append((statement, params, future))
+                self.stats['submitted'] += 1
+                self._ready.notify()
+                return future
+        # Not running, or backed up: write synchronously rather than grow the queue without bound
+        self.stats['inline'] += 1
+        try:
+            result = self._run_inline(statement, params)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        return future
+
+    def _run_inline(self, statement, params):
+        session = db.session()
+        if not (session.new or session.dirty or session.deleted or self._holds_write_lock(session)):
+            # Nothing else pending: the caller's own connection commits just this write
+            try:
+                result = self._run(session, statement, params)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            return result
+        if self._holds_write_lock(session):
+            # SQLite has a single writer and the caller is it; another connection would wait forever
+            raise RuntimeError('commit or roll back pending writes before a group-commit write')
+        # Keep the caller's unflushed changes out of this commit
+        with db.engine.begin() as connection:
+            return self._run(connection, statement, params)
+
+    @staticmethod
+    def _holds_write_lock(session):
+        """Whether the session's connection has uncommitted writes (pysqlite only BEGINs before DML)"""
+        if not session.in_transaction():
+            return False
+        return session.connection().connection.dbapi_connection.in_transaction
+
+    def write(self, statement, params=None, timeout=5.0):
+        """Submit and wait until durable; see wait()"""
+        return self.wait(self.submit(statement, params), timeout)
+
+    def wait(self, future, timeout=5.0):
+        """
+        Wait for a submitted write; raises the write's error. A write
+        still queued after `timeout` seconds is withdrawn and TimeoutError
+        raised, so a timed-out write is never committed later; one already
+        being committed is waited for.
+        """
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if self.withdraw(future):
+                self.stats['timed_out'] += 1
+                raise
+            return future.result()
+
+    def withdraw(self, future):
+        """Remove a write from the queue before the writer takes it; False if it was already taken"""
+        with self._lock:
+            for item in self._queue:
+                if item[2] is future:
+                    self._queue.remove(item)
+                    future.cancel()
+                    return True
+        return False
+
+    # ------------------------------------------------------------------ background
+
+    def start(self, app):
+        if self._thread and self._thread.is_alive():
+            return
+        self._app = app
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='group-commit-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Commit what is queued, then stop"""
+        self._stop.set()
+        with self._lock:
+            self._ready.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self):
+        with self._app.app_context():
+            # A connection of its own: request threads waiting on their futures may hold the whole pool
+            connection = db.engine.connect()
+            try:
+                while True:
+                    batch = self._next_batch()
+                    if batch is None:
+                        return
+                    try:
+                        self._commit(connection, batch)
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        print(f"⚠️ Group commit error: {e}")
+            finally:
+                connection.close()
+
+    def _next_batch(self):
+        """Block for the first write, give others `max_delay` to join it; None once stopped and drained"""
+        with self._lock:
+            while not self._queue:
+                if self._stop.is_set():
+                    return None
+                self._ready.wait()
+            deadline = time.monotonic() + self.max_delay
+            while len(self._queue) < self.max_batch and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _commit(self, connection, batch):
+        start = time.perf_counter()
+        try:
+            with connection.begin():
+                results = [self._run(connection, statement, params) for statement, params, _ in batch]
+        except Exception as e:
+            self.stats['batch_failures'] += 1
+            print(f"⚠️ Group commit of {len(batch)} writes failed ({e}); retrying one by one")
+            for item in batch:
+                self._commit_one(connection, item)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        self.stats['batches'] += 1
+        self.stats['committed'] += len(batch)
+        self.stats['commit_ms'] += round((time.perf_counter() - start) * 1000, 3)
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+    def _commit_one(self, connection, item):
+        statement, params, future = item
+        try:
+            with connection.begin():
+                result = self._run(connection, statement, params)
+        except Exception as e:
+            self.stats['failed'] += 1
+            future.set_exception(e)
+            return
+        self.stats['committed'] += 1
+        future.set_result(result)
+
+    @staticmethod
+    def _run(executor, statement, params):
+        result = executor.execute(statement, params) if params is not None else executor.execute(statement)
+        if result.is_insert and params is None:
+            return result.inserted_primary_key[0]
+        return result.rowcount
+
+    # ------------------------------------------------------------------ reporting
+
+    def metrics(self):
+        with self._lock:
+            queued = len(self._queue)
+        batches = self.stats['batches']
+        return {
+            'queued': queued,
+            'avg_batch': round(self.stats['committed'] / batches, 1) if batches else 0,
+            'avg_commit_ms': round(self.stats['commit_ms'] / batches, 2) if batches else 0,
+            **self.stats,
+        }
+
+
+group_writer = GroupCommitWriter(
+    max_batch=Config.GROUP_COMMIT_MAX_BATCH,
+    max_delay=Config.GROUP_COMMIT_MAX_DELAY_MS / 1000,
+)
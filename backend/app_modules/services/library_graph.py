@@ -0,0 +1,426 @@
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from heapq import nlargest
+from collections import OrderedDict
+from itertools import combinations
+import networkx as nx
+import numpy as np
+from flask import current_app
+from app_modules.models import db, Document, LibraryGraph, ConceptExplanation
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.graph_cache import KnowledgeGraphCacheService
+from app_modules.services.retrieval import tokenize
+from app_modules.utils.force_layout import force_layout
+from config import Config
+
+LIBRARY_GRAPH_CACHE_SIZE = Config.LIBRARY_GRAPH_CACHE_SIZE
+LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT = Config.LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT
+LIBRARY_GRAPH_KEYWORD_EDGES = Config.LIBRARY_GRAPH_KEYWORD_EDGES
+LIBRARY_GRAPH_PAGE_SIZE = Config.LIBRARY_GRAPH_PAGE_SIZE
+# Changes within this window are written in one save; 0 saves on every change
+LIBRARY_GRAPH_SAVE_DELAY = Config.LIBRARY_GRAPH_SAVE_DELAY_SECONDS
+LIBRARY_GRAPH_MAX_PAGE_SIZE = 500
+LIBRARY_GRAPH_MAX_HOPS = 3
+LAYOUT_EXTENT = 400  # half-width in pixels of the served layout
+
+_COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#8B5CF6', '#EC4899', '#14B8A6', '#F97316', '#6366F1']
+
+
+def document_concepts(doc):
+    """Concepts of a document: the cached AI graph's when there is one, else the heuristic ones"""
+    entry = KnowledgeGraphCacheService.lookup(doc)
+    concepts = entry.get_concepts() if entry else GeminiService.extract_concepts_simple(doc.text_content)
+    return concepts[:LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT]
+
+
+def _keywords(label):
+    return frozenset(tokenize(label))
+
+
+def _keyword_weight(a, b):
+    """Jaccard overlap of two concepts' keywords"""
+    union = len(a | b)
+    return round(len(a & b) / union, 3) if union else 0.0
+
+
+class _Library:
+    """A user's networkx graph plus a keyword -> concepts index for incremental edge updates"""
+
+    def __init__(self, graph, etag=None):
+        self.graph = graph
+        self.etag = etag
+        self.dirty = False  # changed since the last save
+        self._view = None
+        self.index = {}
+        for node, data in graph.nodes(data=True):
+            for keyword in _keywords(data['label']):
+                self.index.setdefault(keyword, set()).add(node)
+
+    def _bump_edge(self, a, b, cooccurrence=0, keyword=0.0):
+        data = self.graph.get_edge_data(a, b) or {'cooccurrence': 0, 'keyword': 0.0}
+        data['cooccurrence'] += cooccurrence
+        data['keyword'] = keyword or data['keyword']
+        if data['cooccurrence'] <= 0 and not data['keyword']:
+            if self.graph.has_edge(a, b):
+                self.graph.remove_edge(a, b)
+            return
+        data['weight'] = round(data['cooccurrence'] + data['keyword'], 3)
+        self.graph.add_edge(a, b, **data)
+
+    def _add_concept(self, key, concept, doc_id):
+        if key in self.graph:
+            documents = self.graph.nodes[key]['documents']
+            if doc_id not in documents:
+                documents.append(doc_id)
+            return
+        label = concept['name'][:60]
+        self.graph.add_node(key, label=label, definition=concept.get('description', ''), documents=[doc_id])
+        # Only concepts sharing a keyword can get a keyword edge: look them up in the index
+        keywords = _keywords(label)
+        neighbours = set().union(*(self.index.get(keyword, ()) for keyword in keywords)) if keywords else set()
+        # Common words would otherwise link almost everything: keep the closest few
+        scored = ((_keyword_weight(keywords, _keywords(self.graph.nodes[other]['label'])), other) for other in neighbours)
+        for weight, other in nlargest(LIBRARY_GRAPH_KEYWORD_EDGES, scored):
+            self._bump_edge(key, other, keyword=weight)
+        for keyword in keywords:
+            self.index.setdefault(keyword, set()).add(key)
+
+    def _drop_concept(self, key, doc_id):
+        if key not in self.graph:
+            return
+        documents = self.graph.nodes[key]['documents']
+        if doc_id in documents:
+            documents.remove(doc_id)
+        if documents:
+            return
+        for keyword in _keywords(self.graph.nodes[key]['label']):
+            self.index.get(keyword, set()).discard(key)
+        self.graph.remove_node(key)
+
+    def remove_document(self, doc_id):
+        """Undo a document's contribution; returns False if it was not in the graph"""
+        entry = self.graph.graph['documents'].pop(doc_id, None)
+        if entry is None:
+            return False
+        self._view = None
+        for a, b in combinations(entry['concepts'], 2):
+            if self.graph.has_edge(a, b):
+                self._bump_edge(a, b, cooccurrence=-1)
+        for key in entry['concepts']:
+            self._drop_concept(key, doc_id)
+        return True
+
+    def add_document(self, doc_id, filename, concepts):
+        """Add (or replace) a document's concepts; returns False if nothing changed"""
+        keys, named = [], {}
+        for concept in concepts:
+            key = ConceptExplanation.normalize(concept.get('name', ''))
+            if key and key not in named:
+                keys.append(key)
+                named[key] = concept
+        previous = self.graph.graph['documents'].get(doc_id)
+        if previous and previous['concepts'] == keys:
+            return False
+        self.remove_document(doc_id)
+        self._view = None
+
+        self.graph.graph['documents'][doc_id] = {'filename': filename, 'concepts': keys}
+        for key in keys:
+            self._add_concept(key, named[key], doc_id)
+        for a, b in combinations(keys, 2):
+            self._bump_edge(a, b, cooccurrence=1)
+        return True
+
+    def layout(self):
+        """
+        Give every node without a position one. A fresh graph gets a full
+        layout; otherwise new nodes start at the centroid of their placed
+        neighbours and are relaxed against the existing layout, which stays put.
+        """
+        graph = self.graph
+        nodes = list(graph.nodes)
+        new = [i for i, node in enumerate(nodes) if 'x' not in graph.nodes[node]]
+        if not new:
+            return 0
+        index = {node: i for i, node in enumerate(nodes)}
+        pos = np.array([(graph.nodes[node].get('x', 0.0), graph.nodes[node].get('y', 0.0)) for node in nodes])
+        # Edges between placed nodes exert no force on the nodes being moved
+        edge_list = list(graph.edges([nodes[i] for i in new], data='weight'))
+        edges = np.array([(index[a], index[b]) for a, b, _ in edge_list], dtype=int).reshape(-1, 2)
+        weights = np.array([weight for _, _, weight in edge_list], dtype=float)
+
+        if len(new) == len(nodes):
+            pos = force_layout(len(nodes), edges, weights, seed=len(nodes))
+        else:
+            rng = np.random.default_rng(len(nodes))
+            placed = np.ones(len(nodes), dtype=bool)
+            placed[new] = False
+            low, high = pos[placed].min(axis=0), pos[placed].max(axis=0)
+            for i in new:
+                anchors = [index[nb] for nb in graph[nodes[i]] if placed[index[nb]]]
+                pos[i] = pos[anchors].mean(axis=0) + rng.normal(scale=0.02, size=2) if anchors \
+                    else rng.uniform(low, high)
+            pos = force_layout(len(nodes), edges, weights, positions=pos, movable=new, iterations=30,
+                               temperature=0.03)
+        for i in new:
+            graph.nodes[nodes[i]]['x'], graph.nodes[nodes[i]]['y'] = round(float(pos[i, 0]), 5), \
+                round(float(pos[i, 1]), 5)
+        self._view = None
+        return len(new)
+
+    def view(self):
+        """Per-version render state: node dicts with pixel positions, and nodes ranked by weighted degree"""
+        if self._view is not None:
+            return self._view
+        graph = self.graph
+        documents = graph.graph['documents']
+        strength = dict(graph.degree(weight='weight'))
+        top = max(strength.values(), default=0) or 1
+        coords = np.array([(data.get('x', 0.0), data.get('y', 0.0)) for _, data in graph.nodes(data=True)],
+                          dtype=float).reshape(-1, 2)
+        centre = coords.mean(axis=0) if len(coords) else np.zeros(2)
+        scale = LAYOUT_EXTENT / (max(np.abs(coords - centre).max(), 1e-9) if len(coords) else 1)
+
+        nodes = {}
+        for (node, data), (x, y) in zip(graph.nodes(data=True), (coords - centre) * scale):
+            nodes[node] = {
+                'id': node, 'label': data['label'][:30], 'definition': data['definition'],
+                'documents': [{'doc_id': doc_id, 'filename': documents[doc_id]['filename']}
+                              for doc_id in data['documents'] if doc_id in documents],
+                'degree': graph.degree(node),
+                'centrality': round(strength[node] / top, 4),
+                # fx/fy pin the node so the browser doesn't run its own force simulation
+                'x': round(float(x), 1), 'y': round(float(y), 1), 'fx': round(float(x), 1), 'fy': round(float(y), 1),
+                'size': 20 + 5 * min(len(data['documents']), 6),
+                'color': _COLORS[min(len(data['documents']), len(_COLORS)) - 1],
+                'level': 0 if len(data['documents']) > 1 else 1,
+            }
+        ranked = sorted(nodes, key=lambda node: (-strength[node], node))
+        self._view = {'nodes': nodes, 'ranked': ranked, 'rank': {node: i for i, node in enumerate(ranked)}}
+        return self._view
+
+    def subgraph(self, focus=None, hops=1, limit=LIBRARY_GRAPH_PAGE_SIZE, page=0):
+        """
+        One page of the graph: the k-hop neighbourhood of `focus` (nearest
+        first) or, without a focus, the whole graph by centrality. Links
+        join this page's nodes to each other and to nodes of earlier pages,
+        so the union of pages 0..n is the induced subgraph. None if the
+        focus concept is unknown.
+        """
+        view, graph = self.view(), self.graph
+        if focus is not None:
+            if focus not in graph:
+                return None
+            distance = nx.single_source_shortest_path_length(graph, focus, cutoff=hops)
+            candidates = sorted(distance, key=lambda node: (distance[node], view['rank'][node]))
+        else:
+            distance, candidates = None, view['ranked']
+
+        start = page * limit
+        window = candidates[start:start + limit]
+        shown = set(candidates[:start + limit])
+        on_page = set(window)
+        nodes = [{**view['nodes'][node], 'hops': distance[node]} if distance else view['nodes'][node]
+                 for node in window]
+        links = [{'source': a, 'target': b, **data} for a in window for b, data in graph[a].items()
+                 if b in shown and (b not in on_page or a < b)]
+        return {'nodes': nodes, 'links': links, 'focus': focus, 'hops': hops if focus else None, 'page': page,
+                'pageSize': limit, 'total': len(candidates), 'hasMore': start + limit < len(candidates),
+                'version': self.etag, 'generated_by': 'library'}
+
+    def serialize(self):
+        """Return (adjacency JSON, response JSON, etag)"""
+        graph = self.graph
+        adjacency = json.dumps(nx.node_link_data(graph, edges='links'), separators=(',', ':'))
+        view = self.view()
+        links = [{'source': a, 'target': b, **data} for a, b, data in graph.edges(data=True)]
+        response = json.dumps({'nodes': [view['nodes'][node] for node in graph.nodes], 'links': links,
+                               'documents': len(graph.graph['documents']), 'generated_by': 'library'},
+                              sort_keys=True, separators=(',', ':'))
+        return adjacency, response, hashlib.sha256(response.encode('utf-8')).hexdigest()[:32]
+
+
+class LibraryGraphService:
+    """
+    Per-user concept graph across all documents, kept in networkx.
+    Nodes are concepts (merged by normalised name), edges carry
+    co-occurrence counts (concepts of the same document) and keyword
+    overlap weights. Uploads, upgrades and deletes patch the graph in
+    place instead of rebuilding it, then store both the adjacency and the
+    ready-to-serve response, so reading the library graph is a single
+    row lookup however large the library is. Node positions come from a
+    server-side force layout stored with the adjacency; subgraph() serves
+    level-of-detail pages of it.
+
+    Saves are debounced: a burst of uploads within LIBRARY_GRAPH_SAVE_DELAY
+    seconds is laid out and serialized once. Reads in this process flush
+    first; other workers see the change once it is saved.
+    """
+
+    _cache = OrderedDict()  # user_id -> _Library, LRU
+    _locks = {}  # user_id -> [Lock, callers holding or waiting on it]; dropped once idle
+    _pending = {}  # user_id -> Timer of the scheduled save
+    _guard = threading.Lock()  # protects the three dicts above
+
+    @classmethod
+    @contextmanager
+    def _lock(cls, user_id):
+        with cls._guard:
+            entry = cls._locks.get(user_id)
+            if entry is None:
+                entry = cls._locks[user_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with cls._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del cls._locks[user_id]
+
+    @classmethod
+    def _load(cls, user_id):
+        """The user's graph, from the in-process LRU unless another worker has changed it since"""
+        etag = db.session.query(LibraryGraph.etag).filter_by(user_id=user_id).scalar()
+        with cls._guard:
+            library = cls._cache.get(user_id)
+        # Unsaved changes are built on the etag they were loaded at and win until their save
+        if library is None or (library.etag != etag and not library.dirty):
+            row = db.session.get(LibraryGraph, user_id) if etag else None
+            if row:
+                library = _Library(nx.node_link_graph(json.loads(row.adjacency), edges='links'), etag)
+            else:
+                library = _Library(nx.Graph(documents={}))
+        with cls._guard:
+            cls._cache[user_id] = library
+            cls._cache.move_to_end(user_id)
+            while len(cls._cache) > LIBRARY_GRAPH_CACHE_SIZE:
+                evicted, old = next(iter(cls._cache.items()))
+                if old.dirty:
+                    # Still waiting for its save; keep it rather than lose the change
+                    cls._cache.move_to_end(evicted)
+                    break
+                cls._cache.popitem(last=False)
+        return library
+
+    @classmethod
+    def _changed(cls, user_id, library):
+        """Save now, or within LIBRARY_GRAPH_SAVE_DELAY together with any further changes"""
+        library.dirty = True
+        if LIBRARY_GRAPH_SAVE_DELAY <= 0:
+            cls._save(user_id, library)
+            return
+        with cls._guard:
+            if user_id in cls._pending:
+                return
+            timer = cls._pending[user_id] = threading.Timer(
+                LIBRARY_GRAPH_SAVE_DELAY, cls._save_later, (current_app._get_current_object(), user_id))
+        # Never holds up interpreter exit; the shutdown hook flushes what is still pending
+        timer.daemon = True
+        timer.start()
+
+    @classmethod
+    def _save_later(cls, app, user_id):
+        with app.app_context():
+            try:
+                cls.flush(user_id)
+            except Exception as e:
+                print(f"⚠️ Library graph save failed for {user_id}: {e}")
+
+    @classmethod
+    def flush(cls, user_id=None):
+        """Write scheduled saves now (one user's, or everyone's)"""
+        with cls._guard:
+            users = [user_id] if user_id is not None else list(cls._pending)
+        for user in users:
+            with cls._lock(user):
+                cls._flush_locked(user)
+
+    @classmethod
+    def _flush_locked(cls, user_id):
+        with cls._guard:
+            timer = cls._pending.pop(user_id, None)
+            library = cls._cache.get(user_id)
+        if timer:
+            timer.cancel()
+        if library is not None and library.dirty:
+            return cls._save(user_id, library)
+        return None
+
+    @classmethod
+    def _save(cls, user_id, library):
+        library.layout()
+        adjacency, response, etag = library.serialize()
+        row = db.session.get(LibraryGraph, user_id)
+        if row is None:
+            row = LibraryGraph(user_id=user_id)
+            db.session.add(row)
+        row.adjacency, row.response, row.etag = adjacency, response, etag
+        row.document_count = len(library.graph.graph['documents'])
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with cls._guard:
+                cls._cache.pop(user_id, None)
+            raise
+        library.etag, library.dirty = etag, False
+        return response, etag
+
+    @classmethod
+    def add_document(cls, doc, concepts=None):
+        """Merge a document's concepts into its owner's graph (replacing any it contributed before)"""
+        concepts = document_concepts(doc) if concepts is None else concepts[:LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT]
+        with cls._lock(doc.user_id):
+            library = cls._load(doc.user_id)
+            if library.add_document(doc.id, doc.filename, concepts):
+                cls._changed(doc.user_id, library)
+                print(f"🕸️ Library graph for {doc.user_id}: {library.graph.number_of_nodes()} concepts, "
+                      f"{library.graph.number_of_edges()} edges")
+
+    @classmethod
+    def remove_document(cls, doc):
+        with cls._lock(doc.user_id):
+            library = cls._load(doc.user_id)
+            if library.remove_document(doc.id):
+                cls._changed(doc.user_id, library)
+
+    @classmethod
+    def get(cls, user_id):
+        """Return (JSON body, etag, source); builds the graph once for libraries that predate it"""
+        with cls._guard:
+            pending = user_id in cls._pending
+        if pending:
+            with cls._lock(user_id):
+                cls._flush_locked(user_id)
+        row = db.session.query(LibraryGraph.response, LibraryGraph.etag).filter_by(user_id=user_id).first()
+        if row:
+            return row.response, row.etag, 'stored'
+
+        with cls._lock(user_id):
+            library = cls._load(user_id)
+            documents = Document.query.filter_by(user_id=user_id).order_by(Document.created_at).all()
+            for doc in documents:
+                library.add_document(doc.id, doc.filename, document_concepts(doc))
+            if not documents:
+                return library.serialize()[1:] + ('empty',)
+            return cls._save(user_id, library) + ('built',)
+
+    @classmethod
+    def subgraph(cls, user_id, focus=None, hops=1, limit=None, page=0):
+        """Return (JSON body, etag) of one page of the library graph, or None for an unknown focus"""
+        if not db.session.query(LibraryGraph.etag).filter_by(user_id=user_id).scalar():
+            cls.get(user_id)
+        hops = min(max(hops, 1), LIBRARY_GRAPH_MAX_HOPS)
+        limit = min(max(limit or LIBRARY_GRAPH_PAGE_SIZE, 1), LIBRARY_GRAPH_MAX_PAGE_SIZE)
+        focus = ConceptExplanation.normalize(focus) if focus else None
+        with cls._lock(user_id):
+            library = cls._load(user_id)
+            result = library.subgraph(focus, hops, limit, max(page, 0))
+        if result is None:
+            return None
+        body = json.dumps(result, sort_keys=True, separators=(',', ':'))
+        return body, hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
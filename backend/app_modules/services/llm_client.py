@@ -0,0 +1,501 @@
+import json
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.single_flight import single_flight
+from app_modules.services.usage_ledger import usage_ledger
+from config import Config
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call cannot be served; callers should use their fallback"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """Raised when a call misses its deadline"""
+
+
+class LLMBusyError(LLMUnavailableError):
+    """Raised when no concurrency slot frees up before the deadline"""
+
+
+class LLMBudgetExceededError(LLMUnavailableError):
+    """Raised without calling the provider when the user's daily AI budget is spent"""
+
+
+def _outcome(error):
+    if isinstance(error, LLMBudgetExceededError):
+        return 'budget'
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, LLMTimeoutError):
+        return 'timeout'
+    if isinstance(error, LLMBusyError):
+        return 'busy'
+    return 'error'
+
+
+def _response_chars(value):
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, str) else len(json.dumps(value, default=str))
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+    Opens after `failure_threshold` consecutive failed calls, rejects calls
+    for `reset_timeout` seconds, then lets a single probe call through.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe slot that never reached the provider"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+            }
+
+
+class LLMClient:
+    """
+    Shared, bounded gateway for every provider call.
+
+    - a global semaphore caps in-flight upstream calls, a per-user one stops
+      a single student from monopolising them (callers that bound their own
+      fan-out pass user_slot=False and are still budgeted and charged)
+    - every call has a deadline; slow calls are abandoned instead of pinning
+      the Flask worker
+    - a hedge attempt is launched if the first one is still running after
+      `hedge_delay`, failed attempts retry with jittered exponential backoff
+    - a circuit breaker fails calls fast while the provider is unhealthy
+    - every call is recorded in the usage ledger, and refused up front once
+      the user's daily budget is spent
+    """
+
+    def __init__(self, max_concurrency=8, per_user_concurrency=2, deadline=20.0, max_attempts=2,
+                 hedge_delay=6.0, backoff_base=0.25, backoff_cap=2.0, breaker=None):
+        self.max_concurrency = max_concurrency
+        self.per_user_concurrency = per_user_concurrency
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.hedge_delay = hedge_delay
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+
+        self._global = threading.BoundedSemaphore(max_concurrency)
+        # user_id -> [semaphore, callers holding or waiting on it]; dropped once idle
+        self._user_semaphores = {}
+        self._user_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._metrics_lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._latency_total = defaultdict(float)
+        self._in_flight = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def generate(self, prompt, generation_config=None, operation='generate', user_id=None, deadline=None,
+                 coalesce=True, user_slot=True):
+        """
+        Blocking text generation through the active provider.
+        Identical concurrent prompts for the same operation share a single
+        upstream call unless `coalesce` is False.
+        """
+        provider = get_provider()
+        return self._coalesced(operation, lambda: provider.generate(prompt, generation_config),
+                               (prompt, generation_config, provider.name), user_id, deadline, coalesce, user_slot)
+
+    def generate_json(self, prompt, generation_config=None, operation='generate_json', user_id=None,
+                      deadline=None, coalesce=True, user_slot=True):
+        """
+        JSON-mode generation; returns the parsed object. A response that
+        does not parse counts as a failed attempt and is retried.
+        """
+        provider = get_provider()
+        return self._coalesced(operation, lambda: provider.generate_json(prompt, generation_config),
+                               (prompt, generation_config, provider.name, 'json'), user_id, deadline, coalesce,
+                               user_slot)
+
+    def stream(self, prompt, generation_config=None, operation='stream', user_id=None, deadline=None):
+        """
+        Yield chunks from the active provider. The deadline bounds the wait
+        for each chunk; streams are never hedged or retried because chunks
+        may already have been delivered to the client.
+        """
+        start = time.monotonic()
+        outcome, response_chars = 'ok', 0
+        try:
+            self.check_budget(user_id, len(prompt))
+            for chunk in self._stream(prompt, generation_config, operation, user_id, deadline):
+                response_chars += len(chunk)
+                yield chunk
+        except GeneratorExit:
+            outcome = 'abandoned'
+            raise
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            usage_ledger.record(operation, user_id, len(prompt), response_chars, time.monotonic() - start,
+                                outcome=outcome)
+
+    def _stream(self, prompt, generation_config, operation, user_id, deadline):
+        provider = get_provider()
+        timeout = deadline or self.deadline
+        self._admit(operation)
+        user_held = False
+        try:
+            user_held = self._acquire_user(user_id, time.monotonic() + timeout, operation)
+            if not self._acquire_global(time.monotonic() + timeout, operation):
+                raise LLMBusyError('No LLM capacity available')
+        except LLMBusyError:
+            self.breaker.release_probe()
+            if user_held:
+                self._release_user(user_id)
+            raise
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        settled = False
+
+        def pump():
+            stream = provider.stream(prompt, generation_config)
+            try:
+                for chunk in stream:
+                    if cancelled.is_set():
+                        break
+                    chunks.put(('chunk', chunk))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+            finally:
+                if cancelled.is_set() and hasattr(stream, 'close'):
+                    stream.close()
+                self._release_global()
+
+        try:
+            start = time.monotonic()
+            self._executor.submit(pump)
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    settled = True
+                    self._record_failure(operation, 'timeouts')
+                    raise LLMTimeoutError(f'{operation} stream stalled for {timeout:.1f}s')
+                if kind == 'chunk':
+                    yield value
+                elif kind == 'done':
+                    settled = True
+                    self._record_success(operation, time.monotonic() - start)
+                    return
+                else:
+                    settled = True
+                    self._record_failure(operation, 'errors')
+                    raise value
+        finally:
+            # Stop the pump (and free its global slot) if the consumer went away or we timed out
+            cancelled.set()
+            if not settled:
+                # Closed early (e.g. the socket client disconnected): neither success nor failure
+                self._count(operation, 'abandoned')
+                self.breaker.release_probe()
+            if user_held:
+                self._release_user(user_id)
+
+    def _coalesced(self, operation, fn, key_parts, user_id, deadline, coalesce, user_slot):
+        ran = []
+
+        def run():
+            ran.append(True)
+            return self.call(operation, fn, user_id=user_id, deadline=deadline, user_slot=user_slot)
+
+        prompt_chars = len(key_parts[0])
+        start = time.monotonic()
+        value, outcome = None, 'ok'
+        try:
+            self.check_budget(user_id, prompt_chars)
+            if not coalesce:
+                value = run()
+            else:
+                value = single_flight.do(single_flight.make_key(operation, *key_parts), run)
+            return value
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            # Followers of a coalesced call are recorded but not charged
+            usage_ledger.record(operation, user_id, prompt_chars, _response_chars(value), time.monotonic() - start,
+                                cached=coalesce and not ran and outcome != 'budget', outcome=outcome)
+
+    def check_budget(self, user_id, prompt_chars):
+        """Raise LLMBudgetExceededError if the user may not send another `prompt_chars` today"""
+        reason = usage_ledger.check_budget(user_id, prompt_chars)
+        if reason:
+            raise LLMBudgetExceededError(reason)
+
+    def call(self, operation, fn, user_id=None, deadline=None, user_slot=True):
+        """Run `fn` with admission control, deadline, hedging and retries"""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        self._admit(operation)
+        user_held = False
+        try:
+            if user_slot:
+                user_held = self._acquire_user(user_id, deadline_at, operation)
+            start = time.monotonic()
+            value = self._run_attempts(operation, fn, deadline_at)
+            self._record_success(operation, time.monotonic() - start)
+            return value
+        except LLMBusyError:
+            # Local saturation says nothing about provider health
+            self.breaker.release_probe()
+            raise
+        finally:
+            if user_held:
+                self._release_user(user_id)
+
+    def is_healthy(self):
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def metrics(self):
+        with self._metrics_lock:
+            operations = {}
+            for key, count in self._counters.items():
+                op, name = key
+                operations.setdefault(op, {})[name] = count
+            for op, stats in operations.items():
+                if stats.get('successes'):
+                    stats['avg_latency_ms'] = round(self._latency_total[op] / stats['successes'] * 1000, 1)
+            in_flight = self._in_flight
+        with self._user_lock:
+            active_users = len(self._user_semaphores)
+        return {
+            'provider': get_provider().name,
+            'in_flight': in_flight,
+            'max_concurrency': self.max_concurrency,
+            'per_user_concurrency': self.per_user_concurrency,
+            'active_users': active_users,
+            'deadline_seconds': self.deadline,
+            'hedge_delay_seconds': self.hedge_delay,
+            'max_attempts': self.max_attempts,
+            'circuit_breaker': self.breaker.snapshot(),
+            'coalescing': single_flight.metrics(),
+            'operations': operations,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _count(self, operation, name, amount=1):
+        with self._metrics_lock:
+            self._counters[(operation, name)] += amount
+
+    def _record_success(self, operation, latency):
+        self.breaker.record_success()
+        with self._metrics_lock:
+            self._counters[(operation, 'successes')] += 1
+            self._latency_total[operation] += latency
+
+    def _record_failure(self, operation, reason):
+        self.breaker.record_failure()
+        self._count(operation, reason)
+
+    def _admit(self, operation):
+        self._count(operation, 'calls')
+        if not self.breaker.allow():
+            self._count(operation, 'rejected_circuit_open')
+            raise CircuitOpenError('LLM circuit breaker is open')
+
+    def _acquire_user(self, user_id, deadline_at, operation):
+        """Take one of the user's slots; returns True if one was taken (False when there is no user)"""
+        if not user_id:
+            return False
+        with self._user_lock:
+            entry = self._user_semaphores.get(user_id)
+            if entry is None:
+                entry = self._user_semaphores[user_id] = [threading.BoundedSemaphore(self.per_user_concurrency), 0]
+            entry[1] += 1
+        if not entry[0].acquire(timeout=max(0.0, deadline_at - time.monotonic())):
+            self._release_user(user_id, acquired=False)
+            self._count(operation, 'rejected_user_limit')
+            raise LLMBusyError(f'Too many concurrent LLM calls for user {user_id}')
+        return True
+
+    def _release_user(self, user_id, acquired=True):
+        with self._user_lock:
+            entry = self._user_semaphores[user_id]
+            if acquired:
+                entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                # Nobody holds or waits on it, so the next caller can start from a fresh semaphore
+                del self._user_semaphores[user_id]
+
+    def _acquire_global(self, deadline_at, operation, blocking=True):
+        acquired = self._global.acquire(timeout=max(0.0, deadline_at - time.monotonic())) if blocking \
+            else self._global.acquire(blocking=False)
+        if acquired:
+            with self._metrics_lock:
+                self._in_flight += 1
+        elif blocking:
+            self._count(operation, 'rejected_global_limit')
+        return acquired
+
+    def _release_global(self):
+        with self._metrics_lock:
+            self._in_flight -= 1
+        self._global.release()
+
+    def _backoff(self, retry_number, deadline_at):
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** retry_number)) * random.uniform(0.5, 1.5)
+        time.sleep(max(0.0, min(delay, deadline_at - time.monotonic())))
+
+    def _run_attempts(self, operation, fn, deadline_at):
+        results = queue.Queue()
+        attempts = 0
+        outstanding = 0
+        last_error = None
+
+        def launch(index, blocking=True):
+            if not self._acquire_global(deadline_at, operation, blocking=blocking):
+                return False
+
+            def run():
+                try:
+                    results.put((index, True, fn()))
+                except Exception as e:
+                    results.put((index, False, e))
+                finally:
+                    self._release_global()
+
+            self._executor.submit(run)
+            return True
+
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if outstanding == 0:
+                if attempts >= self.max_attempts:
+                    break
+                if attempts:
+                    self._count(operation, 'retries')
+                    self._backoff(attempts - 1, deadline_at)
+                if not launch(attempts):
+                    raise LLMBusyError('No LLM capacity available')
+                attempts += 1
+                outstanding += 1
+                continue
+
+            can_hedge = outstanding == 1 and attempts < self.max_attempts and self.hedge_delay
+            wait = min(self.hedge_delay, remaining) if can_hedge else remaining
+            try:
+                index, ok, value = results.get(timeout=wait)
+            except queue.Empty:
+                # Only hedge when a slot is free right now; never queue behind ourselves
+                if can_hedge and launch(attempts, blocking=False):
+                    self._count(operation, 'hedges')
+                    attempts += 1
+                    outstanding += 1
+                continue
+
+            outstanding -= 1
+            if ok:
+                if index and outstanding:
+                    self._count(operation, 'hedge_wins')
+                return value
+            last_error = value
+            self._count(operation, 'attempt_errors')
+
+        if last_error is not None and outstanding == 0:
+            self._record_failure(operation, 'errors')
+            raise LLMUnavailableError(f'{operation} failed after {attempts} attempts: {last_error}')
+        self._record_failure(operation, 'timeouts')
+        raise LLMTimeoutError(f'{operation} missed its deadline after {attempts} attempts')
+
+
+llm_client = LLMClient(
+    max_concurrency=Config.LLM_MAX_CONCURRENCY,
+    per_user_concurrency=Config.LLM_PER_USER_CONCURRENCY,
+    deadline=Config.LLM_DEADLINE_SECONDS,
+    max_attempts=Config.LLM_MAX_ATTEMPTS,
+    hedge_delay=Config.LLM_HEDGE_DELAY_SECONDS,
+    breaker=CircuitBreaker(
+        failure_threshold=Config.LLM_BREAKER_THRESHOLD,
+        reset_timeout=Config.LLM_BREAKER_RESET_SECONDS,
+    ),
+)
@@ -0,0 +1,166 @@
+import importlib
+import re
+import json
+import threading
+import requests
+import google.generativeai as genai
+from config import Config
+
+GEMINI_API_KEY = Config.GEMINI_API_KEY
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+
+def parse_json_response(text):
+    """Parse a JSON object or array out of raw model text"""
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    match = re.search(r'(\[.*\]|\{.*\})', text, re.DOTALL)
+    if not match:
+        raise ValueError('Model did not return JSON')
+    return json.loads(match.group(0))
+
+
+class LLMProvider:
+    """Interface every text generation backend implements"""
+    name = 'base'
+
+    def is_available(self):
+        return True
+
+    def generate(self, prompt, generation_config=None):
+        """Return the complete response text"""
+        raise NotImplementedError
+
+    def stream(self, prompt, generation_config=None):
+        """Yield response text chunks; providers without streaming yield once"""
+        yield self.generate(prompt, generation_config)
+
+    def generate_json(self, prompt, generation_config=None):
+        """Return the parsed JSON object or array the prompt asks for"""
+        return parse_json_response(self.generate(prompt, generation_config))
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backed text generation"""
+    name = 'gemini'
+
+    def __init__(self, model_name='gemini-2.5-flash'):
+        self.model_name = model_name
+        self._models = {}
+
+    def is_available(self):
+        return bool(GEMINI_API_KEY)
+
+    def get_model(self, model_name=None):
+        """Return a shared GenerativeModel instead of building one per call"""
+        model_name = model_name or self.model_name
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+    def generate(self, prompt, generation_config=None):
+        """Generate a complete response in one blocking call"""
+        response = self.get_model().generate_content(prompt, generation_config=generation_config)
+        return response.text
+
+    def stream(self, prompt, generation_config=None):
+        """Yield response text chunks as Gemini produces them"""
+        response = self.get_model().generate_content(prompt, generation_config=generation_config, stream=True)
+        for chunk in response:
+            # Chunks without candidates (e.g. safety metadata) have no text
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                yield text
+
+    def generate_json(self, prompt, generation_config=None):
+        config = dict(generation_config or {})
+        config['response_mime_type'] = 'application/json'
+        return parse_json_response(self.generate(prompt, config))
+
+
+class MockHTTPProvider(LLMProvider):
+    """
+    Client for the local mock LLM server (mock_llm_server.py).
+    Exercises the full network path, latency and error behaviour of the
+    LLM layer without Gemini quota.
+    """
+    name = 'mock'
+
+    def __init__(self, base_url=None, timeout=60):
+        self.base_url = (base_url or Config.MOCK_LLM_URL).rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, path, payload, stream=False):
+        response = self._session().post(f'{self.base_url}{path}', json=payload, timeout=self.timeout, stream=stream)
+        response.raise_for_status()
+        return response
+
+    def generate(self, prompt, generation_config=None):
+        payload = {'prompt': prompt, 'generation_config': generation_config or {}}
+        return self._post('/v1/generate', payload).json()['text']
+
+    def stream(self, prompt, generation_config=None):
+        payload = {'prompt': prompt, 'generation_config': generation_config or {}}
+        with self._post('/v1/stream', payload, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if 'error' in event:
+                    raise RuntimeError(f"Mock LLM stream error: {event['error']}")
+                yield event['text']
+
+    def generate_json(self, prompt, generation_config=None):
+        payload = {'prompt': prompt, 'generation_config': generation_config or {}, 'json_mode': True}
+        return parse_json_response(self._post('/v1/generate', payload).json()['text'])
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'mock': MockHTTPProvider,
+}
+
+# Providers living outside the app (test doubles), imported only when selected;
+# the module registers itself with register_provider()
+PROVIDER_MODULES = {
+    'fake': 'benchmarks.fake_llm',
+}
+
+_provider = None
+
+
+def get_provider():
+    """Return the process-wide provider selected by Config.LLM_PROVIDER"""
+    global _provider
+    if _provider is None:
+        name = Config.LLM_PROVIDER.lower()
+        if name not in PROVIDERS and name in PROVIDER_MODULES:
+            importlib.import_module(PROVIDER_MODULES[name])
+        _provider = PROVIDERS.get(name, GeminiProvider)()
+    return _provider
+
+
+def register_provider(name, provider_class):
+    """Make a provider selectable through Config.LLM_PROVIDER"""
+    PROVIDERS[name] = provider_class
+
+
+def set_provider(provider):
+    """Override the active provider (used by tests and benchmarks)"""
+    global _provider
+    _provider = provider
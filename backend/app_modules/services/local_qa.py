@@ -0,0 +1,59 @@
+import re
+from app_modules.services.retrieval import BM25Index, DocumentIndexCache, chunk_document, tokenize
+from config import Config
+
+# One chunk per sentence: chunk_document starts a new chunk whenever the target is exceeded
+sentence_index_cache = DocumentIndexCache(
+    max_entries=Config.RETRIEVAL_CACHE_SIZE,
+    chunk_chars=1,
+)
+
+LOCAL_QA_TOP_SENTENCES = Config.LOCAL_QA_TOP_SENTENCES
+
+
+def highlight(text, terms):
+    """Bold every occurrence of the query terms (markdown)"""
+    if not terms:
+        return text
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)) + r')\w*',
+                         re.IGNORECASE)
+    return pattern.sub(lambda m: f'**{m.group(0)}**', text)
+
+
+class LocalAnswerEngine:
+    """
+    In-process extractive QA used when no LLM can answer.
+    Ranks the sentences of a document against the question with a cached
+    per-document BM25 index and returns the best passages, in document
+    order, with the question terms highlighted.
+    """
+
+    @staticmethod
+    def passages(question, text, doc_id=None, k=None):
+        """Return [(score, sentence)] for the best matching sentences, in document order"""
+        k = k or LOCAL_QA_TOP_SENTENCES
+        if not text:
+            return []
+        if doc_id is not None:
+            index = sentence_index_cache.get(doc_id, text)
+        else:
+            # Selected context is a few hundred tokens; indexing it per call is cheap
+            index = BM25Index(chunk_document(text, 1))
+        hits = index.search(question, k)
+        return [(score, index.chunks[idx]) for score, idx in sorted(hits, key=lambda hit: hit[1]) if score > 0]
+
+    @staticmethod
+    def answer(question, text, doc_id=None, k=None):
+        """Markdown answer built from the best passages, or None when nothing matches"""
+        passages = LocalAnswerEngine.passages(question, text, doc_id, k)
+        if not passages:
+            return None
+        terms = set(tokenize(question))
+        quoted = '\n\n'.join(f'> {highlight(sentence, terms)}' for _, sentence in passages)
+        return f"""📄 **From your study material:**
+
+{quoted}
+
+*AI is offline right now, so these are the passages of your document that best match your question.*
+
+Want me to look for something more specific?"""
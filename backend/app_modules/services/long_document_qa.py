@@ -0,0 +1,137 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import current_app, has_app_context
+from app_modules.services.gemini_service import CHAT_GENERATION_CONFIG, CHAT_ANSWER_FOOTER
+from app_modules.services.llm_client import llm_client
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.retrieval import BM25Index, chunk_document
+from config import Config
+
+LONG_QA_SECTION_CHARS = Config.LONG_QA_SECTION_CHARS
+LONG_QA_MAX_SECTIONS = Config.LONG_QA_MAX_SECTIONS
+LONG_QA_CONCURRENCY = Config.LONG_QA_CONCURRENCY
+
+# Questions that need the whole document rather than its best-matching passages
+_WHOLE_DOCUMENT_RE = re.compile(
+    r'\b(list|enumerate)\b.*\b(all|every|each)\b|\b(all|every|each) (of )?the\b|\bhow many\b|'
+    r'\b(whole|entire|full) (document|text|manual|book|chapter|file|notes)\b|\bthroughout\b|\boverview\b',
+    re.IGNORECASE
+)
+
+
+def map_prompt(question, section, number, total):
+    return f"""Read section {number} of {total} of a longer study document and answer the student's question using ONLY this section.
+QUESTION: {question}
+SECTION:
+{section}
+Return ONLY a valid JSON object with "relevant" (true if this section contains anything that helps answer the question),
+"answer" (what this section contributes, as concise markdown; empty string if not relevant) and
+"complete" (true only if this section alone fully answers the question and other sections cannot add anything).
+Example: {{"relevant": true, "answer": "- ...", "complete": false}}"""
+
+
+def reduce_prompt(question, partials):
+    notes = '\n\n'.join(f'[Section {number}]\n{answer}' for number, answer in partials)
+    return f"""You are IntelliLearn AI, a friendly study assistant. A long document was read section by section.
+Combine the notes below into one complete, well-organised answer to the student's question.
+Merge duplicates, keep every distinct item, follow document order and use markdown formatting.
+
+STUDENT'S QUESTION: {question}
+
+NOTES FROM EACH SECTION:
+{notes}"""
+
+
+class LongDocumentQA:
+    """
+    Map-reduce question answering over a whole document.
+    Sections are ranked by BM25 against the question and mapped in
+    parallel (bounded by LONG_QA_CONCURRENCY), most relevant first. If a
+    section in the first wave answers the question completely the rest
+    are skipped; otherwise the relevant partial answers are combined by a
+    single reduce call.
+    """
+
+    @staticmethod
+    def wants_whole_document(question):
+        return bool(_WHOLE_DOCUMENT_RE.search(question))
+
+    @staticmethod
+    def _map(question, section, number, total, user_id=None, app=None):
+        if app is not None:
+            # Pool workers get the app context so the usage ledger can look up the user's plan
+            with app.app_context():
+                return LongDocumentQA._map(question, section, number, total, user_id)
+        # Charged to the user but outside their slot limit, which would serialise the
+        # sections; LONG_QA_CONCURRENCY already bounds this fan-out
+        try:
+            result = llm_client.generate_json(map_prompt(question, section, number, total),
+                                              {'temperature': 0.1, 'max_output_tokens': 600},
+                                              operation='long_qa_map', user_id=user_id, user_slot=False)
+        except Exception as e:
+            print(f"⚠️ Section {number} map failed: {e}")
+            return None
+        return result if isinstance(result, dict) else None
+
+    @staticmethod
+    def answer(question, text, user_id=None, concurrency=None):
+        """
+        Return {'answer', 'partials', 'stats'}, or None when no provider is
+        configured or no section could be read.
+        """
+        if not get_provider().is_available() or not text:
+            return None
+        concurrency = max(1, concurrency or LONG_QA_CONCURRENCY)
+
+        sections = chunk_document(text, LONG_QA_SECTION_CHARS)[:LONG_QA_MAX_SECTIONS]
+        total = len(sections)
+        ranked = [idx for _, idx in BM25Index(sections).search(question, total)]
+        seen = set(ranked)
+        order = ranked + [idx for idx in range(total) if idx not in seen]
+
+        def complete(result):
+            return bool(result and result.get('relevant') and result.get('complete') and result.get('answer'))
+
+        app = current_app._get_current_object() if has_app_context() else None
+        results = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            first_wave, rest = order[:concurrency], order[concurrency:]
+            futures = {pool.submit(LongDocumentQA._map, question, sections[idx], idx + 1, total, user_id, app): idx
+                       for idx in first_wave}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+            early_exit = any(complete(results[idx]) for idx in first_wave)
+            if not early_exit and rest:
+                futures = {pool.submit(LongDocumentQA._map, question, sections[idx], idx + 1, total, user_id, app): idx
+                           for idx in rest}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+        mapped = [idx for idx, r in results.items() if r is not None]
+        if not mapped:
+            return None
+        partials = [(idx + 1, str(results[idx]['answer']).strip()) for idx in sorted(mapped)
+                    if results[idx].get('relevant') and str(results[idx].get('answer') or '').strip()]
+        stats = {'sections': total, 'mapped': len(mapped), 'relevant': len(partials), 'early_exit': early_exit,
+                 'llm_calls': len(results)}
+
+        if not partials:
+            answer = "I read the whole document but couldn't find anything that answers this question. 🔍"
+        elif early_exit:
+            # Most relevant section that fully answers the question
+            answer = next(str(results[idx]['answer']).strip() for idx in first_wave if complete(results[idx]))
+        elif len(partials) == 1:
+            answer = partials[0][1]
+        else:
+            try:
+                answer = llm_client.generate(reduce_prompt(question, partials), CHAT_GENERATION_CONFIG,
+                                             operation='long_qa_reduce', user_id=user_id).strip()
+                stats['llm_calls'] += 1
+            except Exception as e:
+                # The partial answers are still useful on their own
+                print(f"⚠️ Long-document reduce failed: {e}")
+                answer = '\n\n'.join(f'**Section {number}:**\n{note}' for number, note in partials)
+
+        print(f"📚 Long-document QA: {stats}")
+        return {'answer': answer + CHAT_ANSWER_FOOTER, 'partials': partials, 'stats': stats}
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from app_modules.services.llm_client import llm_client, LLMUnavailableError, LLMTimeoutError, _outcome
+from app_modules.services.llm_providers import get_provider
+from app_modules.services.usage_ledger import usage_ledger
+from config import Config
+
+BATCH_TASK_HEADER = '### TASK'
+
+# Sentinel result telling a waiter to make its own individual call
+_INDIVIDUAL = object()
+
+# Extra seconds a waiter allows the batch call beyond the window and the LLM deadline
+WAITER_GRACE_SECONDS = 5
+
+
+def build_batch_prompt(prompts):
+    """Combine independent JSON prompts into one multi-item JSON request"""
+    tasks = '\n\n'.join(f'{BATCH_TASK_HEADER} {idx}\n{prompt}' for idx, prompt in enumerate(prompts))
+    return f"""Complete each of these independent tasks separately. Do not mix information between tasks.
+Return ONLY a valid JSON array with one object per task: {{"id": <task number>, "result": <the JSON value that task asks for>}}.
+
+{tasks}"""
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []  # [(prompt, Future, user_id)]
+        self.chars = 0
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Cross-request micro-batching of small JSON prompts.
+    The first caller for an operation opens a batch and waits up to
+    `max_wait` seconds (or until `max_items` / `max_chars` is reached) for
+    other requests to join, then sends every prompt as one structured
+    request through the shared LLM client and hands each waiter its item.
+    Items the model leaves out or garbles are retried as individual calls
+    by their own waiters, so a bad batch never costs more than the
+    unbatched path. Each waiter's budget is checked before it joins, and
+    the items the batch answers are charged to their own users (the
+    shared upstream call is logged without sizes, as cached).
+    """
+
+    def __init__(self, max_wait=0.01, max_items=8, max_chars=12000):
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._open = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = Counter()
+
+    def generate_json(self, prompt, generation_config=None, operation='llm', item_tokens=400, user_id=None):
+        """Same contract as llm_client.generate_json, batched with concurrent callers"""
+        if self.max_wait <= 0 or self.max_items <= 1:
+            return llm_client.generate_json(prompt, generation_config, operation=operation, user_id=user_id)
+
+        llm_client.check_budget(user_id, len(prompt))
+        future = Future()
+        with self._lock:
+            batch = self._open.get(operation)
+            leader = batch is None
+            if leader:
+                batch = self._open[operation] = _Batch()
+            batch.items.append((prompt, future, user_id))
+            batch.chars += len(prompt)
+            if len(batch.items) >= self.max_items or batch.chars >= self.max_chars:
+                self._open.pop(operation, None)
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._open.get(operation) is batch:
+                    self._open.pop(operation)
+            self._flush(batch.items, generation_config, operation, item_tokens)
+
+        try:
+            result = future.result(timeout=self.max_wait + llm_client.deadline + WAITER_GRACE_SECONDS)
+        except FutureTimeoutError:
+            raise LLMTimeoutError(f'{operation} micro-batch did not answer in time')
+        if result is _INDIVIDUAL:
+            self._count('individual_fallbacks')
+            return llm_client.generate_json(prompt, generation_config, operation=operation, user_id=user_id)
+        return result
+
+    def _flush(self, items, generation_config, operation, item_tokens):
+        try:
+            self._answer(items, generation_config, operation, item_tokens)
+        except Exception as e:
+            print(f"⚠️ Micro-batch of {operation} prompts failed, retrying individually: {e}")
+        finally:
+            # Never leave a waiter blocked, whatever went wrong above
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_result(_INDIVIDUAL)
+
+    def _answer(self, items, generation_config, operation, item_tokens):
+        # Identical prompts in one window share a task
+        unique = list(dict.fromkeys(prompt for prompt, _, _ in items))
+        if len(unique) == 1:
+            for _, future, _ in items:
+                future.set_result(_INDIVIDUAL)
+            self._count('single_item_windows')
+            return
+
+        config = dict(generation_config or {})
+        config['max_output_tokens'] = item_tokens * len(unique)
+        provider = get_provider()
+        prompt = build_batch_prompt(unique)
+        start = time.monotonic()
+        outcome = 'ok'
+        try:
+            response = llm_client.call(f'{operation}_batch', lambda: _batch_reply(provider, prompt, config))
+        except LLMUnavailableError as e:
+            # The provider just failed (or is shed); individual calls would go the same way
+            outcome = _outcome(e)
+            for _, future, _ in items:
+                future.set_exception(e)
+            self._count('failed_batches')
+            return
+        finally:
+            # Logged for its latency and outcome only, as cached: the items below carry the sizes and the
+            # charge, so ledger totals count each batched prompt once
+            usage_ledger.record(f'{operation}_batch', None, 0, 0, time.monotonic() - start, cached=True,
+                                outcome=outcome)
+
+        results = {}
+        for entry in response if isinstance(response, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get('id'), int) and entry.get('result') is not None:
+                results[entry['id']] = entry['result']
+
+        self._count('batches')
+        self._count('batched_prompts', len(unique))
+        self._count('upstream_calls_saved', max(len(results) - 1, 0))
+        if not results:
+            # Every item is retried on its own, so the batch call was one extra
+            self._count('wasted_batch_calls')
+        latency = time.monotonic() - start
+        charged = set()
+        for prompt, future, user_id in items:
+            result = results.get(unique.index(prompt), _INDIVIDUAL)
+            future.set_result(result)
+            if result is not _INDIVIDUAL:
+                # Waiters sharing a task are charged once, like coalesced calls
+                usage_ledger.record(operation, user_id, len(prompt), len(json.dumps(result)), latency,
+                                    cached=prompt in charged)
+                charged.add(prompt)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        if stats.get('batches'):
+            stats['avg_batch_size'] = round(stats['batched_prompts'] / stats['batches'], 2)
+        return {'max_wait_ms': self.max_wait * 1000, 'max_items': self.max_items, **stats}
+
+
+def _batch_reply(provider, prompt, generation_config):
+    """The parsed batch reply, or None when it is not JSON (its items are then retried individually)"""
+    try:
+        return provider.generate_json(prompt, generation_config)
+    except ValueError:
+        return None
+
+
+micro_batcher = MicroBatcher(
+    max_wait=Config.LLM_BATCH_WINDOW_MS / 1000,
+    max_items=Config.LLM_BATCH_MAX_ITEMS,
+    max_chars=Config.LLM_BATCH_MAX_CHARS,
+)
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from app_modules.models import db, Tombstone, ChatMessage, Document, DocumentChunk, Quiz, QuizAttempt, QuizSession, \
+    QuestionAttempt, ArtifactJob
+from config import Config
+
+
+class BackgroundPurger:
+    """
+    Carries out tombstoned deletions off the request path.
+
+    Clearing chat history or deleting a document only writes a tombstone
+    (the rows disappear from queries at once); this worker then deletes
+    the underlying rows `batch_size` at a time, committing and sleeping
+    `pause` seconds between batches so other writers get the SQLite write
+    lock in between, and finally removes the uploaded file. Interrupted
+    purges resume on the next start.
+    """
+
+    def __init__(self, batch_size=500, pause=0.05, poll_interval=5.0):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.poll_interval = poll_interval
+        self.stats = Counter()
+        self._current = None
+        self._app = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self, app):
+        if self._thread and self._thread.is_alive():
+            return
+        self._app = app
+        with app.app_context():
+            Tombstone.__table__.create(bind=db.engine, checkfirst=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='tombstone-purger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def notify(self):
+        """Wake the worker after writing a tombstone"""
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self._app.app_context():
+                    while not self._stop.is_set() and self.run_once():
+                        pass
+            except Exception as e:
+                db.session.rollback()
+                self.stats['errors'] += 1
+                print(f"⚠️ Purger error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    # ------------------------------------------------------------------ purging
+
+    def run_once(self):
+        """Purge the oldest pending tombstone; False when there is none"""
+        tombstone = Tombstone.query.filter(Tombstone.completed_at.is_(None)).order_by(Tombstone.id).first()
+        if tombstone is None:
+            return False
+        self._current = tombstone.id
+        try:
+            if tombstone.kind == 'chat_history':
+                done = self._drain(tombstone, ChatMessage.__table__,
+                                   db.and_(ChatMessage.user_id == tombstone.user_id,
+                                           ChatMessage.id <= tombstone.cleared_through))
+            else:
+                done = self._purge_document(tombstone)
+            if not done:
+                return False
+            tombstone.completed_at = datetime.utcnow()
+            db.session.commit()
+            self.stats['completed'] += 1
+            print(f"🧹 Purged {tombstone.kind} tombstone {tombstone.id}: {tombstone.purged_rows} rows")
+            return True
+        finally:
+            self._current = None
+
+    def _purge_document(self, tombstone):
+        quiz_ids = db.select(Quiz.id).where(Quiz.document_id == tombstone.target_id)
+        steps = [
+            (QuestionAttempt.__table__, QuestionAttempt.quiz_id.in_(quiz_ids)),
+            (QuizSession.__table__, QuizSession.quiz_id.in_(quiz_ids)),
+            (QuizAttempt.__table__, QuizAttempt.quiz_id.in_(quiz_ids)),
+            (Quiz.__table__, Quiz.document_id == tombstone.target_id),
+            (ArtifactJob.__table__, ArtifactJob.document_id == tombstone.target_id),
+            (DocumentChunk.__table__, DocumentChunk.document_id == tombstone.target_id),
+            (Document.__table__, db.and_(Document.id == tombstone.target_id, Document.deleted_at.isnot(None))),
+        ]
+        for table, condition in steps:
+            if not self._drain(tombstone, table, condition):
+                return False
+        if tombstone.file_path and os.path.exists(tombstone.file_path):
+            os.remove(tombstone.file_path)
+            self.stats['files_removed'] += 1
+        return True
+
+    def _drain(self, tombstone, table, condition):
+        """Delete matching rows in batches; False if stopped part-way"""
+        while True:
+            batch = db.select(table.c.id).where(condition).limit(self.batch_size)
+            deleted = db.session.execute(table.delete().where(table.c.id.in_(batch))).rowcount
+            tombstone.purged_rows = (tombstone.purged_rows or 0) + deleted
+            db.session.commit()
+            self.stats['batches'] += 1
+            self.stats['rows_purged'] += deleted
+            if deleted < self.batch_size:
+                return True
+            if self._stop.wait(self.pause):
+                return False
+
+    # ------------------------------------------------------------------ reporting
+
+    def metrics(self):
+        """Backlog of pending tombstones plus lifetime purge counters"""
+        pending = Tombstone.query.filter(Tombstone.completed_at.is_(None)).order_by(Tombstone.id).all()
+        now = datetime.utcnow()
+        chat_rows = sum(
+            db.session.query(db.func.count(ChatMessage.id)).execution_options(include_deleted=True)
+            .filter(ChatMessage.user_id == t.user_id, ChatMessage.id <= t.cleared_through).scalar()
+            for t in pending if t.kind == 'chat_history'
+        )
+        return {
+            'pending_tombstones': dict(Counter(t.kind for t in pending)),
+            'pending_chat_messages': chat_rows,
+            'oldest_pending_seconds': round((now - pending[0].created_at).total_seconds()) if pending else 0,
+            'purging': self._current,
+            **self.stats,
+        }
+
+
+purger = BackgroundPurger(
+    batch_size=Config.PURGE_BATCH_SIZE,
+    pause=Config.PURGE_PAUSE_SECONDS,
+    poll_interval=Config.PURGE_POLL_SECONDS,
+)
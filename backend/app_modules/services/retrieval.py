@@ -0,0 +1,165 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from config import Config
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or other
+our ours ourselves out over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves explain tell describe please give show
+""".split())
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (~4 characters per token for English)"""
+    return max(1, len(text) // 4)
+
+
+def chunk_document(text, target_chars=400):
+    """Split text into chunks of whole sentences, each about `target_chars` long"""
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text.strip()) if s.strip()]
+    chunks, current, size = [], [], 0
+    for sentence in sentences:
+        if current and size + len(sentence) > target_chars:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over the sentence-aligned chunks of one document"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+        # Inverted index: term -> [(chunk index, term frequency)]
+        self.postings = {}
+        for idx, tf in enumerate(self.term_freqs):
+            for term, freq in tf.items():
+                self.postings.setdefault(term, []).append((idx, freq))
+
+    def search(self, query, k=5):
+        """Return [(score, chunk_index)] for the best `k` chunks, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for idx, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / (self.avg_length or 1))
+                scores[idx] = scores.get(idx, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(((score, idx) for idx, score in scores.items()), key=lambda x: (-x[0], x[1]))
+        return ranked[:k]
+
+
+class DocumentIndexCache:
+    """
+    LRU cache of per-document BM25 indexes.
+    Entries are keyed by document id and validated against a hash of the
+    text, so an edited document is re-indexed on next use.
+    """
+
+    def __init__(self, max_entries=64, chunk_chars=400):
+        self.max_entries = max_entries
+        self.chunk_chars = chunk_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @staticmethod
+    def _fingerprint(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def build(self, doc_id, text):
+        """Index a document (called at ingestion) and cache the result"""
+        index = BM25Index(chunk_document(text, self.chunk_chars))
+        with self._lock:
+            self._entries[doc_id] = (self._fingerprint(text), index)
+            self._entries.move_to_end(doc_id)
+            self.stats['builds'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return index
+
+    def get(self, doc_id, text):
+        fingerprint = self._fingerprint(text)
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry and entry[0] == fingerprint:
+                self._entries.move_to_end(doc_id)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+        return self.build(doc_id, text)
+
+    def invalidate(self, doc_id):
+        with self._lock:
+            self._entries.pop(doc_id, None)
+
+    def metrics(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, **self.stats}
+
+
+document_index_cache = DocumentIndexCache(
+    max_entries=Config.RETRIEVAL_CACHE_SIZE,
+    chunk_chars=Config.RETRIEVAL_CHUNK_CHARS,
+)
+
+CHAT_CONTEXT_TOKEN_BUDGET = Config.CHAT_CONTEXT_TOKEN_BUDGET
+CHAT_CONTEXT_TOP_K = Config.CHAT_CONTEXT_TOP_K
+
+
+def select_context(doc_id, text, question, token_budget=None, k=None):
+    """
+    Pick the chunks of a document most relevant to the question.
+    Takes the top-k BM25 chunks that fit in the token budget and returns
+    them in document order. Falls back to the opening of the document
+    when nothing in it matches the question.
+    """
+    token_budget = token_budget or CHAT_CONTEXT_TOKEN_BUDGET
+    k = k or CHAT_CONTEXT_TOP_K
+    if not text:
+        return ""
+
+    index = document_index_cache.get(doc_id, text)
+    selected, used = [], 0
+    for _, idx in index.search(question, k):
+        cost = estimate_tokens(index.chunks[idx])
+        if used + cost > token_budget:
+            continue
+        selected.append(idx)
+        used += cost
+
+    if not selected:
+        return text[:token_budget * 4]
+    return '\n...\n'.join(index.chunks[idx] for idx in sorted(selected))
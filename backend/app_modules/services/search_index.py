@@ -0,0 +1,208 @@
+import math
+import re
+
+from app_modules.models import db, Document, DocumentChunk
+from app_modules.services.retrieval import chunk_document, document_index_cache
+from config import Config
+
+SEARCH_PAGE_SIZE = Config.SEARCH_PAGE_SIZE
+SEARCH_MAX_PAGE_SIZE = 100
+
+# External-content FTS5 tables over chat_message and document_chunk, kept in sync by triggers.
+# Each row also indexes an owner token, hex(user_id): one token whatever the id looks like, so
+# MATCH can be confined to the caller's rows and FTS walks only their postings. Tokens still
+# only narrow the search; ownership is checked with an exact comparison on the content table.
+# The content views supply the owner column for rebuilds and snippets.
+_FTS_TABLES = {
+    'chat_message_fts': ('chat_message_fts_ai', 'chat_message_fts_ad', 'chat_message_fts_au'),
+    'document_chunk_fts': ('document_chunk_fts_ai', 'document_chunk_fts_ad'),
+}
+_SCHEMA = [
+    """CREATE VIEW IF NOT EXISTS chat_message_fts_content AS
+        SELECT id, question, answer, hex(user_id) AS owner FROM chat_message""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS chat_message_fts USING fts5(
+        question, answer, owner, content='chat_message_fts_content', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_fts(rowid, question, answer, owner)
+        VALUES (new.id, new.question, new.answer, hex(new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_ad AFTER DELETE ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, question, answer, owner)
+        VALUES ('delete', old.id, old.question, old.answer, hex(old.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_au AFTER UPDATE ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, question, answer, owner)
+        VALUES ('delete', old.id, old.question, old.answer, hex(old.user_id));
+        INSERT INTO chat_message_fts(rowid, question, answer, owner)
+        VALUES (new.id, new.question, new.answer, hex(new.user_id));
+    END""",
+    """CREATE VIEW IF NOT EXISTS document_chunk_fts_content AS
+        SELECT id, text, hex(user_id) AS owner FROM document_chunk""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS document_chunk_fts USING fts5(
+        text, owner, content='document_chunk_fts_content', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS document_chunk_fts_ai AFTER INSERT ON document_chunk BEGIN
+        INSERT INTO document_chunk_fts(rowid, text, owner) VALUES (new.id, new.text, hex(new.user_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_chunk_fts_ad AFTER DELETE ON document_chunk BEGIN
+        INSERT INTO document_chunk_fts(document_chunk_fts, rowid, text, owner)
+        VALUES ('delete', old.id, old.text, hex(old.user_id));
+    END""",
+]
+
+# FTS5's bm25() takes its IDF from every user's postings, which costs as much as the site's whole
+# history however few rows the caller has. Matches are ranked here instead with BM25 over the
+# caller's own rows, so a search only reads that user's postings. CROSS JOIN keeps the plan driven
+# by the MATCH: probing the FTS table once per content row re-runs the full-text query each time.
+_CHAT_SQL = """
+    SELECT 'chat' AS type, m.id AS id, NULL AS document_id, NULL AS filename, m.timestamp AS timestamp,
+           snippet(chat_message_fts, 0, '**', '**', '…', 16) AS title,
+           snippet(chat_message_fts, 1, '**', '**', '…', 24) AS snippet,
+           m.question AS question, m.answer AS answer
+    FROM chat_message_fts CROSS JOIN chat_message m ON m.id = chat_message_fts.rowid
+    WHERE chat_message_fts MATCH :match AND m.user_id = :user_id
+      AND m.id > (SELECT coalesce(max(cleared_through), 0) FROM tombstone
+                  WHERE kind = 'chat_history' AND user_id = :user_id)"""
+_DOCUMENT_SQL = """
+    SELECT 'document' AS type, c.id AS id, d.id AS document_id, d.filename AS filename, d.created_at AS timestamp,
+           d.filename AS title,
+           snippet(document_chunk_fts, 0, '**', '**', '…', 24) AS snippet,
+           c.text AS text
+    FROM document_chunk_fts CROSS JOIN document_chunk c ON c.id = document_chunk_fts.rowid
+    CROSS JOIN document d ON d.id = c.document_id
+    WHERE document_chunk_fts MATCH :match AND c.user_id = :user_id AND d.deleted_at IS NULL"""
+
+# scope -> (candidate SQL, FTS table, (column, BM25 weight)...): a hit in the question counts double
+_SCOPES = {
+    'chat': (_CHAT_SQL, 'chat_message_fts', (('question', 2.0), ('answer', 1.0))),
+    'documents': (_DOCUMENT_SQL, 'document_chunk_fts', (('text', 1.0),)),
+}
+# FTS5's own bm25() constants
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(text):
+    """Lowercased search terms, at most 12"""
+    return [term.lower() for term in _TERM_RE.findall(text)[:12]]
+
+
+def match_query(text):
+    """FTS5 query for rows containing every term; the last term also matches as a prefix"""
+    terms = query_terms(text)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def owner_match(user_id):
+    """FTS5 query for the rows indexed with user_id's owner token"""
+    return 'owner : "{}"'.format(str(user_id).encode('utf-8').hex().upper())
+
+
+def owned_match(user_id, match, columns):
+    """`match` over `columns`, confined to the rows indexed with user_id's owner token"""
+    return f'{owner_match(user_id)} AND {{{" ".join(columns)}}} : ({match})'
+
+
+def _count(table, match):
+    return db.session.execute(db.text(f'SELECT count(*) FROM {table} WHERE {table} MATCH :match'),
+                              {'match': match}).scalar()
+
+
+def _rank(rows, terms, columns, idfs):
+    """[(score, row)] scored the way FTS5's bm25() does; the last term also matches as a prefix"""
+    counted = []
+    for row in rows:
+        tfs, length = [0.0] * len(terms), 0
+        for column, weight in columns:
+            tokens = _TERM_RE.findall((row[column] or '').lower())
+            length += len(tokens)
+            for position, term in enumerate(terms[:-1]):
+                tfs[position] += weight * tokens.count(term)
+            tfs[-1] += weight * sum(1 for token in tokens if token.startswith(terms[-1]))
+        counted.append((row, tfs, length))
+    average = sum(length for _, _, length in counted) / len(counted) or 1
+    return [(sum(idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+                  for tf, idf in zip(tfs, idfs)), row)
+            for row, tfs, length in counted]
+
+
+class SearchService:
+    """Ranked full-text search over a user's chat history and document chunks (SQLite FTS5)"""
+
+    @staticmethod
+    def install():
+        """Create the FTS tables and triggers; index existing rows the first time"""
+        connection = db.session.connection()
+        existing = dict(connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE name IN ('chat_message_fts', 'document_chunk_fts')").all())
+        for table, triggers in _FTS_TABLES.items():
+            if table in existing and 'owner' not in existing[table]:
+                # Built without owner tokens (or with user_id tokenized): recreate and reindex
+                for trigger in triggers:
+                    connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {trigger}')
+                connection.exec_driver_sql(f'DROP TABLE {table}')
+                del existing[table]
+        for statement in _SCHEMA:
+            connection.exec_driver_sql(statement)
+        if 'chat_message_fts' not in existing:
+            connection.exec_driver_sql("INSERT INTO chat_message_fts(chat_message_fts) VALUES ('rebuild')")
+        if 'document_chunk_fts' not in existing:
+            connection.exec_driver_sql("INSERT INTO document_chunk_fts(document_chunk_fts) VALUES ('rebuild')")
+        db.session.commit()
+
+        # Documents uploaded before chunks were stored
+        unchunked = Document.query.filter(~db.exists().where(DocumentChunk.document_id == Document.id)).all()
+        for doc in unchunked:
+            SearchService.index_document(doc, chunk_document(doc.text_content, document_index_cache.chunk_chars))
+        if unchunked:
+            print(f"🔎 Indexed {len(unchunked)} existing documents for search")
+
+    @staticmethod
+    def index_document(doc, chunks):
+        """Store a document's chunks; the insert trigger adds them to the FTS index"""
+        db.session.execute(DocumentChunk.__table__.insert(), [
+            {'document_id': doc.id, 'user_id': doc.user_id, 'position': position, 'text': chunk}
+            for position, chunk in enumerate(chunks)
+        ])
+        db.session.commit()
+
+    @staticmethod
+    def search(user_id, text, scope='all', limit=None, page=0):
+        """Return a page of results, best first, or None when the query has no searchable terms"""
+        match = match_query(text)
+        if match is None:
+            return None
+        limit = min(max(limit or SEARCH_PAGE_SIZE, 1), SEARCH_MAX_PAGE_SIZE)
+        terms = query_terms(text)
+        ranked = []
+        for kind in ([scope] if scope in _SCOPES else _SCOPES):
+            sql, table, columns = _SCOPES[kind]
+            names = [column for column, _ in columns]
+            rows = db.session.execute(db.text(sql), {
+                'match': owned_match(user_id, match, names), 'user_id': user_id}).mappings().all()
+            if not rows:
+                continue
+            # IDF over the user's own rows, like bm25() over a table holding only theirs
+            total = _count(table, owner_match(user_id))
+            idfs = []
+            for position, term in enumerate(terms):
+                phrase = f'"{term}"*' if position == len(terms) - 1 else f'"{term}"'
+                found = _count(table, owned_match(user_id, phrase, names))
+                idfs.append(max(math.log((total - found + 0.5) / (found + 0.5)), 1e-6))
+            ranked.extend(_rank(rows, terms, columns, idfs))
+        ranked.sort(key=lambda scored: -scored[0])
+        start = page * limit
+        results = [{
+            'type': row['type'],
+            'id': row['id'],
+            'doc_id': row['document_id'],
+            'filename': row['filename'],
+            'timestamp': str(row['timestamp']) if row['timestamp'] else None,
+            'title': row['title'],
+            'snippet': row['snippet'],
+            'score': round(score, 4),
+        } for score, row in ranked[start:start + limit]]
+        return {'results': results, 'page': page, 'pageSize': limit, 'hasMore': len(ranked) > start + limit}
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+from collections import defaultdict
+
+
+class _Flight:
+    """One in-flight upstream call and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+    The first caller for a key (the leader) runs the function; everyone who
+    arrives while it is running waits and receives the same result or the
+    same exception. Nothing is cached once the call has finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    @staticmethod
+    def make_key(operation, prompt, *extra):
+        """Key a call by operation and a hash of everything that shapes the output"""
+        payload = json.dumps([prompt, *extra], sort_keys=True, default=str)
+        return operation, hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def do(self, key, fn):
+        operation = key[0]
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters[operation]['upstream_calls'] += 1
+            else:
+                flight.waiters += 1
+                self._counters[operation]['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is not None:
+                    self._counters[operation]['shared_errors'] += flight.waiters
+            flight.done.set()
+
+    def metrics(self):
+        with self._lock:
+            operations = {op: dict(stats) for op, stats in self._counters.items()}
+            in_flight = len(self._flights)
+        return {
+            'in_flight_keys': in_flight,
+            'upstream_calls_saved': sum(stats.get('coalesced', 0) for stats in operations.values()),
+            'operations': operations,
+        }
+
+
+single_flight = SingleFlight()
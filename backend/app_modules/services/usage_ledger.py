@@ -0,0 +1,236 @@
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from flask import has_app_context, has_request_context, request
+from app_modules.models import db, LLMUsage, User
+from config import Config
+
+
+def parse_budgets(spec):
+    """'free:100:200000,basic:1000:2000000' -> {plan: (calls, prompt_chars)}; 0 means unlimited"""
+    budgets = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        plan, calls, chars = (entry.split(':') + ['0', '0'])[:3]
+        budgets[plan] = (int(calls or 0), int(chars or 0))
+    return budgets
+
+
+class UsageLedger:
+    """
+    Per-call LLM usage accounting with daily budgets.
+
+    record() appends to an in-memory buffer and bumps in-memory counters,
+    so the hot path never touches the database. A background thread
+    bulk-inserts the buffer into llm_usage every `flush_interval` seconds
+    (sooner once `batch_size` rows are waiting) and periodically
+    reconciles the counters with the ledger, which also picks up usage
+    recorded by other worker processes.
+
+    Budgets are per user (by subscription plan) and per plan as a whole,
+    counted in upstream calls and prompt characters per UTC day. Calls
+    served by a coalesced identical request are recorded but not charged.
+    """
+
+    def __init__(self, user_budgets=None, subscription_budgets=None, flush_interval=5.0, batch_size=200,
+                 reconcile_interval=60.0, max_buffer=20000):
+        self.user_budgets = user_budgets or {}
+        self.subscription_budgets = subscription_budgets or {}
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.reconcile_interval = reconcile_interval
+        self.max_buffer = max_buffer
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._day = None
+        self._user_usage = {}  # user_id -> [calls, prompt_chars] for today
+        self._plan_usage = {}  # plan -> [calls, prompt_chars] for today
+        self._plans = {}  # user_id -> subscription plan
+        self.stats = Counter()
+        self._app = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------ hot path
+
+    def _roll_day(self):
+        today = datetime.utcnow().date()
+        if self._day != today:
+            self._day, self._user_usage, self._plan_usage = today, {}, {}
+
+    def plan_for(self, user_id):
+        plan = self._plans.get(user_id)
+        if plan is None and has_app_context():
+            try:
+                user = db.session.get(User, user_id)
+                plan = self._plans[user_id] = (user.subscription if user else None) or 'free'
+            except Exception:
+                plan = 'free'
+        return plan or 'free'
+
+    def set_plan(self, user_id, plan):
+        self._plans[user_id] = plan
+
+    def check_budget(self, user_id, prompt_chars=0):
+        """Return None when the call may proceed, else a reason string"""
+        if not user_id:
+            return None
+        plan = self.plan_for(user_id)
+        with self._lock:
+            self._roll_day()
+            calls, chars = self._user_usage.get(user_id, (0, 0))
+            plan_calls, plan_chars = self._plan_usage.get(plan, (0, 0))
+        call_limit, char_limit = self.user_budgets.get(plan, (0, 0))
+        if call_limit and calls >= call_limit:
+            return f'daily {plan} limit of {call_limit} AI calls reached'
+        if char_limit and chars + prompt_chars > char_limit:
+            return f'daily {plan} limit of {char_limit} prompt characters reached'
+        plan_call_limit, plan_char_limit = self.subscription_budgets.get(plan, (0, 0))
+        if (plan_call_limit and plan_calls >= plan_call_limit) or \
+                (plan_char_limit and plan_chars + prompt_chars > plan_char_limit):
+            return f'daily AI capacity for the {plan} plan is used up'
+        return None
+
+    def record(self, operation, user_id=None, prompt_chars=0, response_chars=0, latency=0.0, cached=False,
+               outcome='ok'):
+        """Buffer one call; charged to the user's budget unless it was cached or never sent"""
+        plan = self.plan_for(user_id) if user_id else None
+        row = {
+            'user_id': user_id,
+            'subscription': plan,
+            'endpoint': request.path[:200] if has_request_context() else None,
+            'operation': operation[:50],
+            'prompt_chars': prompt_chars,
+            'response_chars': response_chars,
+            'latency_ms': int(latency * 1000),
+            'cached': cached,
+            'outcome': outcome,
+            'created_at': datetime.utcnow(),
+        }
+        charged = not cached and outcome in ('ok', 'error', 'timeout')
+        with self._lock:
+            self._roll_day()
+            if charged and user_id:
+                usage = self._user_usage.setdefault(user_id, [0, 0])
+                usage[0] += 1
+                usage[1] += prompt_chars
+                plan_usage = self._plan_usage.setdefault(plan, [0, 0])
+                plan_usage[0] += 1
+                plan_usage[1] += prompt_chars
+            self._buffer.append(row)
+            if len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.stats['dropped'] += 1
+            waiting = len(self._buffer)
+        self.stats['recorded'] += 1
+        if waiting >= self.batch_size:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------ background
+
+    def start(self, app):
+        if self._thread and self._thread.is_alive():
+            return
+        self._app = app
+        with app.app_context():
+            LLMUsage.__table__.create(bind=db.engine, checkfirst=True)
+            self.reconcile()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='llm-usage-ledger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._app:
+            with self._app.app_context():
+                self.flush()
+
+    def _loop(self):
+        last_reconcile = time.monotonic()
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+                    if time.monotonic() - last_reconcile >= self.reconcile_interval:
+                        self.reconcile()
+                        last_reconcile = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ Usage ledger error: {e}")
+
+    def flush(self):
+        """Write buffered rows in one multi-row insert; returns the number written"""
+        with self._lock:
+            rows = list(self._buffer)
+            self._buffer.clear()
+        if not rows:
+            return 0
+        try:
+            db.session.execute(LLMUsage.__table__.insert(), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                # Keep the rows for the next flush, newest dropped first if over the cap
+                self._buffer.extendleft(reversed(rows[:self.max_buffer - len(self._buffer)]))
+            self.stats['flush_errors'] += 1
+            print(f"⚠️ Failed to flush {len(rows)} usage rows: {e}")
+            return 0
+        self.stats['flushed'] += len(rows)
+        self.stats['flushes'] += 1
+        return len(rows)
+
+    def reconcile(self):
+        """Reset today's counters from the ledger plus rows not yet flushed"""
+        day_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        charged = db.and_(LLMUsage.created_at >= day_start, LLMUsage.cached.is_(False),
+                          LLMUsage.outcome.in_(('ok', 'error', 'timeout')))
+        by_user = db.session.query(LLMUsage.user_id, db.func.count(LLMUsage.id), db.func.sum(LLMUsage.prompt_chars))\
+            .filter(charged, LLMUsage.user_id.isnot(None)).group_by(LLMUsage.user_id).all()
+        by_plan = db.session.query(LLMUsage.subscription, db.func.count(LLMUsage.id),
+                                   db.func.sum(LLMUsage.prompt_chars))\
+            .filter(charged, LLMUsage.subscription.isnot(None)).group_by(LLMUsage.subscription).all()
+
+        with self._lock:
+            self._day = day_start.date()
+            self._user_usage = {user_id: [calls, chars or 0] for user_id, calls, chars in by_user}
+            self._plan_usage = {plan: [calls, chars or 0] for plan, calls, chars in by_plan}
+            for row in self._buffer:
+                if row['user_id'] and not row['cached'] and row['outcome'] in ('ok', 'error', 'timeout'):
+                    for usage in (self._user_usage.setdefault(row['user_id'], [0, 0]),
+                                  self._plan_usage.setdefault(row['subscription'], [0, 0])):
+                        usage[0] += 1
+                        usage[1] += row['prompt_chars']
+        self._plans.clear()
+        self.stats['reconciles'] += 1
+
+    # ------------------------------------------------------------------ reporting
+
+    def usage_for(self, user_id):
+        plan = self.plan_for(user_id)
+        with self._lock:
+            self._roll_day()
+            calls, chars = self._user_usage.get(user_id, (0, 0))
+        call_limit, char_limit = self.user_budgets.get(plan, (0, 0))
+        return {'user_id': user_id, 'subscription': plan, 'calls_today': calls, 'prompt_chars_today': chars,
+                'daily_call_limit': call_limit or None, 'daily_prompt_char_limit': char_limit or None}
+
+    def metrics(self):
+        with self._lock:
+            buffered = len(self._buffer)
+            plans = {plan: {'calls': calls, 'prompt_chars': chars} for plan, (calls, chars) in self._plan_usage.items()}
+        return {'buffered': buffered, 'plans_today': plans, **self.stats}
+
+
+usage_ledger = UsageLedger(
+    user_budgets=parse_budgets(Config.LLM_DAILY_USER_BUDGETS),
+    subscription_budgets=parse_budgets(Config.LLM_DAILY_SUBSCRIPTION_BUDGETS),
+    flush_interval=Config.LLM_USAGE_FLUSH_SECONDS,
+    reconcile_interval=Config.LLM_USAGE_RECONCILE_SECONDS,
+)
@@ -0,0 +1,84 @@
+import threading
+from collections import Counter, OrderedDict
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app_modules.models import db, User
+from config import Config
+
+
+class UserRegistry:
+    """
+    Bounded, in-process LRU of user ids known to have a row in `user`.
+
+    Users are created on first sight of a Clerk id and never deleted, so
+    once an id is known ensure() answers from memory: no query and no
+    commit. Unknown ids go through a single INSERT ... ON CONFLICT DO
+    NOTHING, so two requests racing on a new id both succeed with one row.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def _remember(self, user_id):
+        with self._lock:
+            self._known[user_id] = True
+            self._known.move_to_end(user_id)
+            while len(self._known) > self.max_entries:
+                self._known.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def ensure(self, user_id):
+        """Make sure a row exists for user_id; returns True if this call created it"""
+        with self._lock:
+            if user_id in self._known:
+                self._known.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return False
+            self.stats['misses'] += 1
+        result = db.session.execute(
+            sqlite_insert(User).values(id=user_id).on_conflict_do_nothing(index_elements=['id']))
+        db.session.commit()
+        created = result.rowcount == 1
+        if created:
+            self.stats['created'] += 1
+        self._remember(user_id)
+        return created
+
+    def get_or_create(self, user_id):
+        """The User row for user_id, creating it first if needed"""
+        self.ensure(user_id)
+        user = db.session.get(User, user_id)
+        if user is None:
+            # Known id whose row is gone (the database was reset under a running process)
+            self.forget(user_id)
+            self.ensure(user_id)
+            user = db.session.get(User, user_id)
+        return user
+
+    def forget(self, user_id):
+        with self._lock:
+            self._known.pop(user_id, None)
+
+    def clear(self):
+        """Forget every known id (a different database was bound, e.g. in benchmarks)"""
+        with self._lock:
+            self._known.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {'entries': len(self._known), 'max_entries': self.max_entries, **self.stats}
+
+
+user_registry = UserRegistry(max_entries=Config.USER_CACHE_SIZE)
+
+
+def ensure_user(user_id):
+    """Create the user on first sight of a Clerk id, without loading the row"""
+    user_registry.ensure(user_id)
+
+
+def get_or_create_user(user_id):
+    """Get existing user or create new one with Clerk ID"""
+    return user_registry.get_or_create(user_id)
@@ -0,0 +1,22 @@
+from flask import request
+from flask_socketio import emit, join_room, leave_room
+
+
+def register_artifact_handlers(socketio):
+    """Let clients subscribe to background upgrades of a document's AI artifacts"""
+
+    @socketio.on('watch_document')
+    def handle_watch_document(data):
+        """Join the document room that receives 'artifact_upgraded' events"""
+        doc_id = (data or {}).get('doc_id')
+        if not doc_id:
+            emit('error', {'message': 'doc_id is required'})
+            return
+        join_room(f'doc_{doc_id}')
+        print(f'👀 {request.sid} watching document {doc_id}')
+
+    @socketio.on('unwatch_document')
+    def handle_unwatch_document(data):
+        doc_id = (data or {}).get('doc_id')
+        if doc_id:
+            leave_room(f'doc_{doc_id}')
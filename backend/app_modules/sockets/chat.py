@@ -0,0 +1,90 @@
+from flask import request
+from flask_socketio import emit
+from app_modules.models import db, ChatMessage, Document, User
+from app_modules.services.user_registry import ensure_user
+from app_modules.services.gemini_service import GeminiService, CHAT_ANSWER_FOOTER
+from app_modules.services.fallback_service import FallbackResponseService
+from app_modules.services.retrieval import select_context
+from app_modules.services.chat_memory import ConversationMemory
+from app_modules.services.group_commit import group_writer
+
+
+def register_chat_handlers(socketio):
+    """Register streaming chat event handlers"""
+
+    @socketio.on('chat_ask')
+    def handle_chat_ask(data):
+        """
+        Streaming version of /api/chat/ask.
+        Emits 'chat_chunk' to the asking client as tokens arrive, then
+        'chat_done' once the full answer has been saved.
+        """
+        sid = request.sid
+        data = data or {}
+        user_id = data.get('user_id')
+        question = (data.get('question') or '').strip()
+        doc_id = data.get('doc_id')
+        client_id = data.get('client_id')
+
+        if not user_id or not question:
+            emit('chat_error', {'error': 'Missing required fields', 'client_id': client_id}, to=sid)
+            return
+
+        print(f"\n💬 Streaming question: {question}")
+
+        try:
+            ensure_user(user_id)
+        except Exception as e:
+            print(f"⚠️ User lookup failed: {e}")
+            db.session.rollback()
+
+        document_context = ""
+        doc = None
+        if doc_id:
+            try:
+                doc = Document.query.get(doc_id)
+                if doc:
+                    document_context = select_context(doc.id, doc.text_content, question)
+            except Exception as e:
+                print(f"⚠️ Document error: {e}")
+
+        history = ConversationMemory.render(user_id)
+
+        chunks = []
+        try:
+            for chunk in GeminiService.stream_response(question, document_context, user_id=user_id, history=history):
+                chunks.append(chunk)
+                emit('chat_chunk', {'chunk': chunk, 'index': len(chunks) - 1, 'client_id': client_id}, to=sid)
+        except Exception as e:
+            print(f"❌ Gemini stream error: {e}")
+
+        if chunks:
+            # Keep whatever was already streamed, even if Gemini failed mid-answer
+            answer = ''.join(chunks).strip() + CHAT_ANSWER_FOOTER
+            emit('chat_chunk', {'chunk': CHAT_ANSWER_FOOTER, 'index': len(chunks), 'client_id': client_id}, to=sid)
+            print("✅ Gemini streamed response")
+        else:
+            answer = FallbackResponseService.get_response(question, document_context, doc_id=doc.id if doc else None,
+                                                          document_text=doc.text_content if doc else None)
+            emit('chat_chunk', {'chunk': answer, 'index': 0, 'client_id': client_id}, to=sid)
+            print("📝 Fallback response")
+
+        # Persist once, after the stream has finished
+        chat_message = None
+        try:
+            message_id = group_writer.write(
+                db.insert(ChatMessage).values(user_id=user_id, question=question, answer=answer))
+            chat_message = db.session.get(ChatMessage, message_id)
+            print("💾 Message saved to database")
+        except Exception as e:
+            print(f"⚠️ Failed to save message: {e}")
+            db.session.rollback()
+            chat_message = None
+
+        emit('chat_done', {
+            'answer': answer,
+            'question': question,
+            'client_id': client_id,
+            'message_id': chat_message.id if chat_message else None,
+            'timestamp': chat_message.timestamp.isoformat() if chat_message and chat_message.timestamp else None
+        }, to=sid)
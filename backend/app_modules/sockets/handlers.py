@@ -3,6 +3,9 @@ import json
 from flask_socketio import emit, join_room, leave_room
 from flask import request
 from app_modules.models import db, Quiz, User
+from app_modules.services.user_registry import ensure_user
+from app_modules.sockets.chat import register_chat_handlers
+from app_modules.sockets.artifacts import register_artifact_handlers
 
 # In-memory storage for real-time game rooms
 rooms = {}
@@ -22,17 +25,10 @@ def get_leaderboard(room_code):
         return sorted(players_list, key=lambda p: p['score'], reverse=True)
     return []
 
-def get_or_create_user(user_id):
-    """Get existing user or create new one"""
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=user_id)
-        db.session.add(user)
-        db.session.commit()
-    return user
-
 def register_socket_handlers(socketio):
     """Register all socket event handlers"""
+    register_chat_handlers(socketio)
+    register_artifact_handlers(socketio)
 
     @socketio.on('connect')
     def handle_connect():
@@ -201,7 +197,7 @@ def register_socket_handlers(socketio):
             return
 
         room_code = str(uuid.uuid4())[:6].upper()
-        get_or_create_user(user_id)
+        ensure_user(user_id)
 
         rooms[room_code] = {
             'quiz_id': quiz.id,
@@ -240,7 +236,7 @@ def register_socket_handlers(socketio):
             emit('error', {'message': 'Game already started'})
             return
 
-        get_or_create_user(user_id)
+        ensure_user(user_id)
         join_room(room_code)
         rooms[room_code]['players'][player_sid] = {
             'user_id': user_id,
@@ -1,49 +1,216 @@
-import os
-import sqlite3
+import time
+from config import Config
 
-def migrate_database_schema():
-    """Add missing columns to existing database - SQLite compatible"""
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    db_path = os.path.join(basedir, '..', '..', 'intellilearn.db')
+MIGRATION_BATCH_SIZE = Config.SCHEMA_MIGRATION_BATCH_SIZE
+MIGRATION_PAUSE_SECONDS = Config.SCHEMA_MIGRATION_PAUSE_SECONDS
 
-    if not os.path.exists(db_path):
-        print("📊 New database - no migration needed")
-        return
+_BOOKKEEPING = [
+    """CREATE TABLE IF NOT EXISTS schema_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)""",
+    # Per-step progress of the migration being applied, so an interrupted backfill resumes where it stopped
+    """CREATE TABLE IF NOT EXISTS schema_migration_progress (
+        version INTEGER NOT NULL,
+        step INTEGER NOT NULL,
+        last_rowid INTEGER NOT NULL DEFAULT 0,
+        done BOOLEAN NOT NULL DEFAULT 0,
+        PRIMARY KEY (version, step))""",
+]
 
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
 
-        cursor.execute("PRAGMA table_info(user)")
-        user_columns = [col[1] for col in cursor.fetchall()]
-        print(f"📋 Existing User columns: {user_columns}")
+# ------------------------------------------------------------------ steps
+
+class AddColumn:
+    """ALTER TABLE ... ADD COLUMN (metadata-only in SQLite), then an optional batched backfill"""
+
+    def __init__(self, table, column, ddl, backfill=None):
+        self.table, self.column, self.ddl, self.backfill = table, column, ddl, backfill
+
+    def __str__(self):
+        return f"add {self.table}.{self.column}"
+
+    def apply(self, connection):
+        """Returns True when existing rows need the backfill"""
+        columns = [row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{self.table}")')]
+        if not columns:
+            return False
+        if self.column not in columns:
+            connection.exec_driver_sql(f'ALTER TABLE "{self.table}" ADD COLUMN {self.column} {self.ddl}')
+        # pysqlite runs DDL outside the step's transaction, so the column may exist from an interrupted
+        # run; the backfill only touches NULLs and is safe to repeat
+        return self.backfill is not None
+
+    def backfill_batch(self, connection, start, stop):
+        connection.exec_driver_sql(
+            f'UPDATE "{self.table}" SET {self.column} = {self.backfill} '
+            f'WHERE rowid > ? AND rowid <= ? AND {self.column} IS NULL', (start, stop))
+
+
+class CreateIndex:
+    """CREATE INDEX IF NOT EXISTS on the columns given here, one index per transaction"""
+
+    def __init__(self, name, table, columns):
+        self.name, self.table, self.columns = name, table, columns
+
+    def __str__(self):
+        return f"index {self.name}"
+
+    def apply(self, connection):
+        exists = connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                            (self.table,)).first()
+        if exists:
+            columns = ', '.join(f'"{column}"' for column in self.columns)
+            connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {self.name} ON "{self.table}" ({columns})')
+        return False
 
-        migrations_applied = False
 
-        if 'email' not in user_columns:
-            print("🔧 Adding 'email' column to User table...")
-            cursor.execute("ALTER TABLE user ADD COLUMN email VARCHAR(255)")
-            migrations_applied = True
+class Migration:
+    def __init__(self, version, description, steps):
+        self.version, self.description, self.steps = version, description, steps
 
-        if 'role' not in user_columns:
-            print("🔧 Adding 'role' column to User table...")
-            cursor.execute("ALTER TABLE user ADD COLUMN role VARCHAR(20) DEFAULT 'student'")
-            cursor.execute("UPDATE user SET role = 'student' WHERE role IS NULL")
-            migrations_applied = True
 
-        if 'teacher_id' not in user_columns:
-            print("🔧 Adding 'teacher_id' column to User table...")
-            cursor.execute("ALTER TABLE user ADD COLUMN teacher_id VARCHAR(50)")
-            migrations_applied = True
+# Append only: a released version never changes, so steps spell out their DDL rather than reading
+# the models. Steps must be safe to re-run on a database that db.create_all() already built.
+MIGRATIONS = [
+    Migration(1, 'User roles and teacher ids', [
+        AddColumn('user', 'email', 'VARCHAR(255)'),
+        AddColumn('user', 'role', "VARCHAR(20) DEFAULT 'student'"),
+        AddColumn('user', 'teacher_id', 'VARCHAR(50)'),
+    ]),
+    Migration(2, 'Keyset index for chat history', [
+        CreateIndex('ix_chat_message_user_timestamp', 'chat_message', ['user_id', 'timestamp', 'id']),
+    ]),
+    Migration(3, 'Tombstoned documents', [
+        AddColumn('document', 'deleted_at', 'DATETIME'),
+    ]),
+    Migration(4, 'Indexes for per-user queries', [
+        CreateIndex('ix_quiz_attempt_user_completed', 'quiz_attempt', ['user_id', 'completed_at']),
+        CreateIndex('ix_quiz_attempt_quiz', 'quiz_attempt', ['quiz_id']),
+        CreateIndex('ix_quiz_session_user_created', 'quiz_session', ['user_id', 'created_at']),
+        CreateIndex('ix_quiz_session_user_completed', 'quiz_session', ['user_id', 'completed_at']),
+        CreateIndex('ix_quiz_session_quiz', 'quiz_session', ['quiz_id']),
+        CreateIndex('ix_question_attempt_user_created', 'question_attempt', ['user_id', 'created_at']),
+        CreateIndex('ix_question_attempt_session', 'question_attempt', ['session_id']),
+        CreateIndex('ix_question_attempt_quiz', 'question_attempt', ['quiz_id']),
+        CreateIndex('ix_document_user_created', 'document', ['user_id', 'created_at']),
+        CreateIndex('ix_course_enrollment_user_course', 'course_enrollment', ['user_id', 'course_id']),
+        CreateIndex('ix_course_enrollment_course', 'course_enrollment', ['course_id']),
+        CreateIndex('ix_student_analytics_user', 'student_analytics', ['user_id']),
+        CreateIndex('ix_student_analytics_last_activity', 'student_analytics', ['last_activity']),
+        CreateIndex('ix_concept_mastery_user', 'concept_mastery', ['user_id']),
+    ]),
+]
 
-        if migrations_applied:
-            conn.commit()
-            print("✅ Database migration completed successfully!")
-        else:
-            print("✅ Database schema is up to date - no migration needed")
 
-        conn.close()
+# ------------------------------------------------------------------ runner
 
+class MigrationRunner:
+    """
+    Brings the database up to the latest MIGRATIONS version.
+
+    Startup costs one read of the single schema_version row when the
+    schema is current. Otherwise each pending migration runs in order:
+    DDL steps in short transactions of their own, backfills `batch_size`
+    rows at a time by rowid range with a commit and `pause` between
+    batches so other writers are never locked out for long. Progress is
+    recorded per step, so an interrupted migration resumes where it left
+    off, and the version row only advances once all its steps are done.
+    """
+
+    def __init__(self, engine, migrations=None, batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_PAUSE_SECONDS):
+        self.engine = engine
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+        self.batch_size = batch_size
+        self.pause = pause
+
+    @property
+    def latest(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self):
+        with self.engine.connect() as connection:
+            try:
+                row = connection.exec_driver_sql('SELECT version FROM schema_version WHERE id = 1').first()
+            except Exception:
+                return 0  # no schema_version table yet
+        return row[0] if row else 0
+
+    def run(self, stop=None):
+        """Apply pending migrations; returns the version reached"""
+        version = self.current_version()
+        if version >= self.latest:
+            return version
+        with self.engine.begin() as connection:
+            for statement in _BOOKKEEPING:
+                connection.exec_driver_sql(statement)
+        for migration in self.migrations:
+            if migration.version <= version:
+                continue
+            print(f"🔧 Migration {migration.version}: {migration.description}")
+            start = time.perf_counter()
+            if not self._apply(migration, stop):
+                print(f"⏸️ Migration {migration.version} interrupted; it resumes on the next start")
+                return version
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql(
+                    "INSERT INTO schema_version (id, version, updated_at) VALUES (1, ?, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT(id) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at",
+                    (migration.version,))
+                connection.exec_driver_sql('DELETE FROM schema_migration_progress WHERE version = ?',
+                                           (migration.version,))
+            version = migration.version
+            print(f"✅ Migration {migration.version} applied in {time.perf_counter() - start:.2f}s")
+        return version
+
+    def _apply(self, migration, stop):
+        for number, step in enumerate(migration.steps):
+            with self.engine.begin() as connection:
+                row = connection.exec_driver_sql(
+                    'SELECT last_rowid, done FROM schema_migration_progress WHERE version = ? AND step = ?',
+                    (migration.version, number)).first()
+                if row and row[1]:
+                    continue
+                if row is None:
+                    needs_backfill = step.apply(connection)
+                    connection.exec_driver_sql(
+                        'INSERT INTO schema_migration_progress (version, step, last_rowid, done) VALUES (?, ?, 0, ?)',
+                        (migration.version, number, not needs_backfill))
+                    if not needs_backfill:
+                        continue
+                last_rowid = row[0] if row else 0
+            if not self._backfill(migration.version, number, step, last_rowid, stop):
+                return False
+        return True
+
+    def _backfill(self, version, number, step, last_rowid, stop):
+        with self.engine.connect() as connection:
+            end = connection.exec_driver_sql(f'SELECT max(rowid) FROM "{step.table}"').scalar() or 0
+        if last_rowid:
+            print(f"   resuming {step} backfill at rowid {last_rowid}")
+        while last_rowid < end:
+            if stop is not None and stop.is_set():
+                return False
+            upper = min(last_rowid + self.batch_size, end)
+            with self.engine.begin() as connection:
+                step.backfill_batch(connection, last_rowid, upper)
+                connection.exec_driver_sql(
+                    'UPDATE schema_migration_progress SET last_rowid = ? WHERE version = ? AND step = ?',
+                    (upper, version, number))
+            last_rowid = upper
+            time.sleep(self.pause)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql('UPDATE schema_migration_progress SET done = 1 WHERE version = ? AND step = ?',
+                                       (version, number))
+        return True
+
+
+def migrate_database_schema(engine):
+    """Apply pending schema migrations (run after db.create_all())"""
+    try:
+        runner = MigrationRunner(engine)
+        version = runner.run()
+        print(f"✅ Database schema at version {version}")
     except Exception as e:
         print(f"❌ Migration error: {e}")
-        print("💡 Tip: If error persists, delete intellilearn.db and restart")
+        print("💡 Tip: migrations resume on the next start; if the error persists, delete intellilearn.db")
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Rows of the pairwise repulsion matrix computed at once; caps memory at ~3 x BLOCK x N floats
+_BLOCK = 256
+
+
+def force_layout(n, edges, weights=None, positions=None, movable=None, iterations=50, temperature=0.1, seed=0,
+                 max_repulsors=1500):
+    """
+    Vectorised Fruchterman-Reingold layout in the unit square.
+
+    `edges` is an (E, 2) array of node indices and `weights` their
+    strengths. Only the nodes in `movable` (default: all) are moved, so
+    new nodes can be laid out against a fixed existing layout. Above
+    `max_repulsors` nodes, repulsion in each iteration comes from a random
+    sample of that many nodes, scaled up, instead of all n. Returns an
+    (n, 2) array of positions.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) if positions is None else np.array(positions, dtype=float)
+    idx = np.arange(n) if movable is None else np.asarray(movable, dtype=int)
+    if n < 2 or not len(idx):
+        return pos
+
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    weights = np.ones(len(edges)) if weights is None else np.log1p(np.asarray(weights, dtype=float))
+    if len(edges):
+        # Attraction only matters where at least one end can move
+        mask = np.zeros(n, dtype=bool)
+        mask[idx] = True
+        keep = mask[edges[:, 0]] | mask[edges[:, 1]]
+        edges, weights = edges[keep], weights[keep]
+
+    k = 1.0 / np.sqrt(n)
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+        if n > max_repulsors:
+            repulsors = pos[rng.choice(n, max_repulsors, replace=False)]
+            strength = k * k * n / max_repulsors
+        else:
+            repulsors, strength = pos, k * k
+        for start in range(0, len(idx), _BLOCK):
+            rows = idx[start:start + _BLOCK]
+            dx = pos[rows, 0, None] - repulsors[None, :, 0]
+            dy = pos[rows, 1, None] - repulsors[None, :, 1]
+            # Repulsion k^2 / d along the unit vector: sum_j w_ij (p_i - p_j) with w = k^2 / d^2
+            w = strength / np.maximum(dx * dx + dy * dy, 1e-4)
+            disp[rows] = pos[rows] * w.sum(axis=1)[:, None] - w @ repulsors
+        if len(edges):
+            # Attraction d^2 / k along the unit vector: delta * d / k
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            force = delta * (np.sqrt((delta ** 2).sum(axis=1)) * weights / k)[:, None]
+            np.add.at(disp, edges[:, 0], -force)
+            np.add.at(disp, edges[:, 1], force)
+
+        step = disp[idx]
+        length = np.maximum(np.sqrt((step ** 2).sum(axis=1)), 1e-9)
+        pos[idx] += step * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return pos
@@ -3,6 +3,9 @@ import re
 from app_modules.models import Quiz
 from app_modules.services.gemini_service import GeminiService
 
+# Bump when the graph structure changes; invalidates cached graphs
+GRAPH_STRUCTURE_VERSION = 'graph-v1'
+
 def build_graph_structure(concepts, filename, generator_type):
     """Build knowledge graph structure from concepts"""
     colors = ['#10B981', '#F59E0B', '#8B5CF6', '#EC4899', '#14B8A6', '#F97316', '#6366F1']
@@ -18,4 +21,15 @@ def build_graph_structure(concepts, filename, generator_type):
         })
         links.append({'source': 'main', 'target': node_id})
 
+    # Concept-to-concept links (the local extractor provides them; AI concepts don't)
+    ids = {concept['name']: f'node_{idx}' for idx, concept in enumerate(concepts[:7])}
+    seen = set()
+    for idx, concept in enumerate(concepts[:7]):
+        for related in concept.get('related', []):
+            target = ids.get(related['name'])
+            if target and frozenset((f'node_{idx}', target)) not in seen:
+                seen.add(frozenset((f'node_{idx}', target)))
+                links.append({'source': f'node_{idx}', 'target': target, 'weight': related['weight'],
+                              'type': 'related'})
+
     return {'nodes': nodes, 'links': links, 'generated_by': generator_type}
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from config import Config
+
+# PRAGMAs about the database file, meaningless for an in-memory database
+FILE_PRAGMAS = {'journal_mode', 'mmap_size', 'journal_size_limit'}
+
+
+def get_profile(name=None):
+    """Engine options and per-connection PRAGMAs of a Config.SQLITE_PROFILES entry"""
+    name = name or Config.SQLITE_PROFILE
+    if name not in Config.SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{name}' (expected one of {', '.join(Config.SQLITE_PROFILES)})")
+    return Config.SQLITE_PROFILES[name]
+
+
+def init_sqlite(app, db, profile=None):
+    """
+    db.init_app() with the profile's engine options, then install its
+    PRAGMAs. In-memory databases get only the per-connection PRAGMAs:
+    Flask-SQLAlchemy gives them a single shared connection, so pool
+    sizing does not apply, and neither do journal or file-mapping settings.
+    """
+    profile = get_profile(profile)
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    in_memory = uri.startswith('sqlite') and _is_memory(uri)
+    if uri.startswith('sqlite') and not in_memory:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**profile['engine_options'],
+                                                   **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    pragmas = {name: value for name, value in profile['pragmas'].items()
+               if not (in_memory and name in FILE_PRAGMAS)}
+    db.init_app(app)
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and pragmas:
+            event.listen(engine, 'connect', _pragma_setter(pragmas))
+
+
+def _is_memory(uri):
+    url = make_url(uri)
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory' or \
+        url.database.startswith('file::memory:')
+
+
+def _pragma_setter(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def current_settings(engine):
+    """The PRAGMAs a pooled connection actually runs with, for diagnostics"""
+    with engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout')}
@@ -1,3 +1,4 @@
+import atexit
 import os
 from flask import Flask
 from flask_cors import CORS
@@ -9,9 +10,12 @@ load_dotenv()
 
 # Import database and models
 from app_modules.models import db
-from app_modules.models import User, Teacher, Course, CourseEnrollment, Document, Quiz, QuizAttempt, ChatMessage
+from app_modules.models import User, Teacher, Course, CourseEnrollment, Document, Quiz, QuizAttempt, ChatMessage, ChatMemory
 from app_modules.models import StudentAnalytics, QuizSession, RecommendedQuiz, StudentClassification, QuestionAttempt, \
-    ConceptMastery
+    ConceptMastery, ConceptExplanation, ArtifactJob, LLMUsage, CachedKnowledgeGraph, \
+    LibraryGraph, Tombstone, DocumentChunk
+# SQLite engine profile (WAL, PRAGMAs, pool) from config.py
+from app_modules.utils.sqlite_profile import init_sqlite
 
 # Import blueprints
 from app_modules.routes.documents import documents_bp
@@ -20,10 +24,24 @@ from app_modules.routes.chat import chat_bp
 from app_modules.routes.knowledge_graph import knowledge_graph_bp
 from app_modules.routes.other import other_bp
 from app_modules.routes.analytics import analytics_bp
+from app_modules.routes.search import search_bp
 
 # Import socket handlers
 from app_modules.sockets.handlers import register_socket_handlers
 
+# Background retry queue for LLM artifacts that fell back to heuristics
+from app_modules.services.artifact_queue import artifact_queue
+# Buffered LLM usage ledger and daily budgets
+from app_modules.services.usage_ledger import usage_ledger
+# Batched background deletion of tombstoned chat history and documents
+from app_modules.services.purger import purger
+# Group commit of answer and chat-message writes
+from app_modules.services.group_commit import group_writer
+# FTS5 search over chat history and document chunks
+from app_modules.services.search_index import SearchService
+# Per-user library graphs with debounced saves
+from app_modules.services.library_graph import LibraryGraphService
+
 # =========================================================================
 # =========== FLASK APP & DATABASE CONFIGURATION ==========================
 # =========================================================================
@@ -36,8 +54,8 @@ app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'intellilearn.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Initialize extensions
-db.init_app(app)
+# Initialize extensions (engine pool and PRAGMAs from Config.SQLITE_PROFILE)
+init_sqlite(app, db)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Register blueprints
@@ -47,6 +65,7 @@ app.register_blueprint(chat_bp)
 app.register_blueprint(knowledge_graph_bp)
 app.register_blueprint(other_bp)
 app.register_blueprint(analytics_bp)
+app.register_blueprint(search_bp)
 
 # Register socket handlers
 register_socket_handlers(socketio)
@@ -56,15 +75,36 @@ register_socket_handlers(socketio)
 # =========================================================================
 
 def migrate_database_schema():
-    """Add missing columns to existing database - SQLite compatible"""
+    """Apply pending versioned migrations (one schema_version read when up to date)"""
     from app_modules.utils.db_migration import migrate_database_schema as perform_migration
-    perform_migration()
+    perform_migration(db.engine)
+
+
+def flush_library_graphs():
+    """Write library graph saves still waiting on their debounce timer"""
+    with app.app_context():
+        LibraryGraphService.flush()
+
 
 if __name__ == '__main__':
     with app.app_context():
-        migrate_database_schema()
         db.create_all()
+        migrate_database_schema()
+        SearchService.install()
         print("✅ Database initialized successfully!")
+
+    debug = True
+    # The debug reloader re-runs this module in a child process that serves the requests;
+    # start the background workers there only, so one set runs against the database
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        artifact_queue.start(app, socketio)
+        usage_ledger.start(app)
+        purger.start(app)
+        group_writer.start(app)
+        atexit.register(usage_ledger.stop)
+        atexit.register(purger.stop)
+        atexit.register(group_writer.stop)
+        atexit.register(flush_library_graphs)
     
     print("🚀 Starting IntelliLearn Flask Server...")
-    socketio.run(app, debug=True, port=5000)
+    socketio.run(app, debug=debug, port=5000)
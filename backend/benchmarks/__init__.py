@@ -0,0 +1,45 @@
+"""
+Offline benchmarks for the IntelliLearn backend.
+Run from the backend directory, e.g. `python -m benchmarks.chat_ttft`.
+"""
+import os
+import tempfile
+from flask import Flask
+from flask_socketio import SocketIO
+
+
+def create_bench_app(db_path=None, sqlite_profile=None):
+    """Build an app_new-equivalent app bound to a throwaway SQLite file"""
+    from app_modules.models import db
+    from app_modules.routes.documents import documents_bp
+    from app_modules.routes.quiz import quiz_bp
+    from app_modules.routes.chat import chat_bp
+    from app_modules.routes.knowledge_graph import knowledge_graph_bp
+    from app_modules.routes.other import other_bp
+    from app_modules.routes.analytics import analytics_bp
+    from app_modules.routes.search import search_bp
+    from app_modules.services.search_index import SearchService
+    from app_modules.services.user_registry import user_registry
+    from app_modules.sockets.handlers import register_socket_handlers
+    from app_modules.utils.sqlite_profile import init_sqlite
+    from app_modules.utils.db_migration import migrate_database_schema
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='intellilearn_bench_'), 'bench.db')
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_sqlite(app, db, sqlite_profile)
+    socketio = SocketIO(app, async_mode='threading')
+
+    for bp in (documents_bp, quiz_bp, chat_bp, knowledge_graph_bp, other_bp, analytics_bp, search_bp):
+        app.register_blueprint(bp)
+    register_socket_handlers(socketio)
+
+    with app.app_context():
+        db.create_all()
+        migrate_database_schema(db.engine)
+        SearchService.install()
+    user_registry.clear()
+    return app, socketio
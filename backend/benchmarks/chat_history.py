@@ -0,0 +1,95 @@
+"""
+Chat history paging: LIMIT/OFFSET without an index vs keyset cursors on
+the (user_id, timestamp, id) index.
+
+Fills a throwaway database with one heavy user (20k messages, many
+sharing a timestamp second) among 200 other users, walks the heavy
+user's entire history page by page through GET /api/chat/history and
+checks that every message is returned exactly once. It also times a
+page deep in the history both ways and prints SQLite's query plan:
+    python -m benchmarks.chat_history
+"""
+import random
+import statistics
+import time
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage, User
+
+HEAVY_USER = 'heavy-user'
+HEAVY_MESSAGES = 20000
+OTHER_USERS = 200
+OTHER_MESSAGES = 200
+
+
+def populate():
+    rng = random.Random(5)
+    users = [HEAVY_USER] + [f'user-{n}' for n in range(OTHER_USERS)]
+    db.session.execute(User.__table__.insert(), [{'id': user} for user in users])
+    rows = [{'user_id': f'user-{n}', 'question': 'q' * 40, 'answer': 'a' * rng.randint(100, 2000),
+             'timestamp': f'2026-01-{1 + i % 28:02d} 10:{i % 60:02d}:00'}
+            for n in range(OTHER_USERS) for i in range(OTHER_MESSAGES)]
+    # Ten messages per second, so pages regularly split a run of equal timestamps
+    rows += [{'user_id': HEAVY_USER, 'question': f'question {i}', 'answer': 'a' * rng.randint(100, 4000),
+              'timestamp': f'2026-02-{1 + i // 36000:02d} {i // 36000 % 24:02d}:{i // 600 % 60:02d}:{i // 10 % 60:02d}'}
+             for i in range(HEAVY_MESSAGES)]
+    rng.shuffle(rows)
+    # Raw SQL so timestamps are stored as text exactly like server_default=now() writes them
+    db.session.execute(db.text('INSERT INTO chat_message (user_id, question, answer, timestamp) '
+                               'VALUES (:user_id, :question, :answer, :timestamp)'), rows)
+    db.session.commit()
+
+
+def time_query(sql, params, rounds=20):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        db.session.execute(db.text(sql), params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    app, _ = create_bench_app()
+    client = app.test_client()
+    with app.app_context():
+        populate()
+
+        seen, pages, cursor = [], 0, None
+        start = time.perf_counter()
+        while True:
+            url = f'/api/chat/history/{HEAVY_USER}?limit=200' + (f'&before={cursor}' if cursor else '')
+            body = client.get(url).json
+            seen += [message['id'] for message in body['messages']]
+            pages += 1
+            cursor = body['nextCursor']
+            if not body['hasMore']:
+                break
+        walk = time.perf_counter() - start
+        total = ChatMessage.query.filter_by(user_id=HEAVY_USER).count()
+        print(f"Walked {pages} pages in {walk:.2f}s: {len(seen)} messages, {len(set(seen))} unique, {total} stored")
+        assert len(seen) == len(set(seen)) == total, 'keyset paging skipped or repeated messages'
+
+        depth = HEAVY_MESSAGES - 500
+        deep = db.session.execute(db.text(
+            'SELECT timestamp, id FROM chat_message WHERE user_id = :u ORDER BY timestamp DESC, id DESC '
+            'LIMIT 1 OFFSET :o'), {'u': HEAVY_USER, 'o': depth}).one()
+        offset_sql = ('SELECT * FROM chat_message WHERE user_id = :u ORDER BY timestamp DESC, id DESC '
+                      'LIMIT 50 OFFSET :o')
+        keyset_sql = ('SELECT * FROM chat_message WHERE user_id = :u AND timestamp <= :t AND (timestamp < :t OR id < :i) '
+                      'ORDER BY timestamp DESC, id DESC LIMIT 50')
+        keyset = {'u': HEAVY_USER, 't': deep.timestamp, 'i': deep.id}
+
+        with_index = (time_query(offset_sql, {'u': HEAVY_USER, 'o': depth}), time_query(keyset_sql, keyset))
+        plan = db.session.execute(db.text('EXPLAIN QUERY PLAN ' + keyset_sql), keyset).fetchall()
+        db.session.execute(db.text('DROP INDEX ix_chat_message_user_timestamp'))
+        without_index = (time_query(offset_sql, {'u': HEAVY_USER, 'o': depth}), time_query(keyset_sql, keyset))
+
+    print(f"\nPage of 50 at depth {depth:,} (ms)   {'OFFSET':>8} {'keyset':>8}")
+    print(f"  no index                      {without_index[0]:>8.2f} {without_index[1]:>8.2f}")
+    print(f"  (user_id, timestamp, id)      {with_index[0]:>8.2f} {with_index[1]:>8.2f}")
+    print('Keyset plan: ' + '; '.join(row[-1] for row in plan))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Multi-turn chat memory: prompt size as a conversation grows.
+
+Simulates a long tutoring session against the fake provider and compares
+the chat prompt when replaying the full transcript with the bounded
+ConversationMemory block (recent turns + rolling summary):
+    python -m benchmarks.chat_memory
+"""
+import os
+import time
+
+os.environ.setdefault('LLM_PROVIDER', 'fake')
+os.environ.setdefault('FAKE_LLM_FIRST_TOKEN_MS', '0')
+os.environ.setdefault('FAKE_LLM_TOKEN_MS', '0')
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage, User
+from app_modules.services.chat_memory import ConversationMemory, CHAT_MEMORY_TOKEN_BUDGET
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.retrieval import estimate_tokens
+
+TURNS = 40
+CHECKPOINTS = (1, 5, 10, 20, 40)
+
+
+def main():
+    app, _ = create_bench_app()
+    user_id = 'bench-memory-user'
+    with app.app_context():
+        db.session.add(User(id=user_id))
+        db.session.commit()
+
+        print(f"\n🧠 {TURNS} turns, memory budget {CHAT_MEMORY_TOKEN_BUDGET} tokens")
+        print(f"{'turn':>6}{'full transcript':>18}{'bounded memory':>17}{'render ms':>11}")
+        for turn in range(1, TURNS + 1):
+            question = f'Follow-up question number {turn} about photosynthesis?'
+            start = time.perf_counter()
+            history = ConversationMemory.render(user_id)
+            render_ms = (time.perf_counter() - start) * 1000
+
+            if turn in CHECKPOINTS:
+                messages = ChatMessage.query.filter_by(user_id=user_id).order_by(ChatMessage.id).all()
+                transcript = '\n\n'.join(f"Student: {m.question}\nAI: {m.answer}" for m in messages)
+                full = estimate_tokens(GeminiService.build_chat_prompt(question, history=transcript))
+                bounded = estimate_tokens(GeminiService.build_chat_prompt(question, history=history))
+                print(f"{turn:>6}{full:>18}{bounded:>17}{render_ms:>11.2f}")
+
+            answer = GeminiService.get_response(question, user_id=user_id, history=history)
+            db.session.add(ChatMessage(user_id=user_id, question=question, answer=answer))
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Time-to-first-token: blocking /api/chat/ask vs streaming 'chat_ask' socket event.
+
+Uses the deterministic FakeProvider so it runs offline:
+    python -m benchmarks.chat_ttft --runs 5 --first-token-ms 300 --token-ms 15
+"""
+import argparse
+import logging
+import socket
+import statistics
+import threading
+import time
+import requests
+import socketio as socketio_client
+
+from benchmarks import create_bench_app
+from app_modules.services.llm_providers import set_provider
+from benchmarks.fake_llm import FakeProvider
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_http(base_url, question):
+    start = time.perf_counter()
+    response = requests.post(f'{base_url}/api/chat/ask', json={'user_id': 'bench_user', 'question': question})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    # The blocking endpoint's first byte is its full answer
+    return elapsed, elapsed
+
+
+def measure_stream(base_url, question):
+    client = socketio_client.Client()
+    first_chunk = {}
+    done = threading.Event()
+
+    @client.on('chat_chunk')
+    def on_chunk(data):
+        first_chunk.setdefault('t', time.perf_counter())
+
+    @client.on('chat_done')
+    def on_done(data):
+        done.set()
+
+    client.connect(base_url, transports=['polling'])
+    start = time.perf_counter()
+    client.emit('chat_ask', {'user_id': 'bench_user', 'question': question})
+    done.wait(timeout=60)
+    total = time.perf_counter() - start
+    client.disconnect()
+    return first_chunk['t'] - start, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=15)
+    parser.add_argument('--tokens', type=int, default=120)
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    set_provider(FakeProvider(args.first_token_ms / 1000, args.token_ms / 1000, args.tokens))
+    app, sio = create_bench_app()
+    port = _free_port()
+    threading.Thread(
+        target=lambda: sio.run(app, port=port, allow_unsafe_werkzeug=True, log_output=False),
+        daemon=True
+    ).start()
+    base_url = f'http://127.0.0.1:{port}'
+    time.sleep(1.0)
+
+    question = 'Explain photosynthesis'
+    results = {'http /api/chat/ask': [], 'socket chat_ask': []}
+    for _ in range(args.runs):
+        results['http /api/chat/ask'].append(measure_http(base_url, question))
+        results['socket chat_ask'].append(measure_stream(base_url, question))
+
+    print(f"\n⏱️ Chat latency over {args.runs} runs "
+          f"(first token {args.first_token_ms:.0f} ms, {args.tokens} tokens @ {args.token_ms:.0f} ms)")
+    print(f"{'mode':<22}{'TTFT median':>14}{'total median':>14}")
+    for mode, samples in results.items():
+        ttft = statistics.median(s[0] for s in samples) * 1000
+        total = statistics.median(s[1] for s in samples) * 1000
+        print(f"{mode:<22}{ttft:>11.0f} ms{total:>11.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Offline concept extraction: capitalised-word counting vs NumPy TextRank.
+
+Prints the concepts each extractor finds in a short study passage, then
+times both extractors on documents from ~50 KB up to ~2 MB (the TextRank
+extractor reads at most CONCEPT_MAX_CHARS of them):
+    python -m benchmarks.concept_extraction
+"""
+import re
+import statistics
+import time
+
+from benchmarks.context_selection import build_document
+from app_modules.services.concept_extractor import ConceptExtractor
+
+PASSAGE = """Photosynthesis is the process by which green plants convert light energy into chemical energy. \
+It takes place in the chloroplasts, which contain the pigment chlorophyll. Chlorophyll absorbs light energy mostly \
+in the blue and red wavelengths.
+The light-dependent reactions occur in the thylakoid membranes. Here, light energy splits water molecules, releasing \
+oxygen. The energy is stored in ATP and NADPH.
+The Calvin cycle takes place in the stroma of the chloroplast. It uses ATP and NADPH from the light-dependent \
+reactions to fix carbon dioxide into glucose. The Calvin cycle is also called the light-independent reactions.
+Figure 2 shows the chloroplast structure. Chapter 3 covers cellular respiration, which breaks glucose down to \
+release energy. Cellular respiration occurs in the mitochondria and produces ATP. Plants perform both \
+photosynthesis and cellular respiration."""
+
+
+def old_extract(text):
+    """The capitalised-word counter GeminiService used before"""
+    words = re.findall(r'\b[A-Z][a-z]{3,}(?:\s+[A-Z][a-z]+)*\b', text)
+    word_freq = {}
+    for word in words:
+        if word not in ['The', 'This', 'That', 'These', 'There']:
+            word_freq[word] = word_freq.get(word, 0) + 1
+    return [word for word, _ in sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:6]]
+
+
+def large_document(target_chars):
+    """The synthetic chapter document plus the passage, repeated to size"""
+    base = build_document() + '\n\n' + PASSAGE
+    copies = max(1, target_chars // len(base))
+    return '\n\n'.join(f'Part {n}. {base}' for n in range(copies))
+
+
+def time_extract(text, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        ConceptExtractor.extract(text)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    concepts = ConceptExtractor.extract(PASSAGE)
+    links = sum(len(concept['related']) for concept in concepts)
+    print(f"\n📄 Study passage ({len(PASSAGE):,} chars)")
+    print(f"  old:      {', '.join(old_extract(PASSAGE))}")
+    print(f"  textrank: {', '.join(concept['name'] for concept in concepts)}  ({links} concept links)")
+
+    print(f"\n{'size':>10} {'old ms':>8} {'textrank ms':>12}")
+    for target in (50_000, 500_000, 2_000_000):
+        text = large_document(target)
+        start = time.perf_counter()
+        old_extract(text)
+        old_ms = (time.perf_counter() - start) * 1000
+        print(f"{len(text) / 1024:>8.0f}KB {old_ms:>8.1f} {time_extract(text, 5):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Chat context selection: fixed text[:2000] slice vs BM25 top-k chunks.
+
+Builds a synthetic multi-chapter study document and asks one question per
+chapter, reporting prompt size, whether the answering chapter made it into
+the context, and selection latency:
+    python -m benchmarks.context_selection
+"""
+import statistics
+import time
+
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.retrieval import DocumentIndexCache, select_context, document_index_cache
+
+CHAPTERS = [
+    ('cell biology', 'mitochondria', 'Mitochondria produce ATP through cellular respiration in the cell.'),
+    ('photosynthesis', 'chlorophyll', 'Chlorophyll absorbs sunlight so plants can make glucose.'),
+    ('genetics', 'alleles', 'Alleles are variants of a gene inherited from each parent.'),
+    ('evolution', 'natural selection', 'Natural selection favours traits that improve survival.'),
+    ('ecology', 'food webs', 'Food webs describe energy flow between producers and consumers.'),
+    ('human anatomy', 'ventricles', 'The ventricles pump blood out of the heart to the body.'),
+    ('nervous system', 'neurons', 'Neurons transmit electrical signals across synapses.'),
+    ('immunology', 'antibodies', 'Antibodies bind antigens and mark pathogens for destruction.'),
+    ('microbiology', 'bacteria', 'Bacteria reproduce by binary fission every twenty minutes.'),
+    ('biochemistry', 'enzymes', 'Enzymes lower activation energy and speed up reactions.'),
+    ('botany', 'xylem', 'Xylem carries water from the roots up to the leaves.'),
+    ('zoology', 'vertebrates', 'Vertebrates have a backbone made of vertebrae.'),
+]
+
+QUESTIONS = [
+    'What do mitochondria produce?',
+    'How does chlorophyll help plants?',
+    'What are alleles?',
+    'Explain natural selection',
+    'What do food webs describe?',
+    'What do the ventricles do?',
+    'How do neurons send signals?',
+    'What do antibodies bind to?',
+    'How do bacteria reproduce?',
+    'Why are enzymes important?',
+    'What does xylem carry?',
+    'What makes an animal one of the vertebrates?',
+]
+
+FILLER = ('Students should review the key terms of this chapter carefully. The summary at the end lists the '
+          'main ideas. Practice questions help reinforce understanding of the material. ')
+
+
+def build_document():
+    parts = []
+    for number, (title, term, fact) in enumerate(CHAPTERS, 1):
+        parts.append(f'Chapter {number}: {title.title()}. {FILLER * 3}{fact} {FILLER * 3}')
+    return ' '.join(parts)
+
+
+def main():
+    text = build_document()
+    doc_id = 'bench-doc'
+
+    cache = DocumentIndexCache()
+    start = time.perf_counter()
+    cache.build(doc_id, text)
+    build_ms = (time.perf_counter() - start) * 1000
+    document_index_cache.build(doc_id, text)
+
+    old_prompt, new_prompt, old_hits, new_hits, latencies = [], [], 0, 0, []
+    for question, (_, term, fact) in zip(QUESTIONS, CHAPTERS):
+        old_context = text[:2000]
+        start = time.perf_counter()
+        new_context = select_context(doc_id, text, question)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        old_prompt.append(len(GeminiService.build_chat_prompt(question, old_context)))
+        new_prompt.append(len(GeminiService.build_chat_prompt(question, new_context)))
+        old_hits += fact in old_context
+        new_hits += fact in new_context
+
+    old_avg, new_avg = statistics.mean(old_prompt), statistics.mean(new_prompt)
+    print(f"\n📄 Document: {len(text):,} chars, {len(CHAPTERS)} chapters; {len(QUESTIONS)} questions")
+    print(f"Index build:                 {build_ms:.2f} ms")
+    print(f"{'':<28}{'slice[:2000]':>14}{'BM25 top-k':>14}")
+    print(f"{'avg prompt chars':<28}{old_avg:>14.0f}{new_avg:>14.0f}")
+    print(f"{'answer chapter in context':<28}{old_hits:>11}/{len(QUESTIONS)}{new_hits:>11}/{len(QUESTIONS)}")
+    print(f"Prompt size reduction:       {(1 - new_avg / old_avg) * 100:.1f}%")
+    print(f"Selection latency (cached):  p50 {statistics.median(latencies):.3f} ms, max {max(latencies):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
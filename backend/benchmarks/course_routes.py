@@ -0,0 +1,159 @@
+"""
+Statements per request and concurrent counter updates for the course routes.
+
+The course catalog routes and their models live only in the legacy app.py,
+which cannot be imported while it carries merge markers. This loads the
+catalog models (Course, Lesson, CourseEnrollment, CompletedLesson) and the
+COURSE MANAGEMENT ROUTES section from its source into a scratch app, seeds
+30 courses of 12 lessons with 10 enrollments, and reports:
+
+1. SQL statements sent per request for each course route.
+2. students_count after 40 parallel enrollments in one course, and
+   completed_lessons after 8 parallel lesson completions.
+
+tests/test_course_routes.py asserts the same numbers under pytest:
+    python -m benchmarks.course_routes
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from flask import Flask, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import case, event, func
+
+APP_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+USER = 'course-user'
+COURSES = 30
+LESSONS = 12
+ENROLLED = 10
+
+# name -> (method, url, json body)
+REQUESTS = {
+    'catalog': ('GET', f'/api/courses?user_id={USER}', None),
+    'catalog anonymous': ('GET', '/api/courses', None),
+    'details': ('GET', f'/api/courses/1?user_id={USER}', None),
+    'details anonymous': ('GET', '/api/courses/1', None),
+    'lessons': ('GET', f'/api/courses/1/lessons?user_id={USER}', None),
+    'progress': ('POST', '/api/courses/1/progress', {'user_id': USER, 'lesson_id': 5}),
+    'enroll': ('POST', f'/api/courses/{COURSES}/enroll', {'user_id': USER}),
+}
+
+
+def course_sources(path=APP_SOURCE):
+    """(catalog model source, course route source) cut out of app.py"""
+    with open(path) as f:
+        source = f.read()
+    models = source[source.index('class Course(db.Model):\n    """Stores courses created by teachers or platform"""'):]
+    models = models[:models.index('\n=======')]
+    routes = source[source.index('# =========== COURSE MANAGEMENT ROUTES'):
+                    source.index('# =========== SEED SAMPLE COURSES')]
+    return models, routes
+
+
+def create_course_app(db_path=None):
+    """Scratch app serving the app.py course routes; returns (app, db, models by name)"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='intellilearn_courses_'), 'courses.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db = SQLAlchemy(app)
+
+    namespace = {'app': app, 'db': db, 'request': request, 'jsonify': jsonify, 'datetime': datetime,
+                 'func': func, 'case': case}
+    exec("class User(db.Model):\n    id = db.Column(db.String(100), primary_key=True)\n", namespace)
+    models, routes = course_sources()
+    exec(models, namespace)
+    exec(routes, namespace)
+    with app.app_context():
+        db.create_all()
+    return app, db, {name: namespace[name] for name in ('Course', 'Lesson', 'CourseEnrollment', 'CompletedLesson')}
+
+
+def seed(db, models):
+    """COURSES courses of LESSONS lessons; USER is enrolled in the first ENROLLED with 3 lessons done"""
+    Course, Lesson = models['Course'], models['Lesson']
+    CourseEnrollment, CompletedLesson = models['CourseEnrollment'], models['CompletedLesson']
+    for number in range(COURSES):
+        course = Course(title=f'Course {number}', subject='Maths', category='math', instructor='Instructor',
+                        total_lessons=LESSONS, students_count=0)
+        db.session.add(course)
+        db.session.flush()
+        for order in range(LESSONS):
+            db.session.add(Lesson(course_id=course.id, week=order // 3 + 1, title=f'Lesson {order}', order=order))
+    db.session.commit()
+    for course_id in range(1, ENROLLED + 1):
+        enrollment = CourseEnrollment(user_id=USER, course_id=course_id, progress=25, completed_lessons=3)
+        db.session.add(enrollment)
+        db.session.flush()
+        for lesson in range(1, 4):
+            db.session.add(CompletedLesson(enrollment_id=enrollment.id, lesson_id=(course_id - 1) * LESSONS + lesson))
+    db.session.commit()
+
+
+def count_statements(app, db, name):
+    """(statements sent, response) for one request from REQUESTS"""
+    method, url, body = REQUESTS[name]
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = app.test_client().open(url, method=method, json=body)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return len(statements), response
+
+
+def concurrent_enrollments(app, db, models, course_id, students=40):
+    """students_count after `students` parallel enrollments in one course"""
+    def enroll(number):
+        app.test_client().post(f'/api/courses/{course_id}/enroll', json={'user_id': f'student-{number}'})
+    run_parallel(enroll, students)
+    with app.app_context():
+        return db.session.get(models['Course'], course_id).students_count
+
+
+def concurrent_completions(app, db, models, course_id, lessons=8):
+    """(completed_lessons before, after) `lessons` parallel completions by USER in one enrolled course"""
+    CourseEnrollment = models['CourseEnrollment']
+    with app.app_context():
+        before = CourseEnrollment.query.filter_by(user_id=USER, course_id=course_id).first().completed_lessons
+    first = (course_id - 1) * LESSONS + 4  # lessons 1-3 are already done
+
+    def complete(number):
+        app.test_client().post(f'/api/courses/{course_id}/progress', json={'user_id': USER, 'lesson_id': first + number})
+    run_parallel(complete, lessons)
+    with app.app_context():
+        return before, CourseEnrollment.query.filter_by(user_id=USER, course_id=course_id).first().completed_lessons
+
+
+def run_parallel(target, count):
+    threads = [threading.Thread(target=target, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    app, db, models = create_course_app()
+    with app.app_context():
+        seed(db, models)
+    print(f"{COURSES} courses of {LESSONS} lessons, {ENROLLED} enrolled\n")
+    for name in REQUESTS:
+        statements, response = count_statements(app, db, name)
+        print(f"{name:>18}: {statements} statements, status {response.status_code}")
+
+    print(f"\nstudents_count after 40 parallel enrollments: {concurrent_enrollments(app, db, models, COURSES - 1)}")
+    before, after = concurrent_completions(app, db, models, 2)
+    print(f"completed_lessons after 8 parallel completions: {before} -> {after}")
+
+
+if __name__ == '__main__':
+    main()
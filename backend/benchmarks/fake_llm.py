@@ -0,0 +1,140 @@
+"""
+Offline LLM test double for the tests, benchmarks and mock_llm_server.py.
+
+FakeProvider answers in-process with deterministic text; JSON prompts are
+answered from canned responses that each feature registers next to its
+prompt below with @canned_response. Selected with LLM_PROVIDER=fake (see
+llm_providers.PROVIDER_MODULES), so production code never imports it.
+"""
+import json
+import os
+import re
+import time
+
+from app_modules.services.llm_providers import LLMProvider, register_provider
+
+# Prompt pattern -> JSON payload (or callable building one from the prompt).
+# The mock server accepts extra entries from a --canned file.
+CANNED_JSON_RESPONSES = []
+
+
+def register_canned_response(pattern, payload):
+    """Answer prompts matching `pattern` (case-insensitive regex) with `payload`"""
+    CANNED_JSON_RESPONSES.append((pattern, payload))
+    return payload
+
+
+def canned_response(pattern):
+    """Decorator form of register_canned_response for payload builders"""
+    return lambda build: register_canned_response(pattern, build)
+
+
+def canned_json_for(prompt, canned=None):
+    for pattern, payload in (canned or CANNED_JSON_RESPONSES):
+        if re.search(pattern, prompt, re.IGNORECASE):
+            return payload(prompt) if callable(payload) else payload
+    return None
+
+
+def fake_answer_tokens(prompt, num_tokens):
+    """Deterministic word tokens for a prompt, shared by the offline providers"""
+    match = re.search(r"STUDENT'S QUESTION:\s*(.+)", prompt)
+    topic = match.group(1).strip() if match else prompt.strip()[:80]
+    words = f"Here is a study answer about **{topic}**.".split()
+    filler = "This is a deterministic offline answer used for testing.".split()
+    while len(words) < num_tokens:
+        words.extend(filler)
+    return [word + ' ' for word in words[:num_tokens]]
+
+
+# ---------------------------------------------------------------- micro_batcher.build_batch_prompt
+
+@canned_response(r'^Complete each of these independent tasks')
+def _batch_tasks(prompt):
+    """Answer a micro-batched prompt task by task"""
+    parts = re.split(r'^### TASK (\d+)$', prompt, flags=re.MULTILINE)
+    return [{'id': int(task_id), 'result': canned_json_for(task.strip())}
+            for task_id, task in zip(parts[1::2], parts[2::2])]
+
+
+# ---------------------------------------------------------------- GeminiService.explain_concepts_batch
+
+@canned_response(r'Explain each of these concepts')
+def _batch_explanations(prompt):
+    names = re.findall(r'^- (.+)$', prompt.split('CONTEXT:')[0], re.MULTILINE)
+    return [{
+        'name': name.strip(),
+        'explanation': f'{name.strip()} is a central idea in the study material.',
+        'keyPoints': ['Know the definition.', 'Recognise it in examples.', 'Practice applying it.'],
+    } for name in names]
+
+
+# ---------------------------------------------------------------- long_document_qa map step
+
+@canned_response(r'^Read section \d+ of \d+ of a longer study document')
+def _section_answer(prompt):
+    """Quote the section sentences that mention a question term"""
+    question = re.search(r'^QUESTION: (.+)$', prompt, re.MULTILINE).group(1)
+    section = prompt.split('SECTION:', 1)[1].split('\nReturn ONLY', 1)[0]
+    terms = {t for t in re.findall(r'[a-z]{4,}', question.lower())}
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', section)
+                 if terms & set(re.findall(r'[a-z]{4,}', s.lower()))]
+    exhaustive = re.search(r'\b(all|every|each|list)\b', question, re.IGNORECASE)
+    return {'relevant': bool(sentences), 'answer': ' '.join(list(dict.fromkeys(sentences))[:8]),
+            'complete': bool(sentences) and not exhaustive}
+
+
+# ---------------------------------------------------------------- GeminiService.extract_concepts
+
+register_canned_response(r'extract the 5-7 most important key concepts', [
+    {'name': 'Core Principles', 'description': 'The foundational ideas the material builds on.'},
+    {'name': 'Key Terminology', 'description': 'Vocabulary needed to follow the material.'},
+    {'name': 'Worked Examples', 'description': 'Step-by-step applications of the main ideas.'},
+    {'name': 'Cause And Effect', 'description': 'How the described processes influence each other.'},
+    {'name': 'Practical Applications', 'description': 'Where the ideas are used in the real world.'},
+    {'name': 'Common Misconceptions', 'description': 'Frequent mistakes students make with this topic.'},
+])
+
+
+# ---------------------------------------------------------------- GeminiService.explain_concept
+
+register_canned_response(r'Explain this concept', {
+    'explanation': 'This concept is a central idea in the study material. It links the main themes together.',
+    'keyPoints': ['Know the definition.', 'Recognise it in examples.', 'Practice applying it.'],
+})
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic in-process provider for tests and offline benchmarks.
+    Emits a fixed answer word by word, simulating Gemini's time to first
+    token and per-token generation delay without any network access.
+    """
+    name = 'fake'
+
+    def __init__(self, first_token_delay=None, token_delay=None, num_tokens=None):
+        self.first_token_delay = first_token_delay if first_token_delay is not None else \
+            float(os.getenv('FAKE_LLM_FIRST_TOKEN_MS', 300)) / 1000
+        self.token_delay = token_delay if token_delay is not None else \
+            float(os.getenv('FAKE_LLM_TOKEN_MS', 15)) / 1000
+        self.num_tokens = num_tokens if num_tokens is not None else int(os.getenv('FAKE_LLM_TOKENS', 120))
+
+    def generate(self, prompt, generation_config=None):
+        return ''.join(self.stream(prompt, generation_config))
+
+    def stream(self, prompt, generation_config=None):
+        time.sleep(self.first_token_delay)
+        for idx, token in enumerate(fake_answer_tokens(prompt, self.num_tokens)):
+            if idx:
+                time.sleep(self.token_delay)
+            yield token
+
+    def generate_json(self, prompt, generation_config=None):
+        payload = canned_json_for(prompt)
+        if payload is None:
+            return super().generate_json(prompt, generation_config)
+        time.sleep(self.first_token_delay)
+        return json.loads(json.dumps(payload))
+
+
+register_provider('fake', FakeProvider)
@@ -0,0 +1,80 @@
+"""
+Offline/fallback chat path: extractive local QA and compiled intent routing.
+
+Asks one question per chapter of the synthetic document from
+benchmarks.context_selection with no LLM available and reports whether
+the answering sentence is in the reply (old 400-char preview vs BM25
+sentence ranking), answer latency, and intent routing cost of the old
+sequential substring/regex chain vs the single-pass matcher:
+    python -m benchmarks.fallback_qa
+"""
+import re
+import statistics
+import time
+
+from benchmarks.context_selection import CHAPTERS, QUESTIONS, build_document
+from app_modules.services.fallback_service import FallbackResponseService, match_intent
+from app_modules.services.local_qa import sentence_index_cache
+from app_modules.services.retrieval import select_context
+
+ROUTING_SAMPLES = QUESTIONS + ['hello there', 'thanks a lot', 'table of 7', 'what is 12 x 9', 'help',
+                               'what is this chapter about', 'which planet is largest']
+
+
+def old_intent(q):
+    """The sequential chain FallbackResponseService used before"""
+    if any(w in q for w in ['hello', 'hi', 'hey', 'greetings']):
+        return 'greeting'
+    if any(w in q for w in ['thank', 'thanks', 'thx']):
+        return 'thanks'
+    if 'how are you' in q:
+        return 'how_are_you'
+    if 'who are you' in q or 'what is your name' in q:
+        return 'identity'
+    for name, pattern in (('table', r'table\s+(?:of\s+)?(\d+)|(\d+)\s+table'), ('mult', r'(\d+)\s*[x×*]\s*(\d+)'),
+                          ('add', r'(\d+)\s*\+\s*(\d+)'), ('sub', r'(\d+)\s*-\s*(\d+)'),
+                          ('div', r'(\d+)\s*[/÷]\s*(\d+)')):
+        if re.search(pattern, q):
+            return name
+    if 'help' in q or 'what can you do' in q:
+        return 'help'
+    return None
+
+
+def time_routing(fn, rounds=2000):
+    samples = [s.lower() for s in ROUTING_SAMPLES]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for q in samples:
+            fn(q)
+    return (time.perf_counter() - start) / (rounds * len(samples)) * 1e6
+
+
+def main():
+    text = build_document()
+    doc_id = 'bench-doc'
+    sentence_index_cache.build(doc_id, text)
+
+    old_hits = new_hits = 0
+    latencies = []
+    for question, (_, _, fact) in zip(QUESTIONS, CHAPTERS):
+        context = select_context(doc_id, text, question)
+        # The old chain only reached the preview when no intent matched first
+        old_hits += old_intent(question.lower()) is None and fact in context[:400]
+        start = time.perf_counter()
+        answer = FallbackResponseService.get_response(question, context, doc_id=doc_id, document_text=text)
+        latencies.append((time.perf_counter() - start) * 1000)
+        new_hits += fact.rstrip('.').split()[-1] in answer and 'From your study material' in answer
+
+    misrouted = [q for q in ROUTING_SAMPLES if old_intent(q.lower()) != match_intent(q.lower())[0]]
+    print(f"\n🔌 Offline answers for {len(QUESTIONS)} document questions ({len(text):,} chars)")
+    print(f"Answering sentence in reply:  old preview {old_hits}/{len(QUESTIONS)}, "
+          f"extractive {new_hits}/{len(QUESTIONS)}")
+    print(f"Answer latency (cached index): p50 {statistics.median(latencies):.2f} ms, max {max(latencies):.2f} ms")
+    print(f"Intent routing per question:  sequential {time_routing(old_intent):.2f} µs, "
+          f"single-pass {time_routing(lambda q: match_intent(q)):.2f} µs")
+    print(f"Questions routed differently: {misrouted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Server-side layout and level-of-detail paging for large library graphs.
+
+Builds synthetic libraries of a few thousand concepts and reports the
+cost of the full NumPy force layout, of laying out one more upload
+incrementally against the existing positions, and the payload of a
+50-node subgraph page or 1-hop neighbourhood vs the full graph the
+browser would otherwise have to lay out itself:
+    python -m benchmarks.graph_layout
+"""
+import json
+import random
+import time
+
+import networkx as nx
+
+from app_modules.services.library_graph import _Library
+
+WORDS = [f'{a}{b}' for a in ('cell', 'wave', 'atom', 'gene', 'rock', 'star', 'acid', 'bond', 'heat', 'lens')
+         for b in ('ular', 'form', 'line', 'core', 'mass', 'flow', 'gram', 'type', 'tide', 'zone',
+                   'path', 'lock', 'field', 'shift', 'point', 'frame', 'scale', 'phase', 'chain', 'state')]
+SIZES = (200, 1000)  # documents
+
+
+def synthetic_documents(count, rng):
+    for index in range(count):
+        yield f'doc-{index}', [{'name': f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}'}
+                               for _ in range(7)]
+
+
+def main():
+    rng = random.Random(11)
+    print(f"{'docs':>5} {'nodes':>6} {'edges':>7} {'full layout s':>14} {'+1 upload ms':>13} "
+          f"{'full KB':>8} {'page KB':>8} {'1-hop KB':>9}")
+    for count in SIZES:
+        library = _Library(nx.Graph(documents={}))
+        for doc_id, concepts in synthetic_documents(count, rng):
+            library.add_document(doc_id, doc_id, concepts)
+
+        start = time.perf_counter()
+        library.layout()
+        full = time.perf_counter() - start
+
+        (doc_id, concepts), = synthetic_documents(1, rng)
+        start = time.perf_counter()
+        library.add_document('new-doc', 'new-doc', concepts)
+        library.layout()
+        incremental = (time.perf_counter() - start) * 1000
+
+        full_kb = len(library.serialize()[1]) / 1024
+        page_kb = len(json.dumps(library.subgraph(limit=50))) / 1024
+        focus = library.view()['ranked'][0]
+        hop_kb = len(json.dumps(library.subgraph(focus=focus, hops=1, limit=50))) / 1024
+        graph = library.graph
+        print(f'{count:>5} {graph.number_of_nodes():>6} {graph.number_of_edges():>7} {full:>14.2f} '
+              f'{incremental:>13.1f} {full_kb:>8.0f} {page_kb:>8.1f} {hop_kb:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
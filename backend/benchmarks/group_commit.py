@@ -0,0 +1,99 @@
+"""
+Answer submission under classroom load: a commit per answer vs group commit.
+
+STUDENTS threads each answer ANSWERS questions through POST
+/api/submit-answer (points update + QuestionAttempt insert), first with
+the writer stopped (every request commits its own transaction, as
+before) and then with the GroupCommitWriter running. Reports throughput,
+latency percentiles and how many commits were needed, and checks that
+every point and attempt was stored:
+    python -m benchmarks.group_commit
+"""
+import json
+import statistics
+import threading
+import time
+
+from benchmarks import create_bench_app
+from app_modules.models import db, Document, Quiz, QuizSession, QuestionAttempt, User
+from app_modules.services.group_commit import group_writer
+
+STUDENTS = 32
+ANSWERS = 40
+QUESTIONS = [{'question': f'Question {n}?', 'options': ['A', 'B', 'C', 'D'], 'correct': 'A'} for n in range(10)]
+
+
+def setup(label):
+    doc = Document(filename=f'{label}.txt', text_content='text', user_id='teacher')
+    db.session.add_all([User(id='teacher'), doc] if label == 'per-request' else [doc])
+    db.session.flush()
+    quiz = Quiz(difficulty='medium', questions_json=json.dumps(QUESTIONS), document_id=doc.id)
+    db.session.add(quiz)
+    db.session.flush()
+    sessions = {}
+    for n in range(STUDENTS):
+        user_id = f'{label}-student-{n}'
+        db.session.add(User(id=user_id))
+        session = QuizSession(user_id=user_id, quiz_id=quiz.id, difficulty='medium')
+        db.session.add(session)
+        db.session.flush()
+        sessions[user_id] = session.id
+    db.session.commit()
+    return quiz.id, sessions
+
+
+def student(app, quiz_id, user_id, session_id, latencies, errors):
+    client = app.test_client()
+    for n in range(ANSWERS):
+        start = time.perf_counter()
+        response = client.post('/api/submit-answer', json={
+            'user_id': user_id, 'quiz_id': quiz_id, 'question_index': n % len(QUESTIONS),
+            'answer': 'A' if n % 4 else 'B', 'session_id': session_id, 'time_spent': 12})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.json.get('error'))
+
+
+def run(app, label):
+    with app.app_context():
+        quiz_id, sessions = setup(label)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=student, args=(app, quiz_id, user_id, session_id, latencies, errors))
+               for user_id, session_id in sessions.items()]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        users = list(sessions)
+        points = db.session.query(db.func.sum(User.points)).filter(User.id.in_(users)).scalar()
+        attempts = QuestionAttempt.query.filter(QuestionAttempt.user_id.in_(users)).count()
+    expected_points = STUDENTS * (User.__table__.c.points.default.arg + sum(10 for n in range(ANSWERS) if n % 4))
+    ms = sorted(latency * 1000 for latency in latencies)
+    print(f"{label:>12} {len(ms) / elapsed:>9.0f} {statistics.median(ms):>8.1f} {ms[int(len(ms) * 0.99)]:>8.1f} "
+          f"{len(errors):>7} {points == expected_points and attempts == STUDENTS * ANSWERS!s:>7}")
+    if errors:
+        print(f"             first error: {errors[0]}")
+
+
+def main():
+    app, _ = create_bench_app()
+    print(f"{STUDENTS} students x {ANSWERS} answers")
+    print(f"{'writes':>12} {'answers/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'stored':>7}")
+    run(app, 'per-request')
+    group_writer.start(app)
+    try:
+        run(app, 'group')
+    finally:
+        group_writer.stop()
+    metrics = group_writer.metrics()
+    print(f"Group commit: {metrics['committed']} writes in {metrics['batches']} commits "
+          f"(avg batch {metrics['avg_batch']}, largest {metrics['largest_batch']}, "
+          f"avg commit {metrics['avg_commit_ms']} ms)")
+
+
+if __name__ == '__main__':
+    main()
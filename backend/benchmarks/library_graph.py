@@ -0,0 +1,90 @@
+"""
+Library-level concept graph: incremental updates vs rebuilding, and read cost.
+
+Uploads synthetic documents one by one (each mentions a handful of
+concepts from a shared vocabulary) and reports, at several library
+sizes, the time to patch the user's graph for one more upload, the time
+a from-scratch rebuild over every document would take, and the latency
+of GET /api/knowledge-graph/library (which should stay flat). Saves are
+debounced (LIBRARY_GRAPH_SAVE_DELAY_SECONDS), so the incremental column
+is what an upload pays; the layout and serialization happen once per burst:
+    python -m benchmarks.library_graph
+"""
+import random
+import statistics
+import time
+
+from benchmarks import create_bench_app
+from app_modules.models import db, Document, User, LibraryGraph
+from app_modules.services.library_graph import LibraryGraphService, _Library, document_concepts
+import networkx as nx
+
+SUBJECTS = ['Cell', 'Energy', 'Plant', 'Water', 'Protein', 'Light', 'Carbon', 'Nitrogen', 'Membrane', 'Enzyme',
+            'Genetic', 'Ocean', 'Climate', 'Atomic', 'Neural', 'Solar']
+TOPICS = ['Transport', 'Cycle', 'Structure', 'Division', 'Synthesis', 'Balance', 'Pressure', 'Signal', 'Storage',
+          'Reaction', 'Theory', 'Pathway']
+SIZES = (10, 50, 200)
+
+
+def build_text(rng):
+    sentences = []
+    for _ in range(6):
+        concept = f'{rng.choice(SUBJECTS)} {rng.choice(TOPICS)}'
+        sentences += [f'{concept} is discussed here in detail.'] * rng.randint(1, 4)
+    rng.shuffle(sentences)
+    return ' '.join(sentences)
+
+
+def edge_map(graph):
+    return {frozenset((a, b)): data for a, b, data in graph.edges(data=True)}
+
+
+def time_reads(client, user_id, rounds=50):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = client.get(f'/api/knowledge-graph/library?user_id={user_id}')
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(samples) * 1000
+
+
+def main():
+    app, _ = create_bench_app()
+    client = app.test_client()
+    rng = random.Random(7)
+    user_id = 'bench-user'
+
+    print(f"{'docs':>6} {'nodes':>6} {'edges':>6} {'incremental ms':>15} {'rebuild ms':>11} {'GET ms':>7} {'KB':>6}")
+    with app.app_context():
+        db.session.add(User(id=user_id))
+        db.session.commit()
+        for index in range(1, max(SIZES) + 1):
+            doc = Document(filename=f'notes_{index}.txt', text_content=build_text(rng), user_id=user_id)
+            db.session.add(doc)
+            db.session.commit()
+            start = time.perf_counter()
+            LibraryGraphService.add_document(doc)
+            incremental = (time.perf_counter() - start) * 1000
+            if index not in SIZES:
+                continue
+            # Write the debounced save now so the stored row matches this size
+            LibraryGraphService.flush(user_id)
+
+            start = time.perf_counter()
+            rebuilt = _Library(nx.Graph(documents={}))
+            for other in Document.query.filter_by(user_id=user_id).all():
+                rebuilt.add_document(other.id, other.filename, document_concepts(other))
+            rebuilt.serialize()
+            rebuild = (time.perf_counter() - start) * 1000
+
+            row = db.session.get(LibraryGraph, user_id)
+            graph = LibraryGraphService._cache[user_id].graph
+            assert set(graph) == set(rebuilt.graph) and edge_map(graph) == edge_map(rebuilt.graph), \
+                'incremental graph diverged from a rebuild'
+            print(f'{index:>6} {graph.number_of_nodes():>6} {graph.number_of_edges():>6} {incremental:>15.1f} '
+                  f'{rebuild:>11.1f} {time_reads(client, user_id):>7.2f} {len(row.response) / 1024:>6.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Offline load test of the LLM-backed endpoints against the mock LLM server.
+
+Starts mock_llm_server in-process, points the app at it through the
+MockHTTPProvider and fires concurrent chat / knowledge-graph / explain requests:
+    python -m benchmarks.llm_load --requests 60 --concurrency 12 --latency lognormal:600:0.4
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+from benchmarks import create_bench_app
+from mock_llm_server import MockLLM, make_handler
+from app_modules.models import db, User, Document
+from app_modules.services.llm_providers import MockHTTPProvider, set_provider
+from app_modules.services.llm_client import llm_client
+
+SAMPLE_TEXT = ("Photosynthesis converts light energy into chemical energy. Chlorophyll absorbs light in the "
+               "chloroplast. The Calvin Cycle fixes carbon dioxide into glucose. ") * 40
+
+
+def start_mock(args):
+    mock = MockLLM(args.latency, args.token_ms, args.tokens, args.error_rate, seed=args.seed)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(mock))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def seed(app):
+    with app.app_context():
+        db.session.add(User(id='bench_user'))
+        doc = Document(filename='photosynthesis.txt', text_content=SAMPLE_TEXT, user_id='bench_user')
+        db.session.add(doc)
+        db.session.commit()
+        return doc.id
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_endpoint(client, name, make_request, total, concurrency):
+    latencies = []
+    failures = [0]
+
+    def one(i):
+        start = time.perf_counter()
+        response = make_request(client, i)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            failures[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    print(f"{name:<20}{statistics.median(latencies) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}"
+          f"{max(latencies) * 1000:>9.0f}{total / wall:>9.1f}{failures[0]:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, default=12)
+    parser.add_argument('--latency', default='lognormal:600:0.4')
+    parser.add_argument('--token-ms', type=float, default=5)
+    parser.add_argument('--tokens', type=int, default=120)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server, url = start_mock(args)
+    set_provider(MockHTTPProvider(url))
+    app, _ = create_bench_app()
+    doc_id = seed(app)
+    client = app.test_client()
+
+    endpoints = [
+        ('chat/ask', lambda c, i: c.post('/api/chat/ask', json={
+            'user_id': f'bench_user_{i % 20}', 'question': f'Explain step {i}', 'doc_id': doc_id})),
+        ('knowledge-graph', lambda c, i: c.post('/api/knowledge-graph/generate', json={'doc_id': doc_id})),
+        ('explain', lambda c, i: c.post(f'/api/knowledge-graph/explain/Concept {i % 5}', json={'doc_id': doc_id})),
+    ]
+
+    print(f"\n🔥 {args.requests} requests/endpoint, concurrency {args.concurrency}, "
+          f"mock latency {args.latency}, error rate {args.error_rate:.0%}")
+    print(f"{'endpoint':<20}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'req/s':>9}{'fail':>7}")
+    for name, make_request in endpoints:
+        run_endpoint(client, name, make_request, args.requests, args.concurrency)
+
+    metrics = llm_client.metrics()
+    print(f"\nUpstream calls saved by coalescing: {metrics['coalescing']['upstream_calls_saved']}")
+    print(f"Circuit breaker: {metrics['circuit_breaker']['state']}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
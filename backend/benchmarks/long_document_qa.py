@@ -0,0 +1,71 @@
+"""
+Map-reduce question answering over a long document.
+
+Uses the synthetic 12-chapter document from benchmarks.context_selection
+against the mock LLM server and reports, for a whole-document question,
+how many chapters reach the model with top-k retrieval vs map-reduce, and
+the wall time of sequential vs parallel map calls; plus the calls saved by
+the early exit on a focused question:
+    python -m benchmarks.long_document_qa --latency fixed:500
+"""
+import argparse
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from mock_llm_server import MockLLM, make_handler
+from benchmarks.context_selection import CHAPTERS, build_document
+from app_modules.services import long_document_qa
+from app_modules.services.long_document_qa import LongDocumentQA
+from app_modules.services.llm_providers import MockHTTPProvider, set_provider
+from app_modules.services.retrieval import select_context
+
+WHOLE_DOCUMENT_QUESTION = 'List every chapter title in this document'
+FOCUSED_QUESTION = 'What do mitochondria produce?'
+
+
+def chapters_in(text):
+    return sum(bool(re.search(rf'Chapter {n}: {title.title()}', text)) for n, (title, _, _) in enumerate(CHAPTERS, 1))
+
+
+def timed(question, text, concurrency):
+    start = time.perf_counter()
+    result = LongDocumentQA.answer(question, text, concurrency=concurrency)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', default='fixed:500')
+    parser.add_argument('--section-chars', type=int, default=1800)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    mock = MockLLM(args.latency, token_ms=0)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(mock))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_provider(MockHTTPProvider(f'http://127.0.0.1:{server.server_address[1]}'))
+    long_document_qa.LONG_QA_SECTION_CHARS = args.section_chars
+
+    text = build_document()
+    top_k = select_context('bench-doc', text, WHOLE_DOCUMENT_QUESTION)
+    sequential, sequential_s = timed(WHOLE_DOCUMENT_QUESTION, text, 1)
+    parallel, parallel_s = timed(WHOLE_DOCUMENT_QUESTION, text, args.concurrency)
+    focused, focused_s = timed(FOCUSED_QUESTION, text, args.concurrency)
+    notes = '\n'.join(answer for _, answer in parallel['partials'])
+
+    print(f"\n📚 {len(text):,} chars, {parallel['stats']['sections']} sections, mock latency {args.latency}")
+    print(f"Whole-document question: {WHOLE_DOCUMENT_QUESTION!r}")
+    print(f"  chapters reaching the model:  top-k context {chapters_in(top_k)}/{len(CHAPTERS)}, "
+          f"map-reduce {chapters_in(notes)}/{len(CHAPTERS)}")
+    print(f"  sequential map (1 worker):    {sequential_s:.2f} s, {sequential['stats']['llm_calls']} LLM calls")
+    print(f"  parallel map ({args.concurrency} workers):     {parallel_s:.2f} s, {parallel['stats']['llm_calls']} LLM calls")
+    print(f"Focused question: {FOCUSED_QUESTION!r}")
+    print(f"  early exit: {focused['stats']['early_exit']}, {focused_s:.2f} s, "
+          f"{focused['stats']['llm_calls']} LLM calls")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Cross-request micro-batching of small JSON prompts.
+
+Fires concurrent concept explanations at the mock LLM server with the
+micro-batcher disabled and enabled, reporting caller latency and the
+number of upstream requests:
+    python -m benchmarks.micro_batching --callers 40 --latency fixed:600
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+from mock_llm_server import MockLLM, make_handler
+from app_modules.services.gemini_service import GeminiService
+from app_modules.services.llm_providers import MockHTTPProvider, set_provider
+from app_modules.services.micro_batcher import micro_batcher
+
+
+def run(callers, mock):
+    before = mock.stats['requests']
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        result = GeminiService.explain_concept(f'Concept {i}', 'Study material about concept number %d.' % i,
+                                               fallback=False)
+        latencies.append(time.perf_counter() - start)
+        return result is not None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        answered = sum(pool.map(one, range(callers)))
+    wall = time.perf_counter() - start
+    return statistics.median(latencies) * 1000, max(latencies) * 1000, wall, mock.stats['requests'] - before, answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--callers', type=int, default=40)
+    parser.add_argument('--latency', default='fixed:600')
+    parser.add_argument('--window-ms', type=float, default=10)
+    args = parser.parse_args()
+
+    mock = MockLLM(args.latency, token_ms=0)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(mock))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_provider(MockHTTPProvider(f'http://127.0.0.1:{server.server_address[1]}'))
+
+    print(f"\n📦 {args.callers} concurrent explain_concept calls, mock latency {args.latency}")
+    print(f"{'mode':<12}{'p50 ms':>9}{'max ms':>9}{'wall s':>9}{'upstream':>10}{'answered':>10}")
+    for mode, window in (('individual', 0), ('batched', args.window_ms / 1000)):
+        micro_batcher.max_wait = window
+        p50, worst, wall, upstream, answered = run(args.callers, mock)
+        print(f"{mode:<12}{p50:>9.0f}{worst:>9.0f}{wall:>9.2f}{upstream:>10}{answered:>7}/{args.callers}")
+    print(f"\nBatcher: {micro_batcher.metrics()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
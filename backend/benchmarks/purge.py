@@ -0,0 +1,98 @@
+"""
+Clearing a large chat history: one unbounded DELETE vs tombstone + batched
+background purge.
+
+Fills a throwaway database with 200k messages for one user, then clears
+them while another thread keeps saving chat messages for a different
+user. Reports how long the clear request takes and the worst and p99
+latency that writer sees, for the old single DELETE and for the
+tombstone + BackgroundPurger path:
+    python -m benchmarks.purge
+"""
+import statistics
+import threading
+import time
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage, User
+from app_modules.services.purger import BackgroundPurger
+
+MESSAGES = 200000
+
+
+def populate():
+    db.session.execute(db.text('DELETE FROM chat_message'))
+    db.session.execute(db.text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+        "INSERT INTO chat_message (user_id, question, answer) SELECT 'heavy', 'question ' || i, "
+        "printf('%.400c', 'a') FROM n"), {'count': MESSAGES})
+    db.session.commit()
+
+
+def writer(app, stop, latencies):
+    """Another user chatting: one INSERT + COMMIT per message"""
+    with app.app_context():
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.session.add(ChatMessage(user_id='other', question='q', answer='a'))
+            db.session.commit()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+
+def run(app, client, clear, wait_for_purge=None):
+    with app.app_context():
+        populate()
+    stop, latencies = threading.Event(), []
+    thread = threading.Thread(target=writer, args=(app, stop, latencies))
+    thread.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    clear(client)
+    request_ms = (time.perf_counter() - start) * 1000
+    if wait_for_purge:
+        wait_for_purge()
+    total_s = time.perf_counter() - start
+    time.sleep(0.2)
+    stop.set()
+    thread.join()
+    ms = sorted(latency * 1000 for latency in latencies)
+    return request_ms, total_s, max(ms), ms[int(len(ms) * 0.99)], statistics.median(ms)
+
+
+def main():
+    app, _ = create_bench_app()
+    client = app.test_client()
+    with app.app_context():
+        db.session.add_all([User(id='heavy'), User(id='other')])
+        db.session.commit()
+
+    def old_clear(_):
+        with app.app_context():
+            ChatMessage.query.filter_by(user_id='heavy').delete()
+            db.session.commit()
+
+    purger = BackgroundPurger(batch_size=500, pause=0.01, poll_interval=0.1)
+
+    def new_clear(c):
+        c.delete('/api/chat/clear/heavy')
+        purger.notify()
+
+    def wait_for_purge():
+        with app.app_context():
+            while db.session.execute(db.text("SELECT 1 FROM chat_message WHERE user_id = 'heavy' LIMIT 1")).first():
+                time.sleep(0.02)
+
+    results = {'single DELETE': run(app, client, old_clear)}
+    purger.start(app)
+    results['tombstone + purger'] = run(app, client, new_clear, wait_for_purge)
+    purger.stop()
+
+    print(f"\nClearing {MESSAGES:,} messages while another user keeps chatting")
+    print(f"{'':20} {'request ms':>11} {'done s':>7} {'writer max ms':>14} {'p99 ms':>7} {'p50 ms':>7}")
+    for label, (request_ms, total_s, worst, p99, p50) in results.items():
+        print(f"{label:20} {request_ms:>11.1f} {total_s:>7.2f} {worst:>14.1f} {p99:>7.1f} {p50:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
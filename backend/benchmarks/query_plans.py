@@ -0,0 +1,105 @@
+"""
+Query-plan regression check for the hot per-user queries.
+
+Runs each query the routes issue (through the ORM, so tombstone criteria
+and the like are included), captures the SQL actually sent to SQLite and
+runs EXPLAIN QUERY PLAN on it. A query fails if SQLite would scan one of
+its tables or sort with a temporary B-tree where an index should supply
+the order. Exits non-zero on any failure; tests/test_query_plans.py runs
+the same checks under pytest:
+    python -m benchmarks.query_plans
+"""
+import re
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage, ConceptMastery, CourseEnrollment, Document, QuestionAttempt, \
+    QuizAttempt, QuizSession, StudentAnalytics
+
+USER = 'plan-user'
+SINCE = datetime.utcnow() - timedelta(days=7)
+
+# name -> query, as issued by the routes and services
+HOT_QUERIES = {
+    'quiz attempts by user': lambda: QuizAttempt.query.filter_by(user_id=USER).all(),
+    'quiz attempts by quiz (purge)': lambda: QuizAttempt.query.filter(QuizAttempt.quiz_id.in_(['q1', 'q2'])).all(),
+    'recent quiz sessions': lambda: QuizSession.query.filter_by(user_id=USER)
+        .order_by(QuizSession.created_at.desc()).limit(20).all(),
+    'quiz sessions oldest first': lambda: QuizSession.query.filter_by(user_id=USER)
+        .order_by(QuizSession.created_at).all(),
+    'quiz sessions completed since': lambda: QuizSession.query.filter(
+        QuizSession.user_id == USER, QuizSession.completed_at >= SINCE).order_by(QuizSession.completed_at).all(),
+    'question attempts by user': lambda: QuestionAttempt.query.filter_by(user_id=USER).all(),
+    'question attempts by quiz (purge)': lambda: QuestionAttempt.query.filter(
+        QuestionAttempt.quiz_id.in_(['q1', 'q2'])).all(),
+    'chat history page': lambda: ChatMessage.query.filter_by(user_id=USER)
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(50).all(),
+    'recent documents': lambda: Document.query.filter_by(user_id=USER)
+        .order_by(Document.created_at.desc()).limit(5).all(),
+    'library documents': lambda: Document.query.filter_by(user_id=USER).order_by(Document.created_at).all(),
+    'enrollments by user': lambda: CourseEnrollment.query.filter_by(user_id=USER).all(),
+    'enrollment lookup': lambda: CourseEnrollment.query.filter_by(user_id=USER, course_id=1).first(),
+    'enrollments by course': lambda: CourseEnrollment.query.filter_by(course_id=1).all(),
+    'student analytics': lambda: StudentAnalytics.query.filter_by(user_id=USER).first(),
+    'weekly leaderboard': lambda: StudentAnalytics.query.filter(StudentAnalytics.last_activity >= SINCE).all(),
+    'concept mastery': lambda: ConceptMastery.query.filter_by(user_id=USER).all(),
+}
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING (?:COVERING )?INDEX)')
+
+
+def capture(query):
+    """Run the query and return the SELECT statements it sent, with their parameters"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        query()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def problems(plan):
+    found = []
+    for detail in plan:
+        scan = _FULL_SCAN.match(detail)
+        if scan:
+            found.append(f'full scan of {scan.group(1)}')
+        elif 'USE TEMP B-TREE FOR ORDER BY' in detail:
+            found.append('sorts with a temp B-tree')
+    return found
+
+
+def check():
+    failures = 0
+    for name, query in HOT_QUERIES.items():
+        details = []
+        for statement, parameters in capture(query):
+            rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            details += [row[-1] for row in rows]
+        found = problems(details)
+        failures += bool(found)
+        print(f"{'FAIL' if found else 'ok':>4}  {name:<36} {'; '.join(details)}")
+        for problem in found:
+            print(f"      ↳ {problem}")
+    return failures
+
+
+def main():
+    app, _ = create_bench_app()
+    with app.app_context():
+        failures = check()
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} hot queries use an index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
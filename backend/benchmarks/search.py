@@ -0,0 +1,118 @@
+"""
+Full-text search: LIKE scans vs the FTS5 index behind GET /api/search.
+
+Fills a throwaway database with a million chat messages (Zipf-distributed
+synthetic vocabulary, 2,000 users, one heavy user with 50k messages) plus
+a few documents, then times the same two-term search as a LIKE scan over
+the heavy user's messages and through /api/search, first page and a deep
+page, and the same search for a light user (a few hundred messages),
+which should cost in proportion to that user's history, not the site's.
+Finally clears the user's history and deletes a document and checks
+both drop out of the results:
+    python -m benchmarks.search [messages]
+"""
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage, Document, User
+from app_modules.services.search_index import SearchService
+
+HEAVY_USER = 'heavy-user'
+LIGHT_USER = 'user-7'
+HEAVY_MESSAGES = 50000
+USERS = 2000
+BATCH = 50000
+
+
+def vocabulary(rng, size=5000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def sentence(rng, words, weights, length):
+    return ' '.join(rng.choices(words, weights, k=length))
+
+
+def populate(total, rng, words, weights):
+    db.session.execute(User.__table__.insert(), [{'id': HEAVY_USER}] + [{'id': f'user-{n}'} for n in range(USERS)])
+    start = time.perf_counter()
+    for offset in range(0, total, BATCH):
+        rows = []
+        for i in range(offset, min(offset + BATCH, total)):
+            user = HEAVY_USER if i % (total // HEAVY_MESSAGES) == 0 else f'user-{i % USERS}'
+            rows.append({'user_id': user, 'question': sentence(rng, words, weights, 10),
+                         'answer': sentence(rng, words, weights, 40)})
+        db.session.execute(ChatMessage.__table__.insert(), rows)
+        db.session.commit()
+    print(f"Inserted {total:,} messages (FTS kept in sync by triggers) in {time.perf_counter() - start:.1f}s")
+
+
+def timed(call, rounds=10):
+    samples, result = [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app, _ = create_bench_app()
+    client = app.test_client()
+    rng = random.Random(11)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    with app.app_context():
+        populate(total, rng, words, weights)
+        for n in range(20):
+            doc = Document(filename=f'notes_{n}.txt', user_id=HEAVY_USER,
+                           text_content=sentence(rng, words, weights, 3000))
+            db.session.add(doc)
+            db.session.commit()
+            SearchService.index_document(doc, [sentence(rng, words, weights, 60) for _ in range(50)])
+
+        # A common and a mid-frequency term, both required
+        terms = f'{words[3]} {words[300]}'
+        like_sql = ('SELECT id FROM chat_message WHERE user_id = :u '
+                    'AND (question LIKE :a OR answer LIKE :a) AND (question LIKE :b OR answer LIKE :b)')
+        like_params = {'u': HEAVY_USER, 'a': f'%{words[3]}%', 'b': f'%{words[300]}%'}
+        like_ms, like_rows = timed(lambda: db.session.execute(db.text(like_sql), like_params).fetchall(), rounds=3)
+
+        def search(page):
+            response = client.get(f'/api/search?user_id={HEAVY_USER}&q={terms}&page={page}')
+            assert response.status_code == 200
+            return response.json
+
+        first_ms, first = timed(lambda: search(0))
+        deep_ms, _ = timed(lambda: search(20))
+        chat_ms, chat = timed(lambda: SearchService.search(HEAVY_USER, terms, scope='chat', limit=100))
+        light_messages = ChatMessage.query.filter_by(user_id=LIGHT_USER).count()
+        light_ms, light = timed(lambda: SearchService.search(LIGHT_USER, terms, scope='chat', limit=100))
+
+    print(f"\nQuery '{terms}' for {HEAVY_USER} ({like_rows and len(like_rows):,} LIKE matches)")
+    print(f"  LIKE scan, unranked          {like_ms:>9.2f} ms")
+    print(f"  /api/search page 0           {first_ms:>9.2f} ms")
+    print(f"  /api/search page 20          {deep_ms:>9.2f} ms")
+    print(f"  chat scope, 100 results      {chat_ms:>9.2f} ms")
+    print(f"  {LIGHT_USER} ({light_messages:,} messages), chat {light_ms:>7.2f} ms  ({len(light['results'])} hits)")
+    print(f"  top hit: {first['results'][0]['type']} {first['results'][0]['snippet'][:80]}")
+    assert chat['results'], 'FTS found nothing the LIKE scan matched'
+
+    with app.app_context():
+        doc = Document.query.filter_by(user_id=HEAVY_USER).first()
+        client.delete(f'/api/documents/{doc.id}?user_id={HEAVY_USER}')
+        client.delete(f'/api/chat/clear/{HEAVY_USER}')
+        after = SearchService.search(HEAVY_USER, terms, limit=100)
+        types = {result['type'] for result in after['results']}
+        assert 'chat' not in types, 'cleared chat history still searchable'
+        assert doc.id not in {result['doc_id'] for result in after['results']}, 'deleted document still searchable'
+        print(f"After clearing history and deleting a document: {len(after['results'])} document hits, no chat hits")
+
+
+if __name__ == '__main__':
+    main()
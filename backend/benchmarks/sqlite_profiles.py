@@ -0,0 +1,96 @@
+"""
+Concurrent reads and writes under each SQLite engine profile (Config.SQLITE_PROFILES).
+
+For each profile a fresh database gets 50k chat messages, then READERS
+threads page through chat history while WRITERS threads save messages
+one commit each (the per-request pattern) for DURATION seconds. Reports
+throughput, p50/p99 latency and "database is locked" failures:
+    python -m benchmarks.sqlite_profiles
+"""
+import random
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks import create_bench_app
+from app_modules.models import db, ChatMessage
+from app_modules.utils.sqlite_profile import current_settings
+from config import Config
+
+READERS = 8
+WRITERS = 4
+DURATION = 5.0
+USERS = 100
+
+
+def populate():
+    db.session.execute(db.text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000) "
+        "INSERT INTO chat_message (user_id, question, answer) SELECT 'user-' || (i % :users), 'question ' || i, "
+        "printf('%.800c', 'a') FROM n"), {'users': USERS})
+    db.session.commit()
+
+
+def worker(app, stop, action, latencies, errors, seed):
+    rng = random.Random(seed)
+    with app.app_context():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                action(rng)
+                latencies.append(time.perf_counter() - start)
+            except OperationalError as e:
+                db.session.rollback()
+                errors.append(str(e.orig))
+
+
+def read(rng):
+    ChatMessage.query.filter_by(user_id=f'user-{rng.randrange(USERS)}')\
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(50).all()
+    db.session.commit()
+
+
+def write(rng):
+    db.session.add(ChatMessage(user_id=f'user-{rng.randrange(USERS)}', question='q', answer='a' * 800))
+    db.session.commit()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000 if ordered else float('nan')
+
+
+def run(profile):
+    app, _ = create_bench_app(sqlite_profile=profile)
+    with app.app_context():
+        populate()
+        settings = current_settings(db.engine)
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+    threads = [threading.Thread(target=worker, args=(app, stop, read, reads, errors, n)) for n in range(READERS)]
+    threads += [threading.Thread(target=worker, args=(app, stop, write, writes, errors, 100 + n))
+                for n in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f"{profile:>11} {len(reads) / DURATION:>8.0f} {percentile(reads, 0.5):>7.2f} {percentile(reads, 0.99):>8.2f} "
+          f"{len(writes) / DURATION:>9.0f} {percentile(writes, 0.5):>7.2f} {percentile(writes, 0.99):>8.2f} "
+          f"{len(errors):>7}")
+    return settings
+
+
+def main():
+    print(f"{READERS} readers + {WRITERS} writers for {DURATION:.0f}s per profile")
+    print(f"{'profile':>11} {'reads/s':>8} {'p50 ms':>7} {'p99 ms':>8} {'writes/s':>9} {'p50 ms':>7} {'p99 ms':>8} "
+          f"{'locked':>7}")
+    settings = {profile: run(profile) for profile in Config.SQLITE_PROFILES}
+    for profile, values in settings.items():
+        print(f"{profile}: " + ', '.join(f'{name}={value}' for name, value in values.items()))
+
+
+if __name__ == '__main__':
+    main()
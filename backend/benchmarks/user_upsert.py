@@ -0,0 +1,145 @@
+"""
+Shared get_or_create_user: queries per request and the first-sight race.
+
+1. Sends a mix of requests for an existing user through every blueprint
+   that resolves the user, once with the old per-blueprint implementation
+   (User.query.get, insert and commit when missing) and once with the
+   shared user_registry, counting the SQL statements each request sends
+   and its latency.
+2. Has THREADS threads resolve the same brand-new user id at once, for
+   RACES new ids with each implementation, counting failed requests and
+   duplicate rows:
+    python -m benchmarks.user_upsert
+"""
+import statistics
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from benchmarks import create_bench_app
+from app_modules.models import db, User
+from app_modules.services.user_registry import user_registry
+
+USER = 'user-bench'
+ROUNDS = 200
+THREADS = 16
+RACES = 20
+
+REQUESTS = [
+    ('GET', '/api/user/profile/' + USER, None),
+    ('GET', '/api/dashboard/' + USER, None),
+    ('GET', '/api/analytics/dashboard/' + USER, None),
+    ('GET', '/api/analytics/recommendations/' + USER, None),
+    ('GET', '/api/analytics/leaderboard/stats/' + USER, None),
+    ('POST', '/api/analytics/start-session', {'user_id': USER, 'quiz_id': 'quiz-bench'}),
+]
+
+
+def legacy_get_or_create(user_id):
+    """The copy every blueprint used to carry"""
+    user = User.query.get(user_id)
+    if not user:
+        user = User(id=user_id)
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+def use_legacy():
+    user_registry.ensure = lambda user_id: legacy_get_or_create(user_id) and False
+    user_registry.get_or_create = legacy_get_or_create
+
+
+def use_shared():
+    for name in ('ensure', 'get_or_create'):
+        user_registry.__dict__.pop(name, None)
+    user_registry.clear()
+
+
+def measure(app):
+    client = app.test_client()
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(*args):
+        statements.append(1)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    results = {}
+    try:
+        for method, path, body in REQUESTS:
+            counts, latencies = [], []
+            for _ in range(ROUNDS):
+                statements.clear()
+                start = time.perf_counter()
+                response = client.open(path, method=method, json=body)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, (path, response.status_code, response.get_data(as_text=True))
+                counts.append(len(statements))
+            results[path.split(USER)[0].rstrip('/')] = (statistics.mean(counts), statistics.median(latencies) * 1000)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return results
+
+
+def race(app, prefix):
+    failures, rows = 0, 0
+    for n in range(RACES):
+        failed, created = race_once(app, f'{prefix}-{n}')
+        failures += failed
+        rows += created
+    return failures, rows
+
+
+def race_once(app, user_id):
+    barrier = threading.Barrier(THREADS)
+    failures = []
+
+    def resolve():
+        with app.app_context():
+            barrier.wait()
+            try:
+                user_registry.ensure(user_id)
+            except IntegrityError:
+                db.session.rollback()
+                failures.append(user_id)
+
+    threads = [threading.Thread(target=resolve) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        rows = User.query.filter_by(id=user_id).count()
+    return len(failures), rows
+
+
+def main():
+    app, _ = create_bench_app()
+    with app.app_context():
+        db.session.add(User(id=USER))
+        db.session.commit()
+
+    use_legacy()
+    legacy = measure(app)
+    legacy_race = race(app, 'user-race-legacy')
+    use_shared()
+    shared = measure(app)
+    shared_race = race(app, 'user-race-shared')
+
+    print(f"Known user, {ROUNDS} requests per endpoint")
+    print(f"{'endpoint':>34} {'old stmts':>10} {'new stmts':>10} {'old p50 ms':>11} {'new p50 ms':>11}")
+    for name in legacy:
+        print(f"{name:>34} {legacy[name][0]:>10.1f} {shared[name][0]:>10.1f} "
+              f"{legacy[name][1]:>11.2f} {shared[name][1]:>11.2f}")
+    print(f"\n{THREADS} threads resolving the same new user id, {RACES} ids")
+    print(f"{'old':>6}: {legacy_race[0]} requests failed with IntegrityError, {legacy_race[1]} rows")
+    print(f"{'new':>6}: {shared_race[0]} requests failed, {shared_race[1]} rows")
+    print(f"\nuser_registry: {user_registry.metrics()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,38 @@ class Config:
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'intellilearn.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite engine profile, applied by app_modules/utils/sqlite_profile.py.
+    # 'production': WAL so readers never wait for the writer, synchronous=NORMAL (durable
+    # at checkpoints, no fsync per commit in WAL), a 64 MB page cache, 256 MB of mmap reads,
+    # in-memory temp tables, a busy timeout instead of immediate "database is locked",
+    # and a pool sized for the threaded Socket.IO server.
+    # 'default': SQLite/SQLAlchemy stock settings, kept for comparison (benchmarks/sqlite_profiles.py).
+    SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'production')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 10000))
+    SQLITE_PROFILES = {
+        'default': {
+            'pragmas': {},
+            'engine_options': {},
+        },
+        'production': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'cache_size': -int(os.getenv('SQLITE_CACHE_MB', 64)) * 1024,
+                'mmap_size': int(os.getenv('SQLITE_MMAP_MB', 256)) * 1024 * 1024,
+                'temp_store': 'MEMORY',
+                'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+                'journal_size_limit': 64 * 1024 * 1024,
+            },
+            'engine_options': {
+                'pool_size': int(os.getenv('SQLITE_POOL_SIZE', 16)),
+                'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', 16)),
+                'pool_timeout': 30,
+                'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+            },
+        },
+    }
+
     # CORS
     CORS_ORIGINS = "*"
 
@@ -36,9 +68,92 @@ class Config:
 
     # API Configuration
     GEMINI_MODEL = 'gemini-2.5-flash'
+    LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')  # 'gemini', 'mock' (mock_llm_server.py) or 'fake'
+    MOCK_LLM_URL = os.getenv('MOCK_LLM_URL', 'http://127.0.0.1:8765')
+
+    # Shared LLM client (app_modules/services/llm_client.py reads these from Config)
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+    LLM_PER_USER_CONCURRENCY = int(os.getenv('LLM_PER_USER_CONCURRENCY', 2))
+    LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', 20))
+    LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 2))
+    LLM_HEDGE_DELAY_SECONDS = float(os.getenv('LLM_HEDGE_DELAY_SECONDS', 6))
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30))
+
+    # LLM usage ledger and daily budgets (app_modules/services/usage_ledger.py)
+    # plan:calls:prompt_chars per UTC day, 0 = unlimited
+    LLM_DAILY_USER_BUDGETS = os.getenv('LLM_DAILY_USER_BUDGETS', 'free:100:200000,basic:1000:2000000,pro:0:0')
+    # Caps shared by all users on a plan (e.g. 'free:20000:0'); off by default so one heavy user
+    # cannot lock every free user out - per-user limits are LLM_DAILY_USER_BUDGETS
+    LLM_DAILY_SUBSCRIPTION_BUDGETS = os.getenv('LLM_DAILY_SUBSCRIPTION_BUDGETS', '')
+    LLM_USAGE_FLUSH_SECONDS = float(os.getenv('LLM_USAGE_FLUSH_SECONDS', 5))
+    LLM_USAGE_RECONCILE_SECONDS = float(os.getenv('LLM_USAGE_RECONCILE_SECONDS', 60))
     MAX_QUIZ_QUESTIONS = 5
     MAX_DOCUMENT_LENGTH = 10000
 
+    # Chat context retrieval (app_modules/services/retrieval.py)
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', 350))
+    CHAT_CONTEXT_TOP_K = int(os.getenv('CHAT_CONTEXT_TOP_K', 4))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv('RETRIEVAL_CACHE_SIZE', 64))
+    RETRIEVAL_CHUNK_CHARS = int(os.getenv('RETRIEVAL_CHUNK_CHARS', 400))
+    LOCAL_QA_TOP_SENTENCES = int(os.getenv('LOCAL_QA_TOP_SENTENCES', 3))  # offline extractive answers
+
+    CHAT_HISTORY_MAX_BYTES = int(os.getenv('CHAT_HISTORY_MAX_BYTES', 256 * 1024))  # per /api/chat/history page
+
+    # Multi-turn chat memory (app_modules/services/chat_memory.py)
+    CHAT_MEMORY_RECENT_TURNS = int(os.getenv('CHAT_MEMORY_RECENT_TURNS', 4))
+    CHAT_MEMORY_FOLD_BATCH = int(os.getenv('CHAT_MEMORY_FOLD_BATCH', 3))
+    CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_TOKEN_BUDGET', 700))
+    CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv('CHAT_MEMORY_SUMMARY_TOKENS', 200))
+    CHAT_MEMORY_FOLD_MAX_TURNS = int(os.getenv('CHAT_MEMORY_FOLD_MAX_TURNS', 12))  # per summary pass
+    CHAT_MEMORY_FOLD_TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_FOLD_TOKEN_BUDGET', 1500))  # transcript in a pass
+
+    # Retry queue for LLM artifacts that fell back to heuristics (app_modules/services/artifact_queue.py)
+    LLM_RETRY_RATE_PER_MINUTE = float(os.getenv('LLM_RETRY_RATE_PER_MINUTE', 10))
+    LLM_RETRY_BURST = int(os.getenv('LLM_RETRY_BURST', 3))
+    LLM_RETRY_MAX_ATTEMPTS = int(os.getenv('LLM_RETRY_MAX_ATTEMPTS', 8))
+    LLM_RETRY_BACKOFF_SECONDS = float(os.getenv('LLM_RETRY_BACKOFF_SECONDS', 30))
+
+    # Cross-request micro-batching of small JSON prompts (app_modules/services/micro_batcher.py)
+    LLM_BATCH_WINDOW_MS = float(os.getenv('LLM_BATCH_WINDOW_MS', 10))
+    LLM_BATCH_MAX_ITEMS = int(os.getenv('LLM_BATCH_MAX_ITEMS', 8))
+    LLM_BATCH_MAX_CHARS = int(os.getenv('LLM_BATCH_MAX_CHARS', 12000))
+
+    # Map-reduce QA over whole documents (app_modules/services/long_document_qa.py)
+    LONG_QA_SECTION_CHARS = int(os.getenv('LONG_QA_SECTION_CHARS', 6000))
+    LONG_QA_MAX_SECTIONS = int(os.getenv('LONG_QA_MAX_SECTIONS', 24))
+    LONG_QA_CONCURRENCY = int(os.getenv('LONG_QA_CONCURRENCY', 4))
+
+    # Per-user concept graph across all documents (app_modules/services/library_graph.py)
+    LIBRARY_GRAPH_CACHE_SIZE = int(os.getenv('LIBRARY_GRAPH_CACHE_SIZE', 32))
+    LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT = int(os.getenv('LIBRARY_GRAPH_CONCEPTS_PER_DOCUMENT', 7))
+    LIBRARY_GRAPH_KEYWORD_EDGES = int(os.getenv('LIBRARY_GRAPH_KEYWORD_EDGES', 8))  # per new concept
+    LIBRARY_GRAPH_PAGE_SIZE = int(os.getenv('LIBRARY_GRAPH_PAGE_SIZE', 50))  # /library/subgraph default page
+    LIBRARY_GRAPH_SAVE_DELAY_SECONDS = float(os.getenv('LIBRARY_GRAPH_SAVE_DELAY_SECONDS', 2))  # debounce
+
+    # Offline TextRank concept extraction (app_modules/services/concept_extractor.py)
+    CONCEPT_MAX_CANDIDATES = int(os.getenv('CONCEPT_MAX_CANDIDATES', 400))
+    CONCEPT_MAX_CHARS = int(os.getenv('CONCEPT_MAX_CHARS', 500000))
+
+    # Background purge of tombstoned chat history and documents (app_modules/services/purger.py)
+    PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', 500))
+    PURGE_PAUSE_SECONDS = float(os.getenv('PURGE_PAUSE_SECONDS', 0.05))
+    PURGE_POLL_SECONDS = float(os.getenv('PURGE_POLL_SECONDS', 5))
+
+    # Group commit of answer and chat-message writes (app_modules/services/group_commit.py)
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 256))
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv('GROUP_COMMIT_MAX_DELAY_MS', 5))
+
+    # FTS5 full-text search over chat history and documents (app_modules/services/search_index.py)
+    SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+
+    # Versioned schema migrations (app_modules/utils/db_migration.py): rows per backfill batch, pause between
+    SCHEMA_MIGRATION_BATCH_SIZE = int(os.getenv('SCHEMA_MIGRATION_BATCH_SIZE', 5000))
+    SCHEMA_MIGRATION_PAUSE_SECONDS = float(os.getenv('SCHEMA_MIGRATION_PAUSE_SECONDS', 0.01))
+
+    # Known-user cache in front of get_or_create_user (app_modules/services/user_registry.py)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+
     # Rate Limiting
     RATE_LIMIT_ENABLED = True
 
@@ -0,0 +1,186 @@
+"""
+Local Mock LLM Server
+Deterministic stand-in for Gemini so the chat, knowledge-graph and explain
+paths can be load-tested offline. Point the backend at it with:
+
+    python mock_llm_server.py --port 8765 --latency lognormal:800:0.5 --error-rate 0.05
+    LLM_PROVIDER=mock MOCK_LLM_URL=http://127.0.0.1:8765 python app_new.py
+
+Latency specs:  fixed:MS | uniform:MIN_MS:MAX_MS | normal:MEAN_MS:STDDEV_MS | lognormal:MEDIAN_MS:SIGMA
+The sampled latency is the time to first token; each further token adds --token-ms.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_llm import CANNED_JSON_RESPONSES, canned_json_for, fake_answer_tokens
+
+
+class LatencyModel:
+    """Samples per-request latency (seconds) from a configured distribution"""
+
+    def __init__(self, spec, rng):
+        parts = spec.split(':')
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        self.rng = rng
+        if self.kind not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f'Unknown latency distribution: {self.kind}')
+
+    def sample(self):
+        p = self.params
+        if self.kind == 'fixed':
+            ms = p[0]
+        elif self.kind == 'uniform':
+            ms = self.rng.uniform(p[0], p[1])
+        elif self.kind == 'normal':
+            ms = self.rng.gauss(p[0], p[1])
+        else:
+            ms = self.rng.lognormvariate(math.log(p[0]), p[1])
+        return max(0.0, ms) / 1000
+
+
+class MockLLM:
+    """Shared state: RNG, latency model, error injection and stats"""
+
+    def __init__(self, latency='lognormal:600:0.4', token_ms=10, tokens=120, error_rate=0.0,
+                 rate_limit_share=0.5, seed=42, canned=None):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.latency = LatencyModel(latency, self.rng)
+        self.token_delay = token_ms / 1000
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.rate_limit_share = rate_limit_share
+        self.canned = (canned or []) + CANNED_JSON_RESPONSES
+        self.stats = {'requests': 0, 'streams': 0, 'errors': 0, 'rate_limited': 0}
+
+    def draw(self):
+        """Return (latency_seconds, error_status or None) for one request"""
+        with self.lock:
+            self.stats['requests'] += 1
+            latency = self.latency.sample()
+            status = None
+            if self.rng.random() < self.error_rate:
+                status = 429 if self.rng.random() < self.rate_limit_share else 503
+                self.stats['rate_limited' if status == 429 else 'errors'] += 1
+        return latency, status
+
+    def respond(self, prompt, json_mode):
+        payload = canned_json_for(prompt, self.canned)
+        if payload is not None:
+            return json.dumps(payload)
+        if json_mode:
+            digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+            return json.dumps({'text': f'mock response {digest}'})
+        return ''.join(fake_answer_tokens(prompt, self.tokens)).strip()
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if self.path == '/v1/health':
+                self._json(200, {'status': 'ok'})
+            elif self.path == '/v1/stats':
+                with mock.lock:
+                    self._json(200, dict(mock.stats))
+            else:
+                self._json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path not in ('/v1/generate', '/v1/stream'):
+                self._json(404, {'error': 'not found'})
+                return
+
+            body = self._read_body()
+            prompt = body.get('prompt', '')
+            latency, error_status = mock.draw()
+            time.sleep(latency)
+            if error_status:
+                message = 'Resource has been exhausted (e.g. check quota).' if error_status == 429 \
+                    else 'The model is overloaded. Please try again later.'
+                self._json(error_status, {'error': message})
+                return
+
+            text = mock.respond(prompt, body.get('json_mode', False))
+            if self.path == '/v1/generate':
+                # Whole-response latency includes generating every token
+                time.sleep(mock.token_delay * max(0, len(text.split()) - 1))
+                self._json(200, {'text': text})
+                return
+
+            with mock.lock:
+                mock.stats['streams'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for idx, token in enumerate(re.findall(r'\S+\s*', text)):
+                if idx:
+                    time.sleep(mock.token_delay)
+                line = (json.dumps({'text': token}) + '\n').encode('utf-8')
+                self.wfile.write(f'{len(line):X}\r\n'.encode() + line + b'\r\n')
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+
+    return Handler
+
+
+def load_canned(path):
+    """Canned file: [{"match": "<regex>", "response": <json>}, ...]"""
+    if not path:
+        return []
+    with open(path) as f:
+        return [(entry['match'], entry['response']) for entry in json.load(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deterministic mock LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:600:0.4')
+    parser.add_argument('--token-ms', type=float, default=10)
+    parser.add_argument('--tokens', type=int, default=120)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-share', type=float, default=0.5,
+                        help='Fraction of injected errors returned as 429 instead of 503')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--canned', help='JSON file with extra canned responses')
+    args = parser.parse_args()
+
+    mock = MockLLM(args.latency, args.token_ms, args.tokens, args.error_rate,
+                   args.rate_limit_share, args.seed, load_canned(args.canned))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    print(f"🤖 Mock LLM listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency}, error rate {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Mock LLM stopped")
+
+
+if __name__ == '__main__':
+    main()
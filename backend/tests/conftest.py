@@ -0,0 +1,16 @@
+import os
+import sys
+
+os.environ.setdefault('LLM_PROVIDER', 'fake')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def app():
+    """app_new-equivalent app on a throwaway SQLite file (see benchmarks.create_bench_app)"""
+    from benchmarks import create_bench_app
+    app, _ = create_bench_app()
+    with app.app_context():
+        yield app
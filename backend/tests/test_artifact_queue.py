@@ -0,0 +1,39 @@
+from app_modules.models import db, ArtifactJob, Document, User
+from app_modules.services.artifact_queue import ArtifactRetryQueue
+from app_modules.services.graph_cache import KnowledgeGraphCacheService
+
+
+def _document(doc_id='d1'):
+    doc = Document(id=doc_id, filename='notes.txt', text_content='Cells divide by mitosis.', user_id='u1')
+    db.session.add(doc)
+    db.session.commit()
+    return doc
+
+
+def test_done_job_is_revived_when_its_artifact_is_no_longer_cached(app):
+    db.session.add(User(id='u1'))
+    queue = ArtifactRetryQueue()
+    doc = _document()
+    job = queue.enqueue('concepts', doc)
+    job.status, job.attempts = 'done', 3
+    db.session.commit()
+
+    # e.g. an extractor version bump: the upgraded graph is gone and the route served a fallback again
+    reupload = _document('d2')
+    revived = queue.enqueue('concepts', reupload)
+
+    assert revived.id == job.id
+    assert (revived.status, revived.attempts, revived.document_id) == ('pending', 0, 'd2')
+
+
+def test_done_job_with_a_cached_artifact_is_left_alone(app):
+    db.session.add(User(id='u1'))
+    queue = ArtifactRetryQueue()
+    doc = _document()
+    job = queue.enqueue('concepts', doc)
+    job.status = 'done'
+    db.session.commit()
+    KnowledgeGraphCacheService.store(doc, [{'name': 'Mitosis', 'description': 'Cell division.'}])
+
+    assert queue.enqueue('concepts', doc).status == 'done'
+    assert ArtifactJob.query.count() == 1
@@ -0,0 +1,31 @@
+from app_modules.models import db, ChatMessage, ChatMemory, User
+from app_modules.services import chat_memory
+from app_modules.services.chat_memory import ConversationMemory
+
+
+def test_first_load_folds_a_long_backlog_a_bounded_pass_at_a_time(app, monkeypatch):
+    db.session.add(User(id='u1'))
+    db.session.add_all(ChatMessage(user_id='u1', question=f'question {n}', answer='An answer. ' * 40)
+                       for n in range(200))
+    db.session.commit()
+    prompts = []
+
+    def generate(prompt, generation_config=None, **kwargs):
+        prompts.append(prompt)
+        return 'summary so far'
+
+    monkeypatch.setattr(chat_memory.llm_client, 'generate', generate)
+
+    summary, turns = ConversationMemory.load('u1')
+
+    assert len(prompts) == 1
+    assert prompts[0].count('Student: ') <= chat_memory.CHAT_MEMORY_FOLD_MAX_TURNS
+    assert 'Student: question 0\n' in prompts[0]
+    assert len(prompts[0]) <= (chat_memory.CHAT_MEMORY_FOLD_TOKEN_BUDGET + chat_memory.CHAT_MEMORY_SUMMARY_TOKENS) * 4 + 1000
+    assert summary == 'summary so far'
+    assert len(turns) < chat_memory.CHAT_MEMORY_RECENT_TURNS + chat_memory.CHAT_MEMORY_FOLD_BATCH
+    assert turns[-1].question == 'question 199'
+
+    folded = db.session.get(ChatMemory, 'u1').summarized_turns
+    ConversationMemory.load('u1')
+    assert db.session.get(ChatMemory, 'u1').summarized_turns > folded
@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.course_routes import COURSES, ENROLLED, concurrent_completions, concurrent_enrollments, \
+    count_statements, create_course_app, seed
+
+
+@pytest.fixture
+def course_app(tmp_path):
+    app, db, models = create_course_app(str(tmp_path / 'courses.db'))
+    with app.app_context():
+        seed(db, models)
+    return app, db, models
+
+
+@pytest.mark.parametrize('name, limit', [
+    ('catalog', 1), ('catalog anonymous', 1), ('details', 2), ('details anonymous', 2), ('lessons', 2),
+])
+def test_course_reads_use_a_fixed_number_of_statements(course_app, name, limit):
+    app, db, _ = course_app
+    statements, response = count_statements(app, db, name)
+    assert response.status_code == 200
+    assert statements <= limit
+
+
+def test_catalog_reports_each_enrollment_and_completion(course_app):
+    app, db, _ = course_app
+    courses = count_statements(app, db, 'catalog')[1].get_json()['courses']
+    details = count_statements(app, db, 'details')[1].get_json()
+    assert len(courses) == COURSES
+    assert sum(course['enrolled'] for course in courses) == ENROLLED
+    assert [week['completed'] for week in details['syllabus']] == [3, 0, 0, 0]
+
+
+def test_parallel_enrollments_and_completions_are_all_counted(course_app):
+    app, db, models = course_app
+    assert concurrent_enrollments(app, db, models, COURSES - 1, students=40) == 40
+    assert concurrent_completions(app, db, models, 2, lessons=8) == (3, 11)
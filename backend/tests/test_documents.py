@@ -0,0 +1,49 @@
+import os
+
+from app_modules.models import db, CachedKnowledgeGraph, Document, Tombstone, User
+from app_modules.routes import documents
+from app_modules.services.graph_cache import KnowledgeGraphCacheService
+
+TEXT = 'Photosynthesis turns light into chemical energy.'
+
+
+def _stored_document(tmp_path, user_id):
+    db.session.add(User(id=user_id))
+    doc = Document(filename='notes.txt', text_content=TEXT, user_id=user_id)
+    db.session.add(doc)
+    db.session.commit()
+    os.makedirs(tmp_path / user_id, exist_ok=True)
+    (tmp_path / user_id / 'notes.txt').write_text(TEXT)
+    return doc
+
+
+def test_failed_delete_leaves_the_file_in_place(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, 'UPLOAD_FOLDER', str(tmp_path))
+    doc = _stored_document(tmp_path, 'u1')
+
+    def fail():
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(db.session, 'commit', fail)
+    response = app.test_client().delete(f'/api/documents/{doc.id}')
+    monkeypatch.undo()
+
+    assert response.status_code == 500
+    assert (tmp_path / 'u1' / 'notes.txt').exists()
+    assert db.session.get(Document, doc.id).deleted_at is None
+
+
+def test_delete_keeps_the_cached_graph_other_copies_use(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, 'UPLOAD_FOLDER', str(tmp_path))
+    mine = _stored_document(tmp_path, 'u1')
+    theirs = _stored_document(tmp_path, 'u2')
+    KnowledgeGraphCacheService.store(theirs, [{'name': 'Photosynthesis', 'description': 'Light to energy.'}])
+
+    response = app.test_client().delete(f'/api/documents/{mine.id}')
+
+    assert response.status_code == 200
+    assert KnowledgeGraphCacheService.lookup(theirs) is not None
+    assert CachedKnowledgeGraph.query.count() == 1
+    tombstone = Tombstone.query.one()
+    assert tombstone.file_path == str(tmp_path / 'u1' / f'notes.txt.{mine.id}.deleted')
+    assert os.path.exists(tombstone.file_path) and not (tmp_path / 'u1' / 'notes.txt').exists()
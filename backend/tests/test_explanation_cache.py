@@ -0,0 +1,27 @@
+from app_modules.models import db, ConceptExplanation, Document, User
+from app_modules.services.explanation_cache import ExplanationCacheService
+from app_modules.services.gemini_service import GeminiService
+
+
+def test_prime_keeps_its_batch_when_another_writer_cached_one_concept(app, monkeypatch):
+    db.session.add(User(id='u1'))
+    doc = Document(filename='notes.txt', text_content='Photosynthesis and respiration in plant cells.', user_id='u1')
+    db.session.add(doc)
+    db.session.commit()
+    names = ['Photosynthesis', 'Respiration', 'Chlorophyll']
+
+    def explain_while_another_request_caches_one(missing, context, user_id=None):
+        # A concurrent request stores 'Respiration' between our cache lookup and our insert
+        db.session.add(ConceptExplanation(document_hash=doc.content_hash(), concept_key='respiration',
+                                          concept='Respiration', explanation='theirs'))
+        db.session.commit()
+        return {name: {'explanation': f'ours: {name}', 'keyPoints': []} for name in missing}
+
+    monkeypatch.setattr(GeminiService, 'explain_concepts_batch', staticmethod(explain_while_another_request_caches_one))
+
+    stored = ExplanationCacheService.prime(doc, [{'name': name} for name in names])
+
+    cached = {row.concept_key: row.explanation for row in ConceptExplanation.query.all()}
+    assert stored == 2
+    assert cached == {'photosynthesis': 'ours: Photosynthesis', 'respiration': 'theirs',
+                      'chlorophyll': 'ours: Chlorophyll'}
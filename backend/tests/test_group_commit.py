@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from app_modules.models import db, ChatMessage, User
+from app_modules.services.group_commit import GroupCommitWriter
+
+
+def _insert(user_id, question):
+    return db.insert(ChatMessage).values(user_id=user_id, question=question, answer='a')
+
+
+def test_inline_write_commits_alone_and_reports_failures(app):
+    db.session.add(User(id='u1'))
+    db.session.commit()
+    writer = GroupCommitWriter()
+    db.session.add(ChatMessage(user_id='u1', question='caller pending', answer='a'))
+
+    message_id = writer.write(_insert('u1', 'inline'))
+    with pytest.raises(Exception):
+        writer.write(db.insert(ChatMessage).values(id=message_id, user_id='u1', question='dup', answer='a'))
+    db.session.rollback()
+
+    assert [m.question for m in ChatMessage.query.all()] == ['inline']
+    assert writer.stats['inline'] == 2
+
+
+def test_timed_out_write_is_withdrawn_and_never_committed(app):
+    db.session.add(User(id='u1'))
+    db.session.commit()
+    writer = GroupCommitWriter()
+    # A writer that is alive but stuck (e.g. behind a long checkpoint)
+    stuck = threading.Event()
+    writer._thread = threading.Thread(target=stuck.wait)
+    writer._thread.start()
+    try:
+        with pytest.raises(TimeoutError):
+            writer.write(_insert('u1', 'late'), timeout=0.05)
+        assert writer.metrics()['queued'] == 0
+    finally:
+        stuck.set()
+        writer._thread.join()
+
+    writer.start(app)
+    writer.stop()
+    assert ChatMessage.query.count() == 0
+
+
+def test_inline_write_refuses_to_wait_on_the_callers_own_write_lock(app):
+    db.session.add(User(id='u1'))
+    db.session.commit()
+    db.session.execute(_insert('u1', 'uncommitted'))
+
+    with pytest.raises(RuntimeError):
+        GroupCommitWriter().write(_insert('u1', 'inline'), timeout=1)
+    db.session.rollback()
@@ -0,0 +1,49 @@
+import pytest
+
+from app_modules.models import db, Document, LibraryGraph, User
+from app_modules.services import library_graph
+from app_modules.services.library_graph import LibraryGraphService
+
+
+@pytest.fixture
+def library(app, monkeypatch):
+    monkeypatch.setattr(library_graph, 'LIBRARY_GRAPH_SAVE_DELAY', 60)
+    LibraryGraphService._cache.clear()
+    yield
+    LibraryGraphService.flush()
+
+
+def _upload(user_id, n):
+    doc = Document(filename=f'notes_{n}.txt', user_id=user_id,
+                   text_content=f'Cell division {n} is discussed. Energy storage {n} matters. ' * 3)
+    db.session.add(doc)
+    db.session.commit()
+    LibraryGraphService.add_document(doc)
+    return doc
+
+
+def test_a_burst_of_uploads_is_saved_once(library, monkeypatch):
+    db.session.add(User(id='u1'))
+    saves = []
+    save = LibraryGraphService._save.__func__
+    monkeypatch.setattr(LibraryGraphService, '_save',
+                        classmethod(lambda cls, user_id, lib: saves.append(user_id) or save(cls, user_id, lib)))
+
+    for n in range(5):
+        _upload('u1', n)
+    assert saves == [] and db.session.get(LibraryGraph, 'u1') is None
+    assert LibraryGraphService._pending['u1'].daemon
+
+    body, etag, source = LibraryGraphService.get('u1')
+    assert saves == ['u1'] and source == 'stored'
+    assert db.session.get(LibraryGraph, 'u1').document_count == 5
+
+
+def test_per_user_locks_are_dropped_when_idle(library):
+    for n in range(20):
+        db.session.add(User(id=f'user-{n}'))
+        _upload(f'user-{n}', n)
+    assert LibraryGraphService._locks == {}
+    LibraryGraphService.flush()
+    assert LibraryGraphService._pending == {}
+    assert LibraryGraph.query.count() == 20
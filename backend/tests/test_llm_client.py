@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from app_modules.services.llm_client import CircuitBreaker, LLMClient
+from app_modules.services.llm_providers import get_provider, set_provider
+from benchmarks.fake_llm import FakeProvider
+
+
+@pytest.fixture
+def slow_stream():
+    previous = get_provider()
+    set_provider(FakeProvider(first_token_delay=0, token_delay=0.01, num_tokens=1000))
+    yield
+    set_provider(previous)
+
+
+def test_closing_a_half_open_probe_stream_releases_the_probe(slow_stream):
+    client = LLMClient(max_concurrency=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+    client.breaker.record_failure()
+    time.sleep(0.02)
+
+    stream = client.stream('probe')
+    next(stream)
+    stream.close()
+
+    assert client.breaker.allow()
+
+
+def test_closing_a_stream_stops_the_pump_and_frees_its_slot(slow_stream):
+    client = LLMClient(max_concurrency=1)
+    stream = client.stream('long answer')
+    next(stream)
+    stream.close()
+
+    deadline = time.monotonic() + 1
+    while not client._global.acquire(blocking=False):
+        assert time.monotonic() < deadline, 'pump kept the global slot after the consumer left'
+        time.sleep(0.01)
+    client._global.release()
+
+
+def test_per_user_semaphores_are_dropped_when_idle():
+    client = LLMClient(max_concurrency=4, per_user_concurrency=1)
+    release = threading.Event()
+    holder = threading.Thread(target=client.call, args=('op', release.wait), kwargs={'user_id': 'busy'})
+    holder.start()
+    try:
+        for n in range(50):
+            client.call('op', lambda: 'ok', user_id=f'user-{n}')
+        time.sleep(0.05)
+        assert set(client._user_semaphores) == {'busy'}
+    finally:
+        release.set()
+        holder.join()
+    assert client._user_semaphores == {}
+
+
+def test_calls_without_a_user_slot_do_not_wait_on_the_user_limit():
+    client = LLMClient(max_concurrency=4, per_user_concurrency=1)
+    release = threading.Event()
+    holder = threading.Thread(target=client.call, args=('op', release.wait), kwargs={'user_id': 'u1'})
+    holder.start()
+    try:
+        time.sleep(0.05)
+        assert client.call('op', lambda: 'ok', user_id='u1', deadline=0.5, user_slot=False) == 'ok'
+    finally:
+        release.set()
+        holder.join()
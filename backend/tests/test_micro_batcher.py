@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from app_modules.services.llm_client import LLMUnavailableError
+from app_modules.services.llm_providers import get_provider, set_provider
+from app_modules.services.micro_batcher import MicroBatcher, BATCH_TASK_HEADER
+from app_modules.services.usage_ledger import usage_ledger
+from benchmarks.fake_llm import FakeProvider
+
+NAMES = ('Osmosis', 'Diffusion')
+
+
+class BatchFailingProvider(FakeProvider):
+    """FakeProvider whose batch replies fail with `batch_error` (if set); records every JSON prompt"""
+
+    def __init__(self, batch_error):
+        super().__init__(first_token_delay=0, token_delay=0, num_tokens=20)
+        self.batch_error = batch_error
+        self.prompts = []
+
+    def generate_json(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        if self.batch_error is not None and BATCH_TASK_HEADER in prompt:
+            raise self.batch_error
+        return super().generate_json(prompt, generation_config)
+
+
+@pytest.fixture
+def provider(request):
+    previous = get_provider()
+    provider = BatchFailingProvider(request.param)
+    set_provider(provider)
+    yield provider
+    set_provider(previous)
+
+
+def ask_concurrently(batcher):
+    """{name: result or exception} for one explain_concept prompt per name, sent together"""
+    outcomes = {}
+
+    def ask(name):
+        try:
+            outcomes[name] = batcher.generate_json(f'Explain this concept: {name}', operation='explain_concept')
+        except Exception as e:
+            outcomes[name] = e
+    threads = [threading.Thread(target=ask, args=(name,)) for name in NAMES]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+        assert not thread.is_alive(), 'a waiter was left blocked'
+    return outcomes
+
+
+@pytest.mark.parametrize('provider', [ValueError('Model did not return JSON')], indirect=True)
+def test_unparseable_batch_reply_is_retried_individually_and_counted_as_wasted(app, provider):
+    batcher = MicroBatcher(max_wait=1.0, max_items=2)
+
+    outcomes = ask_concurrently(batcher)
+
+    assert all(isinstance(result, dict) for result in outcomes.values())
+    assert batcher.stats['upstream_calls_saved'] == 0
+    assert batcher.stats['wasted_batch_calls'] == 1
+    assert batcher.stats['individual_fallbacks'] == 2
+
+
+@pytest.mark.parametrize('provider', [RuntimeError('upstream 503')], indirect=True)
+def test_failed_batch_call_is_not_fanned_out_to_the_provider(app, provider):
+    batcher = MicroBatcher(max_wait=1.0, max_items=2)
+
+    outcomes = ask_concurrently(batcher)
+
+    assert all(isinstance(error, LLMUnavailableError) for error in outcomes.values())
+    assert provider.prompts and all(BATCH_TASK_HEADER in prompt for prompt in provider.prompts)
+    assert batcher.stats['failed_batches'] == 1
+
+
+@pytest.mark.parametrize('provider', [None], indirect=True)
+def test_waiters_are_released_when_resolving_the_batch_fails(app, provider, monkeypatch):
+    failures = []
+    record = usage_ledger.record
+
+    def record_failing_once(operation, *args, **kwargs):
+        if operation == 'explain_concept' and not failures:
+            failures.append(operation)
+            raise RuntimeError('ledger unavailable')
+        return record(operation, *args, **kwargs)
+    monkeypatch.setattr(usage_ledger, 'record', record_failing_once)
+    batcher = MicroBatcher(max_wait=1.0, max_items=2)
+
+    outcomes = ask_concurrently(batcher)
+
+    assert failures
+    assert all(isinstance(result, dict) for result in outcomes.values())
@@ -0,0 +1,66 @@
+import threading
+
+from sqlalchemy import create_engine
+
+from app_modules.models import ChatMessage
+from app_modules.utils.db_migration import AddColumn, Migration, MigrationRunner, MIGRATIONS
+
+
+class StoppingAddColumn(AddColumn):
+    """Sets `stop` after `after` backfill batches, like a shutdown arriving mid-migration"""
+
+    def __init__(self, stop, after, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop, self.after, self.batches = stop, after, 0
+
+    def backfill_batch(self, connection, start, stop):
+        super().backfill_batch(connection, start, stop)
+        self.batches += 1
+        if self.batches == self.after:
+            self.stop.set()
+
+
+def test_interrupted_backfill_resumes_from_the_recorded_rowid(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE chat_message (id INTEGER PRIMARY KEY, answer TEXT)')
+        connection.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 95) "
+            "INSERT INTO chat_message (answer) SELECT printf('%.*c', i, 'a') FROM n")
+    stop = threading.Event()
+    step = StoppingAddColumn(stop, 3, 'chat_message', 'answer_chars', 'INTEGER', backfill='length(answer)')
+    runner = MigrationRunner(engine, [Migration(1, 'Answer lengths', [step])], batch_size=10, pause=0)
+
+    assert runner.run(stop=stop) == 0
+    with engine.connect() as connection:
+        progress = connection.exec_driver_sql('SELECT last_rowid, done FROM schema_migration_progress').all()
+        missing = connection.exec_driver_sql('SELECT count(*) FROM chat_message WHERE answer_chars IS NULL').scalar()
+    assert progress == [(30, 0)]
+    assert missing == 65
+
+    assert runner.run() == 1
+    with engine.connect() as connection:
+        wrong = connection.exec_driver_sql(
+            'SELECT count(*) FROM chat_message WHERE answer_chars IS NOT length(answer)').scalar()
+        progress = connection.exec_driver_sql('SELECT count(*) FROM schema_migration_progress').scalar()
+    assert step.batches == 10  # 3 before the stop, then rowids 31..95 without redoing the first 30
+    assert wrong == 0
+    assert progress == 0
+
+
+def test_index_migrations_carry_their_own_ddl(tmp_path, monkeypatch):
+    # Released migrations keep working after the models drop or rename the index
+    monkeypatch.setattr(ChatMessage.__table__, 'indexes', set())
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            'CREATE TABLE chat_message (id INTEGER PRIMARY KEY, user_id VARCHAR(50), timestamp DATETIME)')
+
+    assert MigrationRunner(engine, MIGRATIONS, pause=0).run() == MIGRATIONS[-1].version
+    with engine.connect() as connection:
+        indexes = [row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'chat_message'")]
+        columns = [row[2] for row in connection.exec_driver_sql(
+            "PRAGMA index_info('ix_chat_message_user_timestamp')")]
+    assert indexes == ['ix_chat_message_user_timestamp']
+    assert columns == ['user_id', 'timestamp', 'id']
@@ -0,0 +1,15 @@
+import pytest
+
+from app_modules.models import db
+from benchmarks.query_plans import HOT_QUERIES, capture, problems
+
+
+@pytest.mark.parametrize('name', list(HOT_QUERIES))
+def test_hot_query_is_served_by_an_index(app, name):
+    statements = capture(HOT_QUERIES[name])
+    assert statements, 'query sent no SELECT'
+    for statement, parameters in statements:
+        plan = [row[-1] for row in
+                db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()]
+        assert any('USING INDEX' in detail or 'USING COVERING INDEX' in detail for detail in plan), plan
+        assert problems(plan) == [], plan
@@ -0,0 +1,46 @@
+import json
+import threading
+
+import pytest
+
+from app_modules.models import db, Document, Quiz, QuizSession, QuestionAttempt, User
+from app_modules.routes import quiz as quiz_routes
+from app_modules.services.group_commit import group_writer
+
+QUESTIONS = [{'question': 'What do mitochondria produce?', 'options': ['Energy', 'Water'], 'correct': 'Energy',
+              'difficulty': 'medium', 'explanation': 'ATP.'}]
+
+
+@pytest.fixture
+def stuck_writer(monkeypatch):
+    """group_writer alive but stuck (e.g. behind a long checkpoint), so answers queue and time out"""
+    stuck = threading.Event()
+    thread = threading.Thread(target=stuck.wait)
+    thread.start()
+    monkeypatch.setattr(group_writer, '_thread', thread)
+    monkeypatch.setattr(quiz_routes, 'ANSWER_WRITE_TIMEOUT', 0.05)
+    yield
+    stuck.set()
+    thread.join()
+
+
+def test_timed_out_answer_writes_are_withdrawn_and_never_committed(app, stuck_writer):
+    db.session.add(User(id='u1', points=0))
+    doc = Document(filename='notes.txt', text_content='Mitochondria produce energy.', user_id='u1')
+    db.session.add(doc)
+    db.session.flush()
+    quiz = Quiz(difficulty='medium', questions_json=json.dumps(QUESTIONS), document_id=doc.id)
+    db.session.add(quiz)
+    db.session.flush()
+    session = QuizSession(user_id='u1', quiz_id=quiz.id, difficulty='medium')
+    db.session.add(session)
+    db.session.commit()
+
+    response = app.test_client().post('/api/submit-answer', json={
+        'user_id': 'u1', 'quiz_id': quiz.id, 'question_index': 0, 'answer': 'Energy', 'session_id': session.id})
+
+    assert response.status_code == 500
+    assert group_writer.metrics()['queued'] == 0
+    db.session.expire_all()
+    assert db.session.get(User, 'u1').points == 0
+    assert QuestionAttempt.query.count() == 0
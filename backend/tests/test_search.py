@@ -0,0 +1,74 @@
+from app_modules.models import db, ChatMessage, Document, User
+from app_modules.services.search_index import SearchService, match_query, owned_match
+
+
+def _owner_of_each_hit(user_id):
+    results = SearchService.search(user_id, 'photosynthesis')['results']
+    chats = {row.id: row.user_id for row in ChatMessage.query.all()}
+    docs = {row.id: row.user_id for row in Document.query.all()}
+    return {chats[r['id']] if r['type'] == 'chat' else docs[r['doc_id']] for r in results}
+
+
+def _populate(user_ids):
+    for user_id in user_ids:
+        db.session.add(User(id=user_id))
+        db.session.add(ChatMessage(user_id=user_id, question='What is photosynthesis?', answer=f'Asked by {user_id}.'))
+        doc = Document(filename='notes.txt', text_content='Photosynthesis in leaves.', user_id=user_id)
+        db.session.add(doc)
+        db.session.commit()
+        SearchService.index_document(doc, ['Photosynthesis happens in the chloroplasts of leaves.'])
+
+
+def test_search_only_returns_the_users_own_rows_when_ids_share_tokens(app):
+    _populate(['user_1', 'user_1_secret', 'user-1', '1'])
+
+    assert _owner_of_each_hit('user_1') == {'user_1'}
+    assert _owner_of_each_hit('1') == {'1'}
+    assert _owner_of_each_hit('user-1') == {'user-1'}
+
+
+def test_match_only_walks_the_users_own_rows(app):
+    _populate(['user_1', 'user_1_secret', 'user-1', '1'])
+
+    for user_id in ('user_1', '1'):
+        match = owned_match(user_id, match_query('photosynthesis'), ('question', 'answer'))
+        rowids = db.session.execute(db.text('SELECT rowid FROM chat_message_fts WHERE chat_message_fts MATCH :m'),
+                                    {'m': match}).scalars().all()
+        assert {db.session.get(ChatMessage, rowid).user_id for rowid in rowids} == {user_id}
+
+
+def test_install_rebuilds_fts_tables_without_owner_tokens(app):
+    connection = db.session.connection()
+    for statement in ("DROP TRIGGER chat_message_fts_ai", "DROP TRIGGER chat_message_fts_ad",
+                      "DROP TRIGGER chat_message_fts_au", "DROP TABLE chat_message_fts",
+                      "CREATE VIRTUAL TABLE chat_message_fts USING fts5("
+                      "question, answer, user_id, content='chat_message', content_rowid='id')"):
+        connection.exec_driver_sql(statement)
+    db.session.commit()
+    _populate(['user_1'])
+
+    SearchService.install()
+
+    sql = db.session.execute(db.text("SELECT sql FROM sqlite_master WHERE name = 'chat_message_fts'")).scalar()
+    assert 'owner' in sql
+    assert {r['type'] for r in SearchService.search('user_1', 'photosynthesis')['results']} == {'chat', 'document'}
+
+
+def test_ranking_uses_only_the_users_own_rows(app):
+    db.session.add_all([User(id='u1'), User(id='u2')])
+    db.session.add_all([
+        ChatMessage(user_id='u1', question='Light reactions', answer='Chlorophyll absorbs light.'),
+        ChatMessage(user_id='u1', question='Where is chlorophyll?', answer='In the thylakoids.'),
+        ChatMessage(user_id='u1', question='Krebs cycle', answer='In the mitochondria.'),
+    ])
+    db.session.commit()
+
+    def scores():
+        return [(r['title'], r['score']) for r in SearchService.search('u1', 'chlorophyll', scope='chat')['results']]
+    before = scores()
+    db.session.add_all([ChatMessage(user_id='u2', question='Chlorophyll', answer='Chlorophyll a and b.')
+                        for _ in range(50)])
+    db.session.commit()
+
+    assert [title for title, _ in before] == ['Where is **chlorophyll**?', 'Light reactions']
+    assert scores() == before
@@ -0,0 +1,33 @@
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from app_modules.utils.sqlite_profile import current_settings, init_sqlite
+from config import Config
+
+
+def _engine(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db = SQLAlchemy()
+    init_sqlite(app, db, 'production')
+    with app.app_context():
+        return db.engine
+
+
+@pytest.mark.parametrize('uri', ['sqlite://', 'sqlite:///:memory:'])
+def test_in_memory_database_gets_only_connection_pragmas(uri):
+    engine = _engine(uri)
+
+    settings = current_settings(engine)
+    assert settings['journal_mode'] == 'memory'
+    assert settings['busy_timeout'] == Config.SQLITE_BUSY_TIMEOUT_MS
+    assert settings['cache_size'] == Config.SQLITE_PROFILES['production']['pragmas']['cache_size']
+    assert not hasattr(engine.pool, 'size')
+
+
+def test_file_database_gets_the_full_profile(tmp_path):
+    engine = _engine(f"sqlite:///{tmp_path / 'file.db'}")
+
+    assert current_settings(engine)['journal_mode'] == 'wal'
+    assert engine.pool.size() == Config.SQLITE_PROFILES['production']['engine_options']['pool_size']
@@ -0,0 +1,28 @@
+from app_modules.models import db, User
+from app_modules.services.usage_ledger import usage_ledger
+from app_modules.services.user_registry import user_registry
+
+
+def test_failed_subscription_change_does_not_reach_the_budget_plan(app, monkeypatch):
+    user_registry.ensure('u1')
+    monkeypatch.setattr(usage_ledger, '_plans', {})
+
+    def commit_fails():
+        raise RuntimeError('database is locked')
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, 'commit', commit_fails)
+        response = app.test_client().post('/api/subscription/u1', json={'plan_id': 'pro'})
+
+    assert response.status_code == 500
+    assert db.session.get(User, 'u1').subscription == 'free'
+    assert usage_ledger._plans.get('u1') != 'pro'
+
+
+def test_subscription_change_sets_the_budget_plan(app, monkeypatch):
+    user_registry.ensure('u1')
+    monkeypatch.setattr(usage_ledger, '_plans', {})
+
+    response = app.test_client().post('/api/subscription/u1', json={'plan_id': 'pro'})
+
+    assert response.status_code == 200
+    assert usage_ledger.plan_for('u1') == 'pro'
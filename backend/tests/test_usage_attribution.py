@@ -0,0 +1,78 @@
+import threading
+from collections import deque
+
+import pytest
+
+from app_modules.models import db, User
+from app_modules.services.llm_providers import get_provider, set_provider
+from app_modules.services.long_document_qa import LongDocumentQA
+from app_modules.services.micro_batcher import MicroBatcher
+from app_modules.services.usage_ledger import usage_ledger
+from benchmarks.fake_llm import FakeProvider
+
+
+@pytest.fixture
+def fake_provider(app):
+    previous = get_provider()
+    set_provider(FakeProvider(first_token_delay=0, token_delay=0, num_tokens=20))
+    yield
+    set_provider(previous)
+
+
+@pytest.fixture
+def recorded(fake_provider, monkeypatch):
+    """(operation, user_id, cached, prompt_chars, response_chars) per ledger record"""
+    rows = []
+
+    def record(operation, user_id=None, prompt_chars=0, response_chars=0, latency=0.0, cached=False, outcome='ok'):
+        rows.append((operation, user_id, cached, prompt_chars, response_chars))
+    monkeypatch.setattr(usage_ledger, 'record', record)
+    return rows
+
+
+def test_long_document_map_calls_are_charged_to_the_user(recorded):
+    text = ' '.join(f'Section {n} says mitochondria produce energy for the cell.' for n in range(200))
+
+    LongDocumentQA.answer('What do mitochondria produce?', text, user_id='u1', concurrency=4)
+
+    maps = [row[1] for row in recorded if row[0] == 'long_qa_map']
+    assert maps and set(maps) == {'u1'}
+
+
+def test_long_document_map_calls_use_the_users_plan(fake_provider, monkeypatch):
+    db.session.add(User(id='pro-user', subscription='pro'))
+    db.session.commit()
+    # One free call a day: map calls checked against the free plan would be refused
+    monkeypatch.setattr(usage_ledger, 'user_budgets', {'free': (1, 0), 'pro': (0, 0)})
+    monkeypatch.setattr(usage_ledger, '_plans', {})
+    monkeypatch.setattr(usage_ledger, '_user_usage', {})
+    monkeypatch.setattr(usage_ledger, '_plan_usage', {})
+    monkeypatch.setattr(usage_ledger, '_buffer', deque())
+    text = ' '.join(f'Section {n} says mitochondria produce energy for the cell.' for n in range(200))
+
+    LongDocumentQA.answer('What do mitochondria produce?', text, user_id='pro-user', concurrency=4)
+
+    maps = [row for row in usage_ledger._buffer if row['operation'] == 'long_qa_map']
+    assert maps
+    assert {(row['subscription'], row['outcome']) for row in maps} == {('pro', 'ok')}
+
+
+def test_micro_batched_items_are_charged_to_their_own_users(recorded):
+    batcher = MicroBatcher(max_wait=1.0, max_items=2)
+    threads = [threading.Thread(target=batcher.generate_json, args=(f'Explain this concept: {name}',),
+                                kwargs={'operation': 'explain_concept', 'user_id': name})
+               for name in ('alice', 'bob')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert batcher.stats['batches'] == 1
+    charged = {row[1] for row in recorded if row[0] == 'explain_concept' and not row[2]}
+    assert charged == {'alice', 'bob'}
+    assert [row[1] for row in recorded if row[0] == 'explain_concept_batch'] == [None]
+    # Totals count each batched prompt once: the shared call adds no sizes and no charge
+    prompts = sum(len(f'Explain this concept: {name}') for name in ('alice', 'bob'))
+    assert sum(row[3] for row in recorded) == prompts
+    assert sum(row[4] for row in recorded) == sum(row[4] for row in recorded if row[0] == 'explain_concept')
+    assert [row[0] for row in recorded if not row[2]] == ['explain_concept', 'explain_concept']